@@ -171,7 +171,12 @@ class ActuarialToolsStack(Stack):
         if os.path.exists(lambda_build_dir):
             shutil.rmtree(lambda_build_dir)
         os.makedirs(lambda_build_dir, exist_ok=True)
-        shutil.copytree("tools", lambda_build_dir, dirs_exist_ok=True)
+        shutil.copytree(
+            "tools",
+            lambda_build_dir,
+            dirs_exist_ok=True,
+            ignore=shutil.ignore_patterns("tests", "bench", "__pycache__"),
+        )
 
         # AgentCore Memory (native CFN construct)
         memory = bedrockagentcore.CfnMemory(
@@ -327,6 +332,8 @@ class ActuarialToolsStack(Stack):
                 "ATHENA_OUTPUT_LOCATION": f"s3://{athena_results_bucket.bucket_name}/query-results/",
                 "AGENTCORE_MEMORY_ID": memory_id,
                 "ACTOR_ID": "ActuarialAgent",
+                "SESSION_CACHE_MAX_MB": "256",
+                "SESSION_CACHE_SPILL_DIR": "/tmp/session_cache",
             },
         )
 
@@ -426,6 +433,7 @@ class ActuarialToolsStack(Stack):
                 "ATHENA_OUTPUT_LOCATION": f"s3://{athena_results_bucket.bucket_name}/query-results/",
                 "AGENTCORE_MEMORY_ID": memory_id,
                 "ACTOR_ID": "ActuarialAgent",
+                "QUERY_CACHE_TTL_SECONDS": "3600",
             },
         )
 
@@ -15,24 +15,34 @@ Supported Tools:
 - score_fraud_risk: Fraud probability scoring
 - analyze_risk_factors: Risk segmentation and analysis
 - build_loss_triangles: Loss development triangle construction
+- update_loss_triangles: Incremental triangle update from new or changed claims
 - calculate_reserves: IBNR reserve calculations
 - monitor_development: KPI monitoring and alerts
+- run_pipeline: Several of the above on one load of the session data
+- analyze_portfolio: Fraud, litigation, triangles and KPIs by scatter/gather
+  over the session's parquet files, for sessions too large to load at once
 """
 
 import json
 import logging
 import os
-from datetime import datetime
-
-import boto3
+import time
+from concurrent.futures import ThreadPoolExecutor
 
 # Import actuarial analysis modules
 import fraud_detection
 import litigation_analysis
 import loss_reserving
 import monitoring
+import portfolio_analysis
 import risk_analysis
-from utils.data_utils import load_session_data
+from utils.constants import PIPELINE_CONFIG, SESSION_COLUMNS, SESSION_ROW_FILTERS
+from utils.data_utils import (
+    get_session_from_memory,
+    load_session_data,
+    session_cache,
+)
+from utils.memory_utils import session_index
 
 # Set root logger level explicitly
 logging.getLogger().setLevel(logging.INFO)
@@ -41,6 +51,22 @@ logging.getLogger().setLevel(logging.INFO)
 logger = logging.getLogger(__name__)
 logger.setLevel(logging.INFO)
 
+AVAILABLE_TOOLS = [
+    "detect_litigation",
+    "score_fraud_risk",
+    "analyze_risk_factors",
+    "build_loss_triangles",
+    "update_loss_triangles",
+    "calculate_reserves",
+    "monitor_development",
+]
+
+# Tools that read what another tool writes to memory run after it in a pipeline
+PIPELINE_DEPENDENCIES = {
+    "update_loss_triangles": ["build_loss_triangles"],
+    "calculate_reserves": ["build_loss_triangles", "update_loss_triangles"],
+}
+
 
 def lambda_handler(event, context):
     try:
@@ -86,200 +112,448 @@ def lambda_handler(event, context):
             if context_actor_id:
                 actor_id = context_actor_id
 
-        agentcore = boto3.client("bedrock-agentcore", region_name="us-east-1")
+        if tool_name == "run_pipeline":
+            return _run_pipeline(body, memory_id, actor_id, session_id)
 
-        try:
-            logger.info(f"Loading session data for session: {session_id}")
-            df = load_session_data(session_id)
-
-            if df is not None and not df.empty:
-                logger.info(
-                    f"Session data loaded successfully: {len(df)} records, {len(df.columns)} columns"
-                )
-                try:
-                    data_event = df.to_dict("records")
-                except Exception as convert_error:
-                    logger.error(
-                        f"Failed to convert DataFrame to records: {str(convert_error)}"
-                    )
-                    return {
-                        "statusCode": 500,
-                        "body": json.dumps(
-                            {
-                                "error": f"DataFrame conversion failed: {str(convert_error)}"
-                            }
-                        ),
-                    }
-            else:
+        if tool_name == "analyze_portfolio":
+            # Workers read the parquet files themselves; nothing is loaded here
+            session_info = get_session_from_memory(session_id) or {}
+            s3_path = session_info.get("s3_parquet_path")
+            if not s3_path:
                 return {
                     "statusCode": 404,
                     "body": json.dumps(
-                        {"error": f"No data found for session_id: {session_id}"}
+                        {"error": f"No parquet data for session_id: {session_id}"}
                     ),
                 }
-
-        except Exception as load_error:
+            result = portfolio_analysis.analyze_portfolio(
+                s3_path, body.get("tools"), body, body.get("portfolio_config")
+            )
             return {
-                "statusCode": 500,
-                "body": json.dumps(
-                    {"error": f"Failed to load session data: {str(load_error)}"}
-                ),
+                "statusCode": 200,
+                "body": json.dumps({"session_id": session_id, "result": result}),
             }
-        # Extract optional configuration parameters
-        fraud_config = body.get("fraud_config")
-        litigation_config = body.get("litigation_config")
-        monitoring_config = body.get("monitoring_config")
-
-        if tool_name == "detect_litigation":
-            logger.info("Executing litigation detection")
-            result = litigation_analysis.detect_litigation(
-                data_event, litigation_config
-            )
-        elif tool_name == "score_fraud_risk":
-            logger.info("Executing fraud risk scoring")
-            result = fraud_detection.score_fraud_risk(data_event, fraud_config)
-        elif tool_name == "analyze_risk_factors":
-            logger.info("Executing risk factor analysis")
-            result = risk_analysis.analyze_risk_factors(data_event)
-        elif tool_name == "build_loss_triangles":
-            logger.info("Executing loss triangle construction")
-            result = loss_reserving.build_loss_triangles(data_event)
-            logger.info(
-                f"Triangle construction result keys: {list(result.keys()) if isinstance(result, dict) else 'Not a dict'}"
-            )
 
-            if "incurred_triangle" in result and session_id:
-                logger.info("Storing triangle data in AgentCore memory")
-                try:
-                    triangle_result = {
-                        "event_type": "triangle_result",
-                        "session_id": session_id,
-                        "incurred_triangle": result.get("incurred_triangle", {}),
-                        "paid_triangle": result.get("paid_triangle", {}),
-                        "reserve_triangle": result.get("reserve_triangle", {}),
-                        "count_triangle": result.get("count_triangle", {}),
-                        "triangle_data": result.get("triangle_data", []),
-                    }
-
-                    agentcore.create_event(
-                        memoryId=memory_id,
-                        actorId=actor_id,
-                        sessionId=session_id,
-                        eventTimestamp=datetime.now(),
-                        payload=[{"blob": json.dumps(triangle_result)}],
-                    )
-                except Exception:
-                    pass
-        elif tool_name == "calculate_reserves":
-            logger.info("=== STARTING CALCULATE_RESERVES ===")
-            logger.info("Executing IBNR reserve calculation")
-            triangles_data = None
-
-            try:
-                logger.info("Looking for triangle data in AgentCore memory")
-                response = agentcore.list_events(
-                    memoryId=memory_id,
-                    actorId=actor_id,
-                    sessionId=session_id,
-                    maxResults=100,
-                )
-
-                events = response.get("events", [])
-                logger.info(f"Found {len(events)} events in memory")
-
-                for event_item in events:
-                    try:
-                        payload_blob = event_item.get("payload", [{}])[0].get(
-                            "blob", "{}"
-                        )
-                        event_data = json.loads(payload_blob)
-
-                        if event_data.get("event_type") == "triangle_result":
-                            triangles_data = event_data
-                            print("=== FOUND TRIANGLE DATA IN MEMORY ===")
-                            if (
-                                "incurred_triangle" in triangles_data
-                                and "data" in triangles_data["incurred_triangle"]
-                            ):
-                                sample_data = triangles_data["incurred_triangle"][
-                                    "data"
-                                ]
-                                if sample_data:
-                                    first_key = list(sample_data.keys())[0]
-                                    columns = (
-                                        list(sample_data[first_key].keys())
-                                        if sample_data[first_key]
-                                        else []
-                                    )
-                                    print(f"=== MEMORY TRIANGLE COLUMNS: {columns} ===")
-                            break
-                    except Exception:
-                        continue
-
-                if not triangles_data:
-                    # Build triangles first
-                    triangle_result = loss_reserving.build_loss_triangles(data_event)
-
-                    # Store triangle data for future use
-                    triangle_data_to_store = {
-                        "event_type": "triangle_result",
-                        "session_id": session_id,
-                        "incurred_triangle": triangle_result.get(
-                            "incurred_triangle", {}
-                        ),
-                        "paid_triangle": triangle_result.get("paid_triangle", {}),
-                        "reserve_triangle": triangle_result.get("reserve_triangle", {}),
-                        "count_triangle": triangle_result.get("count_triangle", {}),
-                        "triangle_data": triangle_result.get("triangle_data", []),
-                    }
-
-                    try:
-                        agentcore.create_event(
-                            memoryId=memory_id,
-                            actorId=actor_id,
-                            sessionId=session_id,
-                            eventTimestamp=datetime.now(),
-                            payload=[{"blob": json.dumps(triangle_data_to_store)}],
-                        )
-                        print(
-                            f"Stored new triangle data in AgentCore memory for session: {session_id}"
-                        )
-                        triangles_data = triangle_data_to_store
-                    except Exception as e:
-                        print(f"Warning: Could not store triangle data in memory: {e}")
-                        triangles_data = triangle_data_to_store  # Use it anyway
-
-            except Exception as memory_error:
-                print(f"Error retrieving triangle data from memory: {memory_error}")
-
-            result = loss_reserving.calculate_reserves(triangles_data)
-        elif tool_name == "monitor_development":
-            result = monitoring.monitor_development(data_event, monitoring_config)
-        else:
+        if tool_name not in AVAILABLE_TOOLS:
             return {
                 "statusCode": 400,
                 "body": json.dumps(
                     {
                         "error": f"Unknown tool: {tool_name}",
-                        "available_tools": [
-                            "detect_litigation",
-                            "score_fraud_risk",
-                            "analyze_risk_factors",
-                            "build_loss_triangles",
-                            "calculate_reserves",
-                            "monitor_development",
-                        ],
+                        "available_tools": AVAILABLE_TOOLS
+                        + ["run_pipeline", "analyze_portfolio"],
                     }
                 ),
             }
 
-        # Only store triangle data for calculate_reserves dependency
-        # All other tools are independent and don't need memory storage
+        columns = _tool_columns(tool_name, body, memory_id, actor_id, session_id)
+        data_event, error_response = _load_session_frame(
+            session_id, columns, SESSION_ROW_FILTERS.get(tool_name)
+        )
+        if error_response:
+            return error_response
+
+        result = _run_tool(tool_name, body, data_event, memory_id, actor_id, session_id)
 
         return {
             "statusCode": 200,
-            "body": json.dumps({"session_id": session_id, "result": result}),
+            "body": json.dumps(
+                {
+                    "session_id": session_id,
+                    "result": result,
+                    "metadata": {
+                        "session_cache": session_cache.stats(),
+                        "memory": session_cache.session_memory(session_id),
+                    },
+                }
+            ),
         }
 
     except Exception as e:
         return {"statusCode": 500, "body": json.dumps({"error": str(e)})}
+
+
+def _segment_by(body: dict) -> list[str] | None:
+    segment_by = body.get("segment_by") or None
+    if isinstance(segment_by, str):
+        segment_by = [segment_by]
+    return segment_by
+
+
+def _stored_segment_by(triangles: dict | None) -> list[str]:
+    """The segment columns of a stored triangle payload, or []."""
+    segments = (triangles or {}).get("triangles", {}).get("segments") or {}
+    return list(segments.get("by") or [])
+
+
+def _tool_columns(
+    tool_name: str, body: dict, memory_id: str, actor_id: str, session_id: str
+) -> list[str] | None:
+    """
+    The session columns a tool reads: its SESSION_COLUMNS projection plus the
+    columns it segments by, or None for every column. Triangle tools can build
+    one triangle per segment in a single pass; an update splits its delta by
+    the segments of the stored triangles it updates.
+    """
+    columns = SESSION_COLUMNS.get(tool_name)
+    if columns is None:
+        return None
+    segment_by = _segment_by(body) or []
+    if tool_name == "update_loss_triangles":
+        segment_by = _stored_segment_by(
+            session_index.latest(
+                memory_id,
+                actor_id,
+                body.get("triangle_session_id") or session_id,
+                "triangle_result",
+            )
+        )
+    return columns + [c for c in segment_by if c not in columns]
+
+
+def _load_session_frame(session_id, columns, filters):
+    """The session DataFrame, or an error response if it can't be loaded."""
+    try:
+        logger.info(f"Loading session data for session: {session_id}")
+        df = load_session_data(session_id, columns=columns, filters=filters)
+    except Exception as load_error:
+        return None, {
+            "statusCode": 500,
+            "body": json.dumps(
+                {"error": f"Failed to load session data: {str(load_error)}"}
+            ),
+        }
+
+    if df is None or df.empty:
+        return None, {
+            "statusCode": 404,
+            "body": json.dumps(
+                {"error": f"No data found for session_id: {session_id}"}
+            ),
+        }
+    logger.info(
+        f"Session data loaded successfully: {len(df)} records, {len(df.columns)} columns"
+    )
+    return df, None
+
+
+def _run_tool(
+    tool_name: str,
+    body: dict,
+    data_event,
+    memory_id: str,
+    actor_id: str,
+    session_id: str,
+    written_triangles: dict | None = None,
+):
+    """
+    Run one tool on the loaded session data and return its result.
+
+    written_triangles maps session ids to the triangle events written during
+    this invocation, so a pipeline's reserve step sees the triangles its build
+    step just stored without waiting for memory to list them.
+    """
+    if written_triangles is None:
+        written_triangles = {}
+    segment_by = _segment_by(body)
+
+    # Extract optional configuration parameters
+    fraud_config = body.get("fraud_config")
+    litigation_config = body.get("litigation_config")
+    monitoring_config = body.get("monitoring_config")
+    reserving_config = body.get("reserving_config")
+    risk_config = body.get("risk_config")
+
+    if tool_name == "detect_litigation":
+        logger.info("Executing litigation detection")
+        result = litigation_analysis.detect_litigation(
+            data_event, litigation_config, body.get("signals_output_path")
+        )
+    elif tool_name == "score_fraud_risk":
+        logger.info("Executing fraud risk scoring")
+        result = fraud_detection.score_fraud_risk(data_event, fraud_config)
+    elif tool_name == "analyze_risk_factors":
+        logger.info("Executing risk factor analysis")
+        result = risk_analysis.analyze_risk_factors(data_event, risk_config)
+    elif tool_name == "build_loss_triangles":
+        logger.info("Executing loss triangle construction")
+        result = loss_reserving.build_loss_triangles(
+            data_event, segment_by, body.get("legacy_view", False)
+        )
+        logger.info(
+            f"Triangle construction result keys: {list(result.keys()) if isinstance(result, dict) else 'Not a dict'}"
+        )
+
+        if "triangles" in result and session_id:
+            logger.info("Storing triangle data in AgentCore memory")
+            try:
+                triangle_result = {
+                    "event_type": "triangle_result",
+                    "session_id": session_id,
+                    "triangles": loss_reserving.recode_triangles(
+                        result["triangles"], compression="zlib"
+                    ),
+                }
+                written_triangles[session_id] = triangle_result
+
+                session_index.put_event(
+                    memory_id, actor_id, session_id, triangle_result
+                )
+            except Exception as e:
+                logger.warning(f"Could not store triangle data in memory: {e}")
+    elif tool_name == "update_loss_triangles":
+        logger.info("Executing incremental loss triangle update")
+        # The delta is this session's data; the triangle may live in another
+        triangle_session_id = body.get("triangle_session_id") or session_id
+        stored_triangles = written_triangles.get(
+            triangle_session_id
+        ) or session_index.latest(
+            memory_id, actor_id, triangle_session_id, "triangle_result"
+        )
+        if not stored_triangles:
+            result = {
+                "error": f"No stored triangles for session_id: {triangle_session_id}. Run build_loss_triangles first."
+            }
+        else:
+            retracted_claims = None
+            if body.get("retracted_session_id"):
+                columns = SESSION_COLUMNS[tool_name]
+                retracted_claims = load_session_data(
+                    body["retracted_session_id"],
+                    columns=columns
+                    + [
+                        c
+                        for c in _stored_segment_by(stored_triangles)
+                        if c not in columns
+                    ],
+                    filters=SESSION_ROW_FILTERS.get(tool_name),
+                )
+            result = loss_reserving.update_loss_triangles(
+                stored_triangles, data_event, retracted_claims
+            )
+
+        if "triangles" in result:
+            try:
+                updated_triangles = {
+                    "event_type": "triangle_result",
+                    "session_id": triangle_session_id,
+                    "triangles": loss_reserving.recode_triangles(
+                        result["triangles"], compression="zlib"
+                    ),
+                }
+                written_triangles[triangle_session_id] = updated_triangles
+                session_index.put_event(
+                    memory_id, actor_id, triangle_session_id, updated_triangles
+                )
+            except Exception as e:
+                logger.warning(f"Could not store updated triangle data: {e}")
+    elif tool_name == "calculate_reserves":
+        logger.info("=== STARTING CALCULATE_RESERVES ===")
+        logger.info("Executing IBNR reserve calculation")
+        triangles_data = None
+
+        try:
+            logger.info("Looking for triangle data in AgentCore memory")
+            triangles_data = written_triangles.get(session_id) or session_index.latest(
+                memory_id, actor_id, session_id, "triangle_result"
+            )
+            if triangles_data:
+                logger.info("Found triangle data in memory")
+                stored_segments = (
+                    triangles_data.get("triangles", {}).get("segments") or {}
+                ).get("by")
+                if segment_by and stored_segments != segment_by:
+                    logger.info(
+                        f"Stored triangles are segmented by {stored_segments}, rebuilding by {segment_by}"
+                    )
+                    triangles_data = None
+
+            if not triangles_data:
+                # Build triangles first
+                triangle_result = loss_reserving.build_loss_triangles(
+                    data_event, segment_by
+                )
+
+                # Store triangle data for future use
+                triangle_data_to_store = {
+                    "event_type": "triangle_result",
+                    "session_id": session_id,
+                    "triangles": loss_reserving.recode_triangles(
+                        triangle_result["triangles"], compression="zlib"
+                    ),
+                }
+                written_triangles[session_id] = triangle_data_to_store
+
+                try:
+                    session_index.put_event(
+                        memory_id, actor_id, session_id, triangle_data_to_store
+                    )
+                    logger.info(
+                        f"Stored new triangle data in AgentCore memory for session: {session_id}"
+                    )
+                    triangles_data = triangle_data_to_store
+                except Exception as e:
+                    logger.warning(f"Could not store triangle data in memory: {e}")
+                    triangles_data = triangle_data_to_store  # Use it anyway
+
+        except Exception as memory_error:
+            logger.error(f"Error retrieving triangle data from memory: {memory_error}")
+
+        result = loss_reserving.calculate_reserves(triangles_data, reserving_config)
+    elif tool_name == "monitor_development":
+        # KPI series are kept per portfolio, which defaults to the session
+        portfolio_id = body.get("portfolio_id") or session_id
+        kpi_history = None
+        try:
+            kpi_history = session_index.latest(
+                memory_id, actor_id, portfolio_id, "kpi_history"
+            )
+        except Exception as e:
+            logger.warning(f"Could not load KPI history: {e}")
+
+        result = monitoring.monitor_development(
+            data_event, monitoring_config, kpi_history
+        )
+
+        history = result.get("kpi_history")
+        if history and history.get("updated_at") != (kpi_history or {}).get(
+            "updated_at"
+        ):
+            try:
+                session_index.put_event(
+                    memory_id,
+                    actor_id,
+                    portfolio_id,
+                    {
+                        "event_type": "kpi_history",
+                        "portfolio_id": portfolio_id,
+                        **history,
+                    },
+                )
+            except Exception as e:
+                logger.warning(f"Could not store KPI history: {e}")
+
+    return result
+
+
+def _run_pipeline(body: dict, memory_id: str, actor_id: str, session_id: str):
+    """
+    Run several tools on one load of the session data.
+
+    body["tools"] lists tool names, or objects with a tool_name and the
+    parameters that tool takes (fraud_config, segment_by, ...), which override
+    the top-level ones. Tools run in stages ordered by PIPELINE_DEPENDENCIES;
+    the tools within a stage run concurrently on threads sharing the loaded
+    DataFrame, which none of them modify.
+    """
+    steps = []
+    for step in body.get("tools") or []:
+        step = {"tool_name": step} if isinstance(step, str) else dict(step)
+        steps.append((step.pop("tool_name", None), {**body, **step}))
+    tool_names = [name for name, _ in steps]
+    invalid = [name for name in tool_names if name not in AVAILABLE_TOOLS]
+    if not steps or invalid or len(set(tool_names)) < len(tool_names):
+        return {
+            "statusCode": 400,
+            "body": json.dumps(
+                {
+                    "error": "tools must list each pipeline tool once"
+                    + (f"; unknown tools: {invalid}" if invalid else ""),
+                    "available_tools": AVAILABLE_TOOLS,
+                }
+            ),
+        }
+
+    # One read covering every step: the union of their columns, and a row
+    # filter only when all steps share it (tools re-apply their own filters)
+    columns = []
+    for name, step_body in steps:
+        step_columns = _tool_columns(name, step_body, memory_id, actor_id, session_id)
+        if step_columns is None:
+            columns = None
+            break
+        columns += step_columns
+    if columns is not None:
+        columns = list(dict.fromkeys(columns))
+    filters = {repr(SESSION_ROW_FILTERS.get(name)) for name in tool_names}
+    shared_filter = (
+        SESSION_ROW_FILTERS.get(tool_names[0]) if len(filters) == 1 else None
+    )
+
+    started = time.perf_counter()
+    data_event, error_response = _load_session_frame(session_id, columns, shared_filter)
+    if error_response:
+        return error_response
+    timings = {"load_session": time.perf_counter() - started}
+
+    stages = _pipeline_stages(tool_names)
+    step_bodies = dict(steps)
+    written_triangles = {}
+    results = {}
+
+    def run_step(name):
+        step_started = time.perf_counter()
+        try:
+            result = _run_tool(
+                name,
+                step_bodies[name],
+                data_event,
+                memory_id,
+                actor_id,
+                session_id,
+                written_triangles,
+            )
+        except Exception as e:
+            logger.error(f"Pipeline step {name} failed: {e}")
+            result = {"error": f"{name} failed: {str(e)}"}
+        return result, time.perf_counter() - step_started
+
+    max_workers = body.get("max_workers") or PIPELINE_CONFIG["MAX_WORKERS"]
+    with ThreadPoolExecutor(
+        max_workers=max(1, min(max_workers, max(map(len, stages))))
+    ) as pool:
+        for stage in stages:
+            logger.info(f"Running pipeline stage: {stage}")
+            futures = {name: pool.submit(run_step, name) for name in stage}
+            for name, future in futures.items():
+                results[name], timings[name] = future.result()
+    timings["total"] = time.perf_counter() - started
+
+    return {
+        "statusCode": 200,
+        "body": json.dumps(
+            {
+                "session_id": session_id,
+                "result": {
+                    "results": {name: results[name] for name in tool_names},
+                    "stages": stages,
+                    "timings_seconds": timings,
+                },
+                "metadata": {
+                    "session_cache": session_cache.stats(),
+                    "memory": session_cache.session_memory(session_id),
+                },
+            }
+        ),
+    }
+
+
+def _pipeline_stages(tool_names: list[str]) -> list[list[str]]:
+    """
+    Group tool_names into stages that can each run concurrently, every tool
+    after the requested tools it depends on.
+    """
+    stages, done, pending = [], set(), list(tool_names)
+    while pending:
+        stage = [
+            name
+            for name in pending
+            if all(
+                dependency in done or dependency not in tool_names
+                for dependency in PIPELINE_DEPENDENCIES.get(name, [])
+            )
+        ]
+        stages.append(stage)
+        done.update(stage)
+        pending = [name for name in pending if name not in done]
+    return stages
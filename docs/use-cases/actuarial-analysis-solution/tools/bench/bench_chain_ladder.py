@@ -0,0 +1,151 @@
+"""
+Chain ladder benchmark: the vectorized Triangle engine against the loops it
+replaced.
+
+loop_chain_ladder is the previous calculate_chain_ladder algorithm
+(per-origin .loc lookups, string factor keys, sorted_columns.index), given
+a frame with accident years as rows and the ages a year has not reached left
+missing rather than zero-filled, as observed_mask does for the engine. Each
+run first checks that both give the same factors, ultimates and IBNR, then
+times the loops, the service call per triangle and one chain_ladder_arrays
+call over all lines of business.
+
+    python bench/bench_chain_ladder.py
+"""
+
+import argparse
+import sys
+import time
+from pathlib import Path
+
+import numpy as np
+import pandas as pd
+
+sys.path.insert(0, str(Path(__file__).resolve().parents[1]))
+
+from loss_reserving import (  # noqa: E402
+    LossReservingService,
+    Triangle,
+    chain_ladder_arrays,
+    observed_mask,
+)
+
+SHAPES = [(10, 200), (30, 50), (60, 20), (100, 10)]
+
+
+def random_triangle(rng, size: int, holes: float = 0.05) -> dict:
+    """Nested incremental triangle; later accident years have fewer ages."""
+    return {
+        2000 + i: {
+            j + 1: float(rng.gamma(2, 1e4)) if rng.random() > holes else 0.0
+            for j in range(size - i)
+        }
+        for i in range(size)
+    }
+
+
+def loop_chain_ladder(nested: dict) -> dict:
+    incurred_df = pd.DataFrame.from_dict(nested, orient="index")
+    incurred_cumulative = incurred_df.cumsum(axis=1)
+
+    development_factors = {}
+    sorted_columns = sorted(incurred_cumulative.columns)
+    for col_idx in range(len(sorted_columns) - 1):
+        current_col = sorted_columns[col_idx]
+        next_col = sorted_columns[col_idx + 1]
+        current_values = incurred_cumulative[current_col]
+        next_values = incurred_cumulative[next_col]
+        valid_mask = (current_values > 0) & (next_values > 0)
+        if valid_mask.sum() > 0:
+            current_valid = current_values[valid_mask]
+            next_valid = next_values[valid_mask]
+            if current_valid.sum() > 0:
+                factor = next_valid.sum() / current_valid.sum()
+                development_factors[f"{current_col}-{next_col}"] = factor
+
+    ultimate_values = {}
+    ibnr_values = {}
+    for accident_year in incurred_cumulative.index:
+        year_data = incurred_cumulative.loc[accident_year]
+        latest_value = 0
+        latest_period = None
+        for period in reversed(sorted_columns):
+            if year_data[period] > 0:
+                latest_value = year_data[period]
+                latest_period = period
+                break
+        if latest_value > 0 and latest_period is not None:
+            ultimate = latest_value
+            current_period_idx = sorted_columns.index(latest_period)
+            for col_idx in range(current_period_idx, len(sorted_columns) - 1):
+                factor_key = f"{sorted_columns[col_idx]}-{sorted_columns[col_idx + 1]}"
+                if factor_key in development_factors:
+                    ultimate *= development_factors[factor_key]
+            ultimate *= 1.10 if current_period_idx < len(sorted_columns) - 2 else 1.05
+            ultimate_values[str(accident_year)] = ultimate
+            ibnr_values[str(accident_year)] = max(0, ultimate - latest_value)
+        else:
+            ultimate_values[str(accident_year)] = 0
+            ibnr_values[str(accident_year)] = 0
+
+    return {
+        "development_factors": development_factors,
+        "ultimate_values": ultimate_values,
+        "ibnr_values": ibnr_values,
+    }
+
+
+def check_equal(loops: dict, vectorized: dict) -> None:
+    for key in ("development_factors", "ultimate_values", "ibnr_values"):
+        expected, actual = loops[key], vectorized[key]
+        assert list(expected) == list(actual), key
+        np.testing.assert_allclose(
+            list(actual.values()), list(expected.values()), rtol=1e-12, atol=1e-6
+        )
+
+
+def timed(function) -> float:
+    started = time.perf_counter()
+    function()
+    return (time.perf_counter() - started) * 1000
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[1])
+    parser.add_argument("--seed", type=int, default=0)
+    args = parser.parse_args()
+
+    rng = np.random.default_rng(args.seed)
+    service = LossReservingService()
+    print(f"{'triangles':>18s} {'loops':>10s} {'per triangle':>13s} {'batched':>9s}")
+    for size, lines in SHAPES:
+        nested = [random_triangle(rng, size) for _ in range(lines)]
+        payloads = [{"incurred_triangle": {"data": data}} for data in nested]
+        for data, payload in zip(nested, payloads, strict=True):
+            check_equal(
+                loop_chain_ladder(data), service.calculate_chain_ladder(payload)
+            )
+
+        triangles = [Triangle.from_dict(data) for data in nested]
+        cumulative = np.stack([triangle.cumulative() for triangle in triangles])
+        # Every line of business shares one evaluation date
+        observed = np.logical_or.reduce([observed_mask(t) for t in triangles])
+        loops = timed(lambda nested=nested: [loop_chain_ladder(d) for d in nested])
+        per_triangle = timed(
+            lambda payloads=payloads: [
+                service.calculate_chain_ladder(p) for p in payloads
+            ]
+        )
+        batched = timed(
+            lambda cumulative=cumulative, observed=observed: chain_ladder_arrays(
+                cumulative, observed
+            )
+        )
+        print(
+            f"{size:>3d}x{size:<3d} x {lines:>3d} LOBs {loops:>8.0f}ms {per_triangle:>11.1f}ms "
+            f"{batched:>7.2f}ms"
+        )
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,122 @@
+"""
+Keyword matching benchmark: KeywordMatcher against one `term in text` scan
+per term.
+
+Matches the fraud and litigation term categories over short synthetic claim
+texts and long adjuster notes, per text (match) and per column (matches), and
+reports texts/s and term hits/s; category_masks (the per-category flags the
+fraud scorer reads) is timed as well. Every matcher result is checked against the
+per-term scans first.
+
+    python bench/bench_keyword_matcher.py --texts 50000
+"""
+
+import argparse
+import sys
+import time
+from pathlib import Path
+
+sys.path.insert(0, str(Path(__file__).resolve().parents[1]))
+
+from claims import make_adjuster_notes, make_claims  # noqa: E402
+from utils.constants import (  # noqa: E402
+    FRAUD_TEXT_CATEGORIES,
+    LITIGATION_DEMAND_TERMS,
+    LITIGATION_DISCOVERY_TERMS,
+    LITIGATION_FRICTION_TERMS,
+    LITIGATION_GENERIC_TERMS,
+    LITIGATION_STRONG_SIGNALS,
+    LITIGATION_SUIT_TERMS,
+)
+from utils.keyword_matcher import KeywordMatcher  # noqa: E402
+
+CATEGORIES = {
+    "litigation": {
+        "generic": LITIGATION_GENERIC_TERMS,
+        "rep": LITIGATION_STRONG_SIGNALS,
+        "suit": LITIGATION_SUIT_TERMS,
+        "friction": LITIGATION_FRICTION_TERMS,
+        "discovery": LITIGATION_DISCOVERY_TERMS,
+        "demand": LITIGATION_DEMAND_TERMS,
+    },
+    "fraud": FRAUD_TEXT_CATEGORIES,
+}
+
+
+def scan(categories: dict[str, list[str]], text: str) -> dict[str, list[str]]:
+    """The per-term scans the services used to run on each text."""
+    return {
+        name: hits
+        for name, terms in categories.items()
+        if (hits := [term for term in terms if term in text])
+    }
+
+
+def short_texts(n: int) -> list[str]:
+    claims = make_claims(n, seed=5)
+    columns = ("claimantname", "note_text", "lossdescription", "injurydescription")
+    return [
+        " ".join(parts).lower()
+        for parts in zip(*(claims[c].astype(str) for c in columns), strict=True)
+    ]
+
+
+def timed(function):
+    started = time.perf_counter()
+    result = function()
+    return result, time.perf_counter() - started
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[1])
+    parser.add_argument("--texts", type=int, default=50_000)
+    args = parser.parse_args()
+
+    corpora = {
+        "short claim texts": short_texts(args.texts),
+        "long adjuster notes": make_adjuster_notes(args.texts, seed=3),
+    }
+    for corpus, texts in corpora.items():
+        length = sum(map(len, texts)) / len(texts)
+        print(f"{corpus}: {len(texts):,} texts, {length:.0f} chars on average")
+        for service, categories in CATEGORIES.items():
+            matcher = KeywordMatcher(categories)
+            expected, scan_seconds = timed(
+                lambda texts=texts, c=categories: [scan(c, t) for t in texts]
+            )
+            per_text, text_seconds = timed(
+                lambda texts=texts, m=matcher: [m.match(t) for t in texts]
+            )
+            per_column, column_seconds = timed(
+                lambda texts=texts, m=matcher: m.matches(texts)
+            )
+            masks, mask_seconds = timed(
+                lambda texts=texts, m=matcher: m.category_masks(texts)
+            )
+            assert per_text == expected and per_column == expected, service
+            assert all(
+                masks[name][i] == (name in found)
+                for i, found in enumerate(expected)
+                for name in categories
+            ), service
+
+            hits = sum(len(h) for found in expected for h in found.values())
+            terms = sum(map(len, categories.values()))
+            print(f"  {service} ({terms} terms, {hits:,} hits)")
+            for label, seconds in (
+                ("per-term scans", scan_seconds),
+                ("matcher per text", text_seconds),
+                ("matcher per column", column_seconds),
+            ):
+                print(
+                    f"    {label:20s} {len(texts) / seconds:>10,.0f} texts/s "
+                    f"{hits / seconds:>12,.0f} matches/s"
+                )
+            # Flags only: no per-term hits to count
+            print(
+                f"    {'category masks':20s} {len(texts) / mask_seconds:>10,.0f} texts/s"
+            )
+
+
+if __name__ == "__main__":
+    main()
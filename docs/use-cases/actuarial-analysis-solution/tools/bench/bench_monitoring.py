@@ -0,0 +1,63 @@
+"""
+Monitoring benchmark: monitor_development on a large session.
+
+Times MonitoringService._aggregate (the single aggregation stage every KPI
+and dashboard figure is read from) and _report separately, then the whole
+monitor_development call on the normalized session and on the raw frame
+(string dates, object columns) a list-of-dicts payload would give.
+
+    python bench/bench_monitoring.py --rows 1000000
+"""
+
+import argparse
+import logging
+import sys
+import time
+from pathlib import Path
+
+sys.path.insert(0, str(Path(__file__).resolve().parents[1]))
+
+from claims import make_claims  # noqa: E402
+from monitoring import MonitoringService, monitor_development  # noqa: E402
+from utils.data_utils import normalize_session_frame  # noqa: E402
+
+
+def best_of(repeat: int, function) -> float:
+    timings = []
+    for _ in range(repeat):
+        started = time.perf_counter()
+        function()
+        timings.append(time.perf_counter() - started)
+    return min(timings)
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[1])
+    parser.add_argument("--rows", type=int, default=1_000_000)
+    parser.add_argument("--repeat", type=int, default=3)
+    args = parser.parse_args()
+
+    # The default monitoring config logs its missing loss_ratio threshold
+    logging.disable(logging.CRITICAL)
+    raw = make_claims(args.rows)
+    df = normalize_session_frame(raw.copy())
+    service = MonitoringService()
+    aggregates = service._aggregate(df.copy(deep=False))
+
+    timings = {
+        "aggregate": best_of(
+            args.repeat, lambda: service._aggregate(df.copy(deep=False))
+        ),
+        "report": best_of(args.repeat, lambda: service._report(aggregates, None)),
+        "monitor_development": best_of(args.repeat, lambda: monitor_development(df)),
+        "  on the raw frame": best_of(args.repeat, lambda: monitor_development(raw)),
+    }
+    print(f"{args.rows:,} claims, best of {args.repeat}")
+    for stage, seconds in timings.items():
+        # _report reads only the aggregates, so it has no per-row rate
+        rate = "" if stage == "report" else f"{args.rows / seconds:>12,.0f} rows/s"
+        print(f"  {stage:20s} {seconds * 1000:9.1f}ms {rate}")
+
+
+if __name__ == "__main__":
+    main()
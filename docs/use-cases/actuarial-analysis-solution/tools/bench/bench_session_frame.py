@@ -0,0 +1,78 @@
+"""
+Session hand-off benchmark: the typed DataFrame against list-of-dicts records.
+
+Runs build_loss_triangles, monitor_development, analyze_risk_factors and
+detect_litigation on one synthetic session, handing it over either as the
+normalized DataFrame (what the handler does) or as df.to_dict("records")
+(the compatibility path every tool used to take). Each mode runs in its own
+process so peak RSS is measured per mode.
+
+    python bench/bench_session_frame.py --rows 300000
+"""
+
+import argparse
+import logging
+import resource
+import subprocess
+import sys
+import time
+from pathlib import Path
+
+sys.path.insert(0, str(Path(__file__).resolve().parents[1]))
+
+TOOLS = (
+    "build_loss_triangles",
+    "monitor_development",
+    "analyze_risk_factors",
+    "detect_litigation",
+)
+
+
+def run(mode: str, rows: int) -> None:
+    import litigation_analysis
+    import loss_reserving
+    import monitoring
+    import risk_analysis
+    from claims import make_claims
+    from utils.data_utils import normalize_session_frame
+
+    # The default monitoring config logs its missing loss_ratio threshold
+    logging.disable(logging.CRITICAL)
+    df = make_claims(rows)
+    started = time.perf_counter()
+    if mode == "records":
+        data = df.to_dict("records")
+    else:
+        data = normalize_session_frame(df)
+    loss_reserving.build_loss_triangles(data)
+    monitoring.monitor_development(data)
+    risk_analysis.analyze_risk_factors(data)
+    litigation_analysis.detect_litigation(data)
+    elapsed = time.perf_counter() - started
+
+    peak_mb = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss / 1024
+    print(
+        f"{mode:8s} {elapsed:7.2f}s  {rows * len(TOOLS) / elapsed:>10,.0f} rows/s  "
+        f"peak RSS {peak_mb:,.0f} MB"
+    )
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[1])
+    parser.add_argument("--rows", type=int, default=300_000)
+    parser.add_argument("--mode", choices=["frame", "records"])
+    args = parser.parse_args()
+
+    if args.mode:
+        run(args.mode, args.rows)
+        return
+    print(f"{args.rows:,} claims, tools: {', '.join(TOOLS)}")
+    for mode in ("records", "frame"):
+        subprocess.run(
+            [sys.executable, __file__, "--mode", mode, "--rows", str(args.rows)],
+            check=True,
+        )
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,102 @@
+"""Synthetic claims sessions for the benchmarks in this directory."""
+
+import numpy as np
+import pandas as pd
+
+NOTES = [
+    "Claimant represented by counsel, demand letter received for policy limits demand",
+    "Insured reports rear end collision in heavy rain, soft tissue whiplash complaint",
+    "Vehicle is a total loss, write off approved",
+    "Adjuster notes inconsistent statements, suspicious staged accident",
+    "Lawsuit filed, served with summons and complaint, deposition scheduled",
+    "Coverage denied after fraud investigation, formal complaint filed",
+    "Minor fender bender in parking lot, no injuries",
+    "Black ice on highway, multi vehicle pileup, neck and back injuries",
+    "Claimant's attorney sent letter; settlement demand pending",
+    "Routine glass claim, windshield replaced",
+]
+
+FILLER = [
+    "Called insured to confirm details of the loss and obtained recorded statement.",
+    "Vehicle inspected at body shop; estimate received and reviewed against photos.",
+    "Rental coverage confirmed for 14 days, reimbursement pending receipts.",
+    "Police report requested from county sheriff, awaiting response.",
+    "Medical bills received from urgent care and physical therapy provider.",
+    "Reviewed policy declarations, collision deductible applies.",
+    "Left voicemail for claimant, will follow up in two business days.",
+]
+
+
+def make_claims(n: int, seed: int = 0) -> pd.DataFrame:
+    """
+    n claims shaped like an Athena session pull: string dates, float amounts
+    with some missing values, low-cardinality labels and short note text.
+    """
+    rng = np.random.default_rng(seed)
+    policy = pd.Timestamp("2015-01-01") + pd.to_timedelta(
+        rng.integers(0, 3650, n), unit="D"
+    )
+    reported = policy + pd.to_timedelta(rng.integers(0, 1500, n), unit="D")
+    incurred = np.round(rng.lognormal(8.5, 1.3, n), 2)
+    incurred[rng.random(n) < 0.03] = 0.0
+    paid = np.round(incurred * rng.uniform(0, 1.2, n), 2)
+    round_paid = rng.random(n) < 0.05
+    paid[round_paid] = rng.integers(1, 80, round_paid.sum()) * 1000.0
+    df = pd.DataFrame(
+        {
+            "claimnumber": [f"CLM{i:08d}" for i in range(n)],
+            "policyeffectivedate": policy.strftime("%Y-%m-%d"),
+            "note_date": reported.strftime("%Y-%m-%d"),
+            "totalincurred": incurred,
+            "paidtotal": paid,
+            "reservetotal": np.round(np.maximum(incurred - paid, 0), 2),
+            "medpdtotal": np.round(incurred * rng.uniform(0, 1, n), 2),
+            "driverage": rng.integers(16, 90, n).astype(float),
+            "vehicleyear": rng.integers(2000, 2026, n).astype(float),
+            "bodypartproductcode": rng.choice(
+                ["HEAD", "L2", "ARM", "LEG", "SPINE", None], n
+            ),
+            "losstype": rng.choice(["3PTY BI", "COLL", "COMP", "PD"], n),
+            "lineofbusiness": rng.choice(
+                ["Auto", "Property", "Liability", "Commercial Auto"], n
+            ),
+            "claimstatus": rng.choice(
+                ["Open", "Closed", "Close", "Settled", "Reopened"], n
+            ),
+            "causeofloss": rng.choice(
+                ["Collision", "Hail", "Theft", "Fire", "Flood", "Other"], n
+            ),
+            "garagestate": rng.choice(["CA", "TX", "NY", "FL", "IL", "WA"], n),
+            "accidentstate": rng.choice(["CA", "TX", "NY", "FL", "IL", "WA"], n),
+            "note_text": rng.choice(NOTES, n),
+            "lossdescription": rng.choice(
+                [
+                    "rear end",
+                    "hail damage",
+                    "theft of vehicle",
+                    "total loss fire",
+                    None,
+                ],
+                n,
+            ),
+            "injurydescription": rng.choice(
+                ["whiplash sprain", "head trauma", "back strain", "none", None], n
+            ),
+            "claimantname": rng.choice(["John Smith", "Jane Doe", "Acme Corp"], n),
+        }
+    )
+    df.loc[rng.random(n) < 0.02, "paidtotal"] = np.nan
+    df.loc[rng.random(n) < 0.02, "driverage"] = np.nan
+    return df
+
+
+def make_adjuster_notes(n: int, seed: int = 0) -> list[str]:
+    """Long lower-case adjuster notes; about 30% mention a claim-note signal."""
+    rng = np.random.default_rng(seed)
+    notes = []
+    for _ in range(n):
+        sentences = rng.choice(FILLER, rng.integers(6, 13)).tolist()
+        if rng.random() < 0.3:
+            sentences.append(rng.choice(NOTES))
+        notes.append(" ".join(sentences).lower())
+    return notes
@@ -21,14 +21,28 @@ Used for data exploration and preparation before actuarial analysis.
 import json
 import logging
 import os
+import random
 import time
 import uuid
 from datetime import datetime
 from typing import Any
 
-import awswrangler as wr
 import boto3
-from utils.data_utils import store_session_metadata
+from utils.constants import (
+    ATHENA_POLL_CONFIG,
+    ATHENA_STATISTICS_FIELDS,
+    GLUE_CATALOG_CONFIG,
+    QUERY_CACHE_CONFIG,
+)
+from utils.data_utils import store_session_metadata, summarize_parquet_output
+from utils.glue_catalog import GlueCatalog
+from utils.query_cache import (
+    QueryResultRegistry,
+    nondeterministic_functions,
+    query_cache_key,
+    referenced_tables,
+    table_versions,
+)
 
 # Set up logging
 # Set root logger level explicitly
@@ -41,6 +55,15 @@ logger.setLevel(logging.INFO)
 # Initialize AWS clients
 athena = boto3.client("athena")
 s3 = boto3.client("s3")
+glue = boto3.client("glue")
+catalog = GlueCatalog(
+    glue,
+    ttl_seconds=float(
+        os.environ.get("GLUE_CATALOG_TTL_SECONDS", GLUE_CATALOG_CONFIG["TTL_SECONDS"])
+    ),
+)
+
+_query_registries: dict[str, QueryResultRegistry] = {}
 
 # Environment variables
 AGENTCORE_MEMORY_ID = os.environ.get("AGENTCORE_MEMORY_ID")
@@ -52,22 +75,16 @@ def list_tables() -> dict[str, Any]:
     try:
         database_name = os.environ.get("ATHENA_DATABASE", "claims_db")
 
-        # Use Glue to list tables
-        glue = boto3.client("glue")
-
-        # First check if database exists
         try:
-            glue.get_database(Name=database_name)
+            table_list = catalog.list_tables(database_name)
         except Exception as db_error:
             return {
                 "success": False,
                 "error": f'Database "{database_name}" not found. Error: {str(db_error)}. The Glue database may not be created yet.',
             }
 
-        response = glue.get_tables(DatabaseName=database_name)
-
         tables = []
-        for table in response.get("TableList", []):
+        for table in table_list:
             tables.append(
                 {
                     "name": table["Name"],
@@ -92,69 +109,111 @@ def list_tables() -> dict[str, Any]:
         return {"success": False, "error": f"Failed to list tables: {str(e)}"}
 
 
-def describe_table() -> dict[str, Any]:
-    """Describes the structure of the default table"""
+def _table_description(table: dict[str, Any]) -> dict[str, Any]:
+    storage = table.get("StorageDescriptor", {})
+    return {
+        "table_name": table["Name"],
+        "columns": [
+            {
+                "name": col["Name"],
+                "type": col["Type"],
+                "comment": col.get("Comment", ""),
+            }
+            for col in storage.get("Columns", [])
+        ],
+        "location": storage.get("Location", ""),
+        "input_format": storage.get("InputFormat", ""),
+        "output_format": storage.get("OutputFormat", ""),
+    }
+
+
+def _database_error(database_name: str, db_error: Exception) -> str:
+    return f'Database "{database_name}" not found. Error: {str(db_error)}'
+
+
+def _missing_table_error(database_name: str, table_names: list[str]) -> str:
     try:
-        database_name = os.environ.get("ATHENA_DATABASE", "claims_db")
-        table_name = os.environ.get("DEFAULT_TABLE_NAME", "claims")
+        available_tables = [t["Name"] for t in catalog.list_tables(database_name)]
+    except Exception as db_error:
+        return _database_error(database_name, db_error)
 
-        # Use Glue to get table details
-        glue = boto3.client("glue")
+    if not available_tables:
+        return f'No tables found in database "{database_name}". The Glue crawler may not have run yet. Please run the crawler first or check if data exists in S3.'
 
-        # First check if database exists and list available tables
-        try:
-            glue.get_database(Name=database_name)
-            tables_response = glue.get_tables(DatabaseName=database_name)
-            available_tables = [t["Name"] for t in tables_response.get("TableList", [])]
-        except Exception as db_error:
+    missing = ", ".join(f'"{name}"' for name in table_names)
+    return f'Table {missing} not found in database "{database_name}". Available tables: {", ".join(available_tables)}'
+
+
+def describe_table(
+    table_name: str | None = None, table_names: list[str] | None = None
+) -> dict[str, Any]:
+    """
+    Describes the structure of a table (the default table if none is given).
+    With table_names, describes several tables in one request.
+    """
+    try:
+        database_name = os.environ.get("ATHENA_DATABASE", "claims_db")
+
+        if table_names:
+            try:
+                tables, missing = catalog.get_tables(database_name, table_names)
+            except Exception as db_error:
+                return {
+                    "success": False,
+                    "error": _database_error(database_name, db_error),
+                }
+            if not tables:
+                return {
+                    "success": False,
+                    "error": _missing_table_error(database_name, missing),
+                }
             return {
-                "success": False,
-                "error": f'Database "{database_name}" not found. Error: {str(db_error)}',
+                "success": True,
+                "database_name": database_name,
+                "tables": [_table_description(table) for table in tables],
+                "missing_tables": missing,
             }
 
-        if not available_tables:
+        table_name = table_name or os.environ.get("DEFAULT_TABLE_NAME", "claims")
+        try:
+            table = catalog.get_table(database_name, table_name)
+        except glue.exceptions.EntityNotFoundException:
             return {
                 "success": False,
-                "error": f'No tables found in database "{database_name}". The Glue crawler may not have run yet. Please run the crawler first or check if data exists in S3.',
+                "error": _missing_table_error(database_name, [table_name]),
             }
-
-        if table_name not in available_tables:
+        except Exception as db_error:
             return {
                 "success": False,
-                "error": f'Table "{table_name}" not found in database "{database_name}". Available tables: {", ".join(available_tables)}',
+                "error": _database_error(database_name, db_error),
             }
 
-        response = glue.get_table(DatabaseName=database_name, Name=table_name)
-
-        table = response["Table"]
-        columns = []
-
-        for col in table.get("StorageDescriptor", {}).get("Columns", []):
-            columns.append(
-                {
-                    "name": col["Name"],
-                    "type": col["Type"],
-                    "comment": col.get("Comment", ""),
-                }
-            )
-
         return {
             "success": True,
-            "table_name": table_name,
             "database_name": database_name,
-            "columns": columns,
-            "location": table.get("StorageDescriptor", {}).get("Location", ""),
-            "input_format": table.get("StorageDescriptor", {}).get("InputFormat", ""),
-            "output_format": table.get("StorageDescriptor", {}).get("OutputFormat", ""),
+            **_table_description(table),
         }
 
     except Exception as e:
         return {"success": False, "error": f"Failed to describe table: {str(e)}"}
 
 
-def wait_for_athena_query(athena, query_execution_id, delay=1, max_attempts=300):
-    attempts = 0
-    while attempts < max_attempts:
+def wait_for_athena_query(
+    athena,
+    query_execution_id,
+    initial_delay=ATHENA_POLL_CONFIG["INITIAL_DELAY"],
+    max_delay=ATHENA_POLL_CONFIG["MAX_DELAY"],
+    timeout=ATHENA_POLL_CONFIG["TIMEOUT_SECONDS"],
+):
+    """
+    Poll an Athena query until it finishes, starting fast and backing off.
+    The delay grows by ATHENA_POLL_CONFIG["BACKOFF"] up to max_delay with
+    jitter, and polling stops once timeout seconds have elapsed overall.
+    Returns the final get_query_execution response.
+    """
+    deadline = time.monotonic() + timeout
+    delay = initial_delay
+    while True:
         try:
             result = athena.get_query_execution(QueryExecutionId=query_execution_id)
             status = result["QueryExecution"]["Status"]["State"]
@@ -169,24 +228,81 @@ def wait_for_athena_query(athena, query_execution_id, delay=1, max_attempts=300)
             )
             raise RuntimeError(f"Athena query {status}: {error_reason}")
 
-        attempts += 1
-        time.sleep(delay)
-
-    raise TimeoutError("Timed out waiting for Athena query to complete")
-
-
-def run_query(query: str, natural_language_description: str = "") -> dict[str, Any]:
-    """Executes SQL query using UNLOAD to S3 and stores path in memory"""
+        remaining = deadline - time.monotonic()
+        if remaining <= 0:
+            break
+        time.sleep(min(remaining, delay * random.uniform(0.5, 1.0)))
+        delay = min(max_delay, delay * ATHENA_POLL_CONFIG["BACKOFF"])
+
+    raise TimeoutError(
+        f"Timed out after {timeout}s waiting for Athena query {query_execution_id}"
+    )
+
+
+def _query_registry(bucket_path: str) -> QueryResultRegistry:
+    bucket = bucket_path.replace("s3://", "").split("/", 1)[0]
+    if bucket not in _query_registries:
+        _query_registries[bucket] = QueryResultRegistry(
+            s3,
+            bucket,
+            ttl_seconds=float(
+                os.environ.get(
+                    "QUERY_CACHE_TTL_SECONDS", QUERY_CACHE_CONFIG["TTL_SECONDS"]
+                )
+            ),
+        )
+    return _query_registries[bucket]
+
+
+def run_query(
+    query: str, natural_language_description: str = "", use_cache: bool = True
+) -> dict[str, Any]:
+    """
+    Executes SQL query using UNLOAD to S3 and stores path in memory.
+    A query that normalizes to one already run against unchanged tables within
+    the cache TTL returns the earlier session instead, unless it calls a
+    non-deterministic function such as now(); use_cache=False forces a fresh
+    UNLOAD.
+    """
     try:
-        # Generate session ID
-        session_id = str(uuid.uuid4())
-
         # Use UNLOAD to export to S3
         athena_output_location = os.environ.get(
             "ATHENA_OUTPUT_LOCATION",
             "s3://actuarial-athena-results-us-east-1/query-results/",
         )
         bucket_path = athena_output_location.split("/query-results/")[0]
+        database_name = os.environ.get("ATHENA_DATABASE", "claims_db")
+
+        registry = _query_registry(bucket_path)
+        cache_key = query_cache_key(query, database_name)
+        # versions None disables result reuse for this query
+        versions = None
+        nondeterministic = nondeterministic_functions(query)
+        if nondeterministic:
+            logger.info(f"Query result reuse skipped, query calls {nondeterministic}")
+        else:
+            try:
+                versions = table_versions(glue, referenced_tables(query, database_name))
+            except Exception as e:
+                logger.warning(f"Query result reuse disabled, Glue lookup failed: {e}")
+
+        if use_cache and versions is not None:
+            cached = registry.get(cache_key, versions)
+            if cached:
+                logger.info(
+                    f"Reusing session {cached['session_id']} for repeated query"
+                )
+                return {
+                    **cached["result"],
+                    "query": query,
+                    "cached": True,
+                    "cached_at": datetime.fromtimestamp(
+                        cached["created_at"]
+                    ).isoformat(),
+                }
+
+        # Generate session ID
+        session_id = str(uuid.uuid4())
         s3_output_path = f"{bucket_path}/unload/{session_id}/"
 
         # Create UNLOAD query
@@ -199,9 +315,7 @@ def run_query(query: str, natural_language_description: str = "") -> dict[str, A
         # Execute UNLOAD query
         response = athena.start_query_execution(
             QueryString=unload_query,
-            QueryExecutionContext={
-                "Database": os.environ.get("ATHENA_DATABASE", "claims_db")
-            },
+            QueryExecutionContext={"Database": database_name},
             WorkGroup=os.environ.get("ATHENA_WORKGROUP", "primary"),
             ResultConfiguration={"OutputLocation": athena_output_location},
         )
@@ -210,7 +324,7 @@ def run_query(query: str, natural_language_description: str = "") -> dict[str, A
 
         # Wait for query completion
         try:
-            wait_for_athena_query(athena, query_execution_id)
+            execution = wait_for_athena_query(athena, query_execution_id)
         except (RuntimeError, TimeoutError) as e:
             return {
                 "event_type": "error",
@@ -218,71 +332,69 @@ def run_query(query: str, natural_language_description: str = "") -> dict[str, A
                 "error": str(e),
                 "query_execution_id": query_execution_id,
             }
-        # Get row count from S3 files
-        s3_path_parts = s3_output_path.replace("s3://", "").split("/", 1)
-        bucket = s3_path_parts[0]
-        prefix = s3_path_parts[1]
+        statistics = execution["QueryExecution"].get("Statistics", {})
+        logger.info(f"Athena query {query_execution_id} statistics: {statistics}")
 
-        s3 = boto3.client("s3")
+        # Exact row count and schema from the parquet footers of the output files
         try:
-            objects = s3.list_objects_v2(Bucket=bucket, Prefix=prefix)
+            summary = summarize_parquet_output(s3_output_path, s3)
         except Exception as e:
             return {
                 "event_type": "error",
                 "session_id": session_id,
-                "error": f"Failed to list S3 objects: {str(e)}",
+                "error": f"Failed to read parquet metadata: {str(e)}",
             }
 
-        if "Contents" not in objects:
+        if not summary["file_count"]:
             return {
                 "event_type": "error",
                 "session_id": session_id,
                 "error": "No data files found in S3 output",
             }
 
-        # Read sample file to get metadata
-        sample_file = None
-        for obj in objects["Contents"]:
-            if obj["Size"] > 0:
-                sample_file = f"s3://{bucket}/{obj['Key']}"
-                break
-
-        if not sample_file:
-            return {
-                "event_type": "error",
-                "session_id": session_id,
-                "error": "No valid parquet files found",
-            }
-
-        try:
-            sample_df = wr.s3.read_parquet(sample_file)
-            columns = sample_df.columns.tolist()
-            total_files = len([obj for obj in objects["Contents"] if obj["Size"] > 0])
-            estimated_rows = len(sample_df) * total_files
-        except Exception as e:
-            return {
-                "event_type": "error",
-                "session_id": session_id,
-                "error": f"Failed to read parquet file: {str(e)}",
-            }
+        row_count = summary["row_count"]
+        columns = summary["schema"].names
+        schema = [
+            {"name": field.name, "type": str(field.type)} for field in summary["schema"]
+        ]
 
         # Store S3 path in memory
-        store_session_metadata(
+        stored = store_session_metadata(
             session_id=session_id,
             s3_parquet_path=s3_output_path,
-            row_count=estimated_rows,
+            row_count=row_count,
             columns=columns,
             query=query,
         )
 
-        return {
+        result = {
             "event_type": "query_result",
             "session_id": session_id,
-            "row_count": estimated_rows,
+            "row_count": row_count,
             "columns": columns,
+            "schema": schema,
+            "file_count": summary["file_count"],
+            "total_bytes": summary["total_bytes"],
             "query": query,
-            "message": f"Query executed successfully. {estimated_rows} rows available for analysis.",
+            "query_execution_id": query_execution_id,
+            "statistics": {
+                key: statistics[key]
+                for key in ATHENA_STATISTICS_FIELDS
+                if key in statistics
+            },
+            "message": f"Query executed successfully. {row_count} rows available for analysis.",
         }
+        if stored and versions is not None:
+            registry.put(
+                cache_key,
+                {
+                    "session_id": session_id,
+                    "s3_parquet_path": s3_output_path,
+                    "table_versions": versions,
+                    "result": result,
+                },
+            )
+        return {**result, "cached": False}
 
     except Exception as e:
         return {
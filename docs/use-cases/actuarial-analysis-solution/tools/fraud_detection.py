@@ -13,17 +13,17 @@ Key Features:
 Returns fraud probability scores and detailed risk factors for each claim.
 """
 
+import heapq
 import logging
 from dataclasses import dataclass
-from datetime import datetime
+from datetime import UTC, datetime
 from typing import Any
 
+import numpy as np
 import pandas as pd
-from utils.constants import (
-    DEFAULT_FRAUD_CONFIG,
-    FRAUD_KEYWORDS,
-    LITIGATION_KEYWORDS,
-)
+from utils.constants import DEFAULT_FRAUD_CONFIG, FRAUD_TEXT_CATEGORIES
+from utils.data_utils import as_claims_frame, as_numeric, merge_config
+from utils.keyword_matcher import get_keyword_matcher
 
 # Set up logging
 # Set root logger level explicitly
@@ -34,6 +34,88 @@ logger = logging.getLogger(__name__)
 logger.setLevel(logging.INFO)
 
 
+SEVERE_BODY_PARTS = {"HEAD", "L2", "SPINE", "BACK"}
+# FRAUD_TEXT_CATEGORIES scanned in the combined notes and in the injury text
+NOTE_CATEGORIES = (
+    "fraud_keywords",
+    "litigation_keywords",
+    "total_loss",
+    "severe_weather",
+)
+INJURY_CATEGORIES = ("severe_injury", "soft_tissue")
+
+
+def _object_values(column: pd.Series):
+    """The values of a non-numeric column, with the NA of extension dtypes as None."""
+    if isinstance(column.dtype, np.dtype):
+        return column
+    return column.to_numpy(dtype=object, na_value=None)
+
+
+def _float_column(df: pd.DataFrame, name: str) -> np.ndarray:
+    """
+    float(value or 0) for every row, as the per-claim scorer reads a value;
+    missing numbers of any dtype are NaN, as in numpy columns.
+    """
+    if name not in df.columns:
+        return np.zeros(len(df))
+    column = df[name]
+    if column.dtype.kind in "biuf":
+        return column.to_numpy(dtype=float, na_value=np.nan)
+    return np.array(
+        [float(value or 0) for value in _object_values(column)], dtype=float
+    )
+
+
+def _int_column(df: pd.DataFrame, name: str) -> np.ndarray:
+    """int(value or 0) for every row, 0 where that conversion fails."""
+    if name not in df.columns:
+        return np.zeros(len(df), dtype=np.int64)
+    column = df[name]
+    if column.dtype.kind in "biuf":
+        values = column.to_numpy(dtype=float, na_value=np.nan)
+        if np.isinf(values).any():
+            raise OverflowError("cannot convert float infinity to integer")
+        return np.trunc(np.nan_to_num(values, nan=0.0)).astype(np.int64)
+
+    def convert(value):
+        try:
+            return int(value or 0)
+        except (ValueError, TypeError):
+            return 0
+
+    return np.array(
+        [convert(value) for value in _object_values(column)], dtype=np.int64
+    )
+
+
+def _text_column(df: pd.DataFrame, name: str) -> list[str]:
+    """str(value or "") for every row."""
+    if name not in df.columns:
+        return [""] * len(df)
+    column = df[name]
+    if isinstance(column.dtype, pd.CategoricalDtype):
+        # Convert each category once; missing labels read as ""
+        labels = np.array(
+            [str(value or "") for value in column.cat.categories] + [""], dtype=object
+        )
+        return labels[column.cat.codes.to_numpy()].tolist()
+    return [str(value or "") for value in _object_values(column)]
+
+
+def _claim_row(df: pd.DataFrame, position: int) -> dict[str, Any]:
+    """
+    One claim for _calculate_fraud_score, with missing values as in numpy
+    columns: NaN for numbers, and None rather than NaN or NA for labels and
+    texts.
+    """
+    claim = df.iloc[position].to_dict()
+    for name, dtype in df.dtypes.items():
+        if not isinstance(dtype, np.dtype) and pd.isna(claim[name]):
+            claim[name] = np.nan if dtype.kind in "biuf" else None
+    return claim
+
+
 @dataclass
 class FraudScore:
     claim_id: str
@@ -45,7 +127,7 @@ class FraudScore:
 
 class FraudDetectionService:
     def __init__(self, fraud_config=None):
-        self.config = fraud_config or DEFAULT_FRAUD_CONFIG
+        self.config = merge_config(DEFAULT_FRAUD_CONFIG, fraud_config)
         self.fraud_indicators = {
             "amount_anomalies": ["unusually_high_amount", "round_number_amount"],
             "timing_anomalies": ["weekend_claim", "holiday_claim", "quick_report"],
@@ -56,6 +138,8 @@ class FraudDetectionService:
             ],
             "behavioral_anomalies": ["multiple_policies", "recent_policy_change"],
         }
+        self.current_year = datetime.now(UTC).year
+        self.matcher = get_keyword_matcher(FRAUD_TEXT_CATEGORIES)
 
     def _calculate_fraud_score(self, claim: pd.Series) -> FraudScore:
         risk_factors = []
@@ -110,8 +194,7 @@ class FraudDetectionService:
             vehicle_year = 0
 
         if vehicle_year:
-            current_year = datetime.utcnow().year
-            vehicle_age = max(0, current_year - vehicle_year)
+            vehicle_age = max(0, self.current_year - vehicle_year)
             if (
                 vehicle_age < self.config["vehicle_thresholds"]["new_vehicle"]
                 and incurred > self.config["amount_thresholds"]["high"]
@@ -131,17 +214,15 @@ class FraudDetectionService:
         losstype = str(claim.get("losstype") or "").upper()
         injury_desc = str(claim.get("injurydescription") or "").lower()
 
-        severe_body_parts = {"HEAD", "L2", "SPINE", "BACK"}
-        if body_part in severe_body_parts or any(
-            w in injury_desc for w in ["head", "spine", "back", "neck"]
-        ):
+        injury_hits = self.matcher.categories_in(injury_desc, INJURY_CATEGORIES)
+
+        if body_part in SEVERE_BODY_PARTS or "severe_injury" in injury_hits:
             if incurred > 10000:
                 risk_factors.append("severe_injury_high_cost")
                 red_flags.append("Severe injury with high cost")
                 score += self.config["score_weights"]["severe_injury"]
 
-        soft_tissue_terms = ["whiplash", "soft tissue", "sprain", "strain"]
-        if any(w in injury_desc for w in soft_tissue_terms) and incurred > 5000:
+        if "soft_tissue" in injury_hits and incurred > 5000:
             risk_factors.append("soft_tissue_high_cost")
             red_flags.append("Soft tissue injury with high cost")
             score += self.config["score_weights"]["soft_tissue"]
@@ -159,24 +240,24 @@ class FraudDetectionService:
             ]
         ).lower()
 
-        if any(w in text for w in FRAUD_KEYWORDS):
+        text_hits = self.matcher.categories_in(text, NOTE_CATEGORIES)
+
+        if "fraud_keywords" in text_hits:
             risk_factors.append("fraud_keywords")
             red_flags.append("Fraud-related keywords in notes")
             score += self.config["score_weights"]["keyword_match"]
 
-        if any(w in text for w in LITIGATION_KEYWORDS):
+        if "litigation_keywords" in text_hits:
             risk_factors.append("litigation_keywords")
             red_flags.append("Litigation keywords in notes")
             score += self.config["score_weights"]["keyword_match"]
 
-        if any(w in text for w in ["total loss", "write off", "beyond repair"]):
+        if "total_loss" in text_hits:
             risk_factors.append("total_loss_language")
             red_flags.append("Total loss language")
             score += self.config["score_weights"]["total_loss"]
 
-        if any(
-            w in text for w in ["fog", "black ice", "heavy rain", "hail", "snowstorm"]
-        ):
+        if "severe_weather" in text_hits:
             if incurred > 10000:
                 risk_factors.append("severe_weather_high_cost")
                 red_flags.append("Weather narrative with high cost")
@@ -200,6 +281,122 @@ class FraudDetectionService:
             red_flags=red_flags,
         )
 
+    def _score_frame(self, df: pd.DataFrame) -> np.ndarray:
+        """
+        Fraud probability of every claim, computed rule by rule over whole
+        columns. Applies the rules of _calculate_fraud_score in the same order,
+        so the sums (and therefore the probabilities) are identical to it.
+        """
+        thresholds = self.config["amount_thresholds"]
+        weights = self.config["score_weights"]
+        n = len(df)
+
+        paid = _float_column(df, "paidtotal")
+        incurred = _float_column(df, "totalincurred")
+        med = _float_column(df, "medpdtotal")
+        age = _int_column(df, "driverage")
+        vehicle_year = _int_column(df, "vehicleyear")
+
+        score = np.zeros(n)
+
+        def add(mask, weight):
+            nonlocal score
+            score = score + np.where(mask, weight, 0.0)
+
+        with np.errstate(invalid="ignore", divide="ignore"):
+            add((paid > 0) & (paid % thresholds["low"] == 0), weights["amount_anomaly"])
+            add(paid > thresholds["high"], weights["amount_anomaly"])
+            add(paid > thresholds["very_high"], weights["amount_anomaly"])
+
+            positive = incurred > 0
+            med_share = np.divide(med, incurred, out=np.zeros(n), where=positive)
+            add(
+                positive
+                & (med_share > self.config["ratios"]["medical_share_high"])
+                & (incurred > thresholds["medium"]),
+                weights["ratio_anomaly"],
+            )
+
+            add(
+                (age != 0)
+                & (
+                    (age < self.config["age_thresholds"]["young_driver"])
+                    | (age > self.config["age_thresholds"]["senior_driver"])
+                ),
+                weights["demographic_anomaly"],
+            )
+
+            vehicle_age = np.maximum(0, self.current_year - vehicle_year)
+            has_vehicle = vehicle_year != 0
+            add(
+                has_vehicle
+                & (vehicle_age < self.config["vehicle_thresholds"]["new_vehicle"])
+                & (incurred > thresholds["high"]),
+                weights["pattern_anomaly"],
+            )
+            add(
+                has_vehicle
+                & (vehicle_age > self.config["vehicle_thresholds"]["old_vehicle"])
+                & (paid > thresholds["medium"]),
+                weights["pattern_anomaly"],
+            )
+
+            # Text rules: the matcher scans each text column once; injury
+            # descriptions only where the amount gates of the injury rules pass
+            note_text = _text_column(df, "note_text")
+            loss_description = _text_column(df, "lossdescription")
+            injury_description = _text_column(df, "injurydescription")
+            text_hits = self.matcher.category_masks(
+                [
+                    " ".join(parts).lower()
+                    for parts in zip(
+                        note_text, loss_description, injury_description, strict=True
+                    )
+                ],
+                NOTE_CATEGORIES,
+            )
+            injury_rows = np.flatnonzero(incurred > 5000)
+            injury_hits = {name: np.zeros(n, dtype=bool) for name in INJURY_CATEGORIES}
+            for name, mask in self.matcher.category_masks(
+                [injury_description[i].lower() for i in injury_rows],
+                INJURY_CATEGORIES,
+            ).items():
+                injury_hits[name][injury_rows] = mask
+
+            high_cost = np.flatnonzero(incurred > 10000)
+            body_part = _text_column(df, "bodypartproductcode")
+            severe_part = np.zeros(n, dtype=bool)
+            severe_part[high_cost] = [
+                body_part[i].upper() in SEVERE_BODY_PARTS for i in high_cost
+            ]
+            add(
+                (incurred > 10000) & (severe_part | injury_hits["severe_injury"]),
+                weights["severe_injury"],
+            )
+            add(injury_hits["soft_tissue"], weights["soft_tissue"])
+
+            third_party = np.flatnonzero(incurred > 25000)
+            losstype = _text_column(df, "losstype")
+            third_party_bi = np.zeros(n, dtype=bool)
+            third_party_bi[third_party] = [
+                "3PTY" in losstype[i].upper() for i in third_party
+            ]
+            add(third_party_bi, weights["third_party_bi"])
+
+            add(text_hits["fraud_keywords"], weights["keyword_match"])
+            add(text_hits["litigation_keywords"], weights["keyword_match"])
+            add(text_hits["total_loss"], weights["total_loss"])
+            add(text_hits["severe_weather"] & (incurred > 10000), 0.1)
+
+            ratio = np.divide(paid, incurred, out=np.zeros(n), where=positive)
+            anomalous = positive & ((ratio > 1.0) | (ratio < 0.3))
+            anomaly_score = np.where(
+                anomalous, np.minimum(1.0, np.abs(ratio - 0.75) * 2.0), 0.0
+            )
+            score = score + anomaly_score * 0.3
+
+        return np.minimum(1.0, score)
+
     def _calculate_anomaly_score(self, claim: pd.Series) -> float:
         try:
             paid = float(claim.get("paidtotal") or 0)
@@ -214,31 +411,37 @@ class FraudDetectionService:
             return 0.0
 
     def _detect_organized_fraud(
-        self, df: pd.DataFrame, fraud_scores: list[dict[str, Any]]
+        self, df: pd.DataFrame, high_fraud_claims: int
     ) -> dict[str, Any]:
+        amount_counts = []
+        if "paidtotal" in df.columns:
+            counts = _paid_amount_counts(df)
+            amount_counts = counts[counts >= 3].items()
+        return self._organized_fraud(amount_counts, lambda: high_fraud_claims)
+
+    def _organized_fraud(self, amount_counts, high_fraud_claims) -> dict[str, Any]:
+        """
+        Organized fraud indicators from (paid amount, claim count) pairs and
+        high_fraud_claims, a callable counting the high-probability claims.
+        """
         organized_indicators = []
         try:
-            if "paidtotal" in df.columns:
-                amounts = pd.to_numeric(df["paidtotal"], errors="coerce").fillna(0)
-                counts = amounts.value_counts()
-                for amount, count in counts.items():
-                    if count >= 3 and amount > 1000:
-                        organized_indicators.append(
-                            {
-                                "type": "duplicate_amounts",
-                                "description": f"{count} claims with identical amount: ${amount:,.0f}",
-                                "severity": "high" if count >= 5 else "medium",
-                            }
-                        )
-
-            high_fraud_claims = [
-                s for s in fraud_scores if s.get("fraud_probability", 0) > 0.7
-            ]
-            if len(high_fraud_claims) >= 3:
+            for amount, count in amount_counts:
+                if count >= 3 and amount > 1000:
+                    organized_indicators.append(
+                        {
+                            "type": "duplicate_amounts",
+                            "description": f"{count} claims with identical amount: ${amount:,.0f}",
+                            "severity": "high" if count >= 5 else "medium",
+                        }
+                    )
+
+            high_fraud_claims = high_fraud_claims()
+            if high_fraud_claims >= 3:
                 organized_indicators.append(
                     {
                         "type": "high_fraud_cluster",
-                        "description": f"{len(high_fraud_claims)} claims with high fraud probability",
+                        "description": f"{high_fraud_claims} claims with high fraud probability",
                         "severity": "high",
                     }
                 )
@@ -261,6 +464,165 @@ class FraudDetectionService:
         }
 
 
+def _ranking_config(fraud_config) -> dict[str, Any]:
+    return merge_config(DEFAULT_FRAUD_CONFIG, fraud_config)["ranking"]
+
+
+def _top_rows(probabilities: np.ndarray, k: int) -> np.ndarray:
+    """
+    Positions of the k highest probabilities, the earliest of equal ones
+    first, in no particular order; found by partitioning rather than sorting.
+    """
+    n = len(probabilities)
+    if k <= 0:
+        return np.zeros(0, dtype=np.int64)
+    if n <= k:
+        return np.arange(n)
+    kth = np.partition(probabilities, n - k)[n - k]
+    above = np.flatnonzero(probabilities > kth)
+    ties = np.flatnonzero(probabilities == kth)[: k - len(above)]
+    return np.concatenate((above, ties))
+
+
+def _stream_scores(
+    service: "FraudDetectionService",
+    df: pd.DataFrame,
+    ranking: dict[str, Any],
+    offset: int = 0,
+) -> dict[str, Any]:
+    """
+    Score df chunk by chunk, keeping only the risk level counters, the sum of
+    probabilities and a heap of the top_k (probability, -row) entries, rows
+    numbered from offset. Memory grows with chunk_size and top_k, not with
+    the number of claims.
+    """
+    top_k = int(ranking["top_k"])
+    chunk_size = max(1, int(ranking["chunk_size"]))
+    stream = {"high": 0, "medium": 0, "flagged": 0, "score_sum": 0.0, "top": []}
+    for start in range(0, len(df), chunk_size):
+        probabilities = service._score_frame(df.iloc[start : start + chunk_size])
+        stream["high"] += int((probabilities > 0.7).sum())
+        stream["medium"] += int(((probabilities > 0.3) & (probabilities <= 0.7)).sum())
+        stream["flagged"] += int((probabilities > 0.3).sum())
+        # Continues the running total in claim order, like one sum() would
+        stream["score_sum"] = sum(probabilities.tolist(), stream["score_sum"])
+        stream["top"] = heapq.nlargest(
+            top_k,
+            stream["top"]
+            + [
+                (float(probabilities[i]), -(offset + start + int(i)))
+                for i in _top_rows(probabilities, top_k)
+            ],
+        )
+    return stream
+
+
+def _paid_amount_stats(df: pd.DataFrame) -> tuple[np.ndarray, ...]:
+    """Distinct paid amounts above 1000, with their first row and claim count."""
+    paid = as_numeric(df["paidtotal"]).fillna(0).to_numpy(dtype=float)
+    rows = np.flatnonzero(paid > 1000)
+    amounts, first, counts = np.unique(
+        paid[rows], return_index=True, return_counts=True
+    )
+    return amounts, rows[first], counts
+
+
+def _paid_amount_counts(df: pd.DataFrame) -> pd.Series:
+    """
+    Claims per paid amount, for the amounts above 1000: most claims first, and
+    equal counts in order of first appearance, as merge_fraud_partials lists
+    them.
+    """
+    amounts, first_rows, counts = _paid_amount_stats(df)
+    order = np.lexsort((first_rows, -counts))
+    return pd.Series(counts[order], index=amounts[order])
+
+
+def fraud_partial(data, fraud_config=None, offset: int = 0) -> dict[str, Any]:
+    """
+    Mergeable fraud statistics for one part of a portfolio, whose first claim
+    is row offset of the whole: risk level counters, the part's top_k scores
+    as (probability, -row, score) entries and claim counts per paid amount.
+    Combine the parts with merge_fraud_partials.
+    """
+    df = as_claims_frame(data)
+    service = FraudDetectionService(fraud_config)
+    stream = _stream_scores(service, df, _ranking_config(fraud_config), offset)
+
+    amounts = np.zeros(0)
+    counts = first_rows = np.zeros(0, dtype=np.int64)
+    if "paidtotal" in df.columns:
+        amounts, first_rows, counts = _paid_amount_stats(df)
+        first_rows = offset + first_rows
+
+    return {
+        "total": len(df),
+        "high": stream["high"],
+        "medium": stream["medium"],
+        "flagged": stream["flagged"],
+        "score_sum": stream["score_sum"],
+        "top": [
+            (
+                probability,
+                negative_row,
+                service._calculate_fraud_score(
+                    _claim_row(df, -negative_row - offset)
+                ).__dict__,
+            )
+            for probability, negative_row in stream["top"]
+        ],
+        "paid_amounts": (amounts, counts, first_rows),
+    }
+
+
+def merge_fraud_partials(partials, fraud_config=None) -> dict[str, Any]:
+    """
+    The score_fraud_risk result for the claims of all partials. Duplicate
+    amounts with equal counts are listed in order of first appearance.
+    """
+    partials = list(partials)
+    total = sum(partial["total"] for partial in partials)
+    if total == 0:
+        return score_fraud_risk([], fraud_config)
+
+    top = heapq.nlargest(
+        int(_ranking_config(fraud_config)["top_k"]),
+        (entry for partial in partials for entry in partial["top"]),
+        key=lambda entry: (entry[0], entry[1]),
+    )
+    fraud_scores = [entry[2] for entry in top]
+
+    amounts, counts, first_rows = (
+        np.concatenate([partial["paid_amounts"][part] for partial in partials])
+        for part in range(3)
+    )
+    amounts, codes = np.unique(amounts, return_inverse=True)
+    counts = np.bincount(codes, weights=counts, minlength=len(amounts)).astype(int)
+    first_rows_merged = np.full(len(amounts), np.iinfo(np.int64).max)
+    np.minimum.at(first_rows_merged, codes, first_rows)
+    repeated = np.flatnonzero(counts >= 3)
+    repeated = repeated[np.lexsort((first_rows_merged[repeated], -counts[repeated]))]
+
+    service = FraudDetectionService(fraud_config)
+    high = sum(partial["high"] for partial in partials)
+    organized_fraud = service._organized_fraud(
+        ((float(amounts[i]), int(counts[i])) for i in repeated), lambda: high
+    )
+
+    return {
+        "fraud_scores": fraud_scores,
+        "ranked_claims": fraud_scores,
+        "organized_fraud_indicators": organized_fraud,
+        "summary": {
+            "total_claims": total,
+            "high_risk_claims": high,
+            "medium_risk_claims": sum(partial["medium"] for partial in partials),
+            "flagged_claims": sum(partial["flagged"] for partial in partials),
+            "average_fraud_score": sum(p["score_sum"] for p in partials) / total,
+        },
+    }
+
+
 def score_fraud_risk(data, fraud_config=None):
     """
     Analyze claims data for fraud indicators and return risk scores.
@@ -270,7 +632,8 @@ def score_fraud_risk(data, fraud_config=None):
         fraud_config: Optional fraud configuration overrides
     """
     try:
-        if not data:
+        df = as_claims_frame(data)
+        if df.empty:
             return {
                 "fraud_scores": [],
                 "ranked_claims": [],
@@ -284,42 +647,24 @@ def score_fraud_risk(data, fraud_config=None):
                 },
             }
 
-        if isinstance(data, dict) and "data" in data:
-            claims_list = data["data"]
-        else:
-            claims_list = data
-
-        if not isinstance(claims_list, list):
-            claims_list = [claims_list]
-
-        df = pd.DataFrame(claims_list)
         total_claims = len(df)
 
         service = FraudDetectionService(fraud_config)
 
-        all_scores = []
-        for _, row in df.iterrows():
-            score_obj = service._calculate_fraud_score(row)
-            all_scores.append(score_obj.__dict__)
-
-        ranked_all = sorted(
-            all_scores, key=lambda x: x.get("fraud_probability", 0.0), reverse=True
-        )
-        fraud_scores = ranked_all[:50]
+        # Score claims column-wise in chunks, keeping counters and the top_k,
+        # then explain only the returned claims
+        stream = _stream_scores(service, df, _ranking_config(fraud_config))
+        fraud_scores = [
+            service._calculate_fraud_score(_claim_row(df, -negative_row)).__dict__
+            for _, negative_row in stream["top"]
+        ]
         ranked_claims = fraud_scores
 
-        organized_fraud = service._detect_organized_fraud(df, all_scores)
+        organized_fraud = service._detect_organized_fraud(df, stream["high"])
 
-        if all_scores:
-            avg_score = sum(s.get("fraud_probability", 0.0) for s in all_scores) / len(
-                all_scores
-            )
-            high = sum(1 for s in all_scores if s.get("fraud_probability", 0.0) > 0.7)
-            med = sum(
-                1 for s in all_scores if 0.3 < s.get("fraud_probability", 0.0) <= 0.7
-            )
-        else:
-            avg_score = high = med = 0
+        avg_score = stream["score_sum"] / total_claims
+        high = stream["high"]
+        med = stream["medium"]
 
         return {
             "fraud_scores": fraud_scores,
@@ -329,9 +674,7 @@ def score_fraud_risk(data, fraud_config=None):
                 "total_claims": total_claims,
                 "high_risk_claims": high,
                 "medium_risk_claims": med,
-                "flagged_claims": len(
-                    [s for s in all_scores if s.get("fraud_probability", 0.0) > 0.3]
-                ),
+                "flagged_claims": stream["flagged"],
                 "average_fraud_score": avg_score,
             },
         }
@@ -13,15 +13,26 @@ Key Features:
 Returns litigation probability and confidence scores with detailed indicators.
 """
 
+import heapq
 import logging
+from collections import deque
+from concurrent.futures import ProcessPoolExecutor
 from dataclasses import dataclass
 from typing import Any
 
+import pandas as pd
+import pyarrow as pa
 from utils.constants import (
     DEFAULT_LITIGATION_CONFIG,
-    LITIGATION_KEYWORDS,
+    LITIGATION_DEMAND_TERMS,
+    LITIGATION_DISCOVERY_TERMS,
+    LITIGATION_FRICTION_TERMS,
+    LITIGATION_GENERIC_TERMS,
     LITIGATION_STRONG_SIGNALS,
+    LITIGATION_SUIT_TERMS,
 )
+from utils.data_utils import as_claims_frame, merge_config, open_parquet_writer
+from utils.keyword_matcher import get_keyword_matcher
 
 # Set up logging
 # Set root logger level explicitly
@@ -32,6 +43,18 @@ logger = logging.getLogger(__name__)
 logger.setLevel(logging.INFO)
 
 
+# Per-claim signal columns written by detect_litigation(signals_path=...)
+SIGNAL_SCHEMA = pa.schema(
+    [
+        ("claim_id", pa.string()),
+        ("has_litigation", pa.bool_()),
+        ("has_high_friction", pa.bool_()),
+        ("confidence_score", pa.float64()),
+        ("indicators", pa.list_(pa.string())),
+    ]
+)
+
+
 @dataclass
 class LitigationSignal:
     claim_id: str
@@ -43,76 +66,37 @@ class LitigationSignal:
 
 class LitigationAnalysisService:
     def __init__(self, litigation_config=None):
-        self.config = litigation_config or DEFAULT_LITIGATION_CONFIG
-        self.generic_keywords = LITIGATION_KEYWORDS + [
-            "dispute",
-            "denied",
-            "denial",
-            "appeal",
-            "complaint",
-            "coverage issue",
-            "coverage dispute",
-            "bad faith",
-            "investigation",
-        ]
-
+        self.config = merge_config(DEFAULT_LITIGATION_CONFIG, litigation_config)
+        self.generic_keywords = LITIGATION_GENERIC_TERMS
         self.rep_terms = LITIGATION_STRONG_SIGNALS
+        self.suit_terms = LITIGATION_SUIT_TERMS
+        self.friction_terms = LITIGATION_FRICTION_TERMS
+
+        # One scan per text finds the hits of every term list
+        self.matcher = get_keyword_matcher(
+            {
+                "generic": self.generic_keywords,
+                "rep": self.rep_terms,
+                "suit": self.suit_terms,
+                "friction": self.friction_terms,
+                "discovery": LITIGATION_DISCOVERY_TERMS,
+                "demand": LITIGATION_DEMAND_TERMS,
+            }
+        )
 
-        self.suit_terms = [
-            "lawsuit filed",
-            "has filed a lawsuit",
-            "filed suit",
-            "filed a suit",
-            "filed a law suit",
-            "complaint filed",
-            "filed complaint",
-            "civil complaint",
-            "civil action",
-            "statement of claim",
-            "summons and complaint",
-            "served with summons",
-            "served with complaint",
-            "served with papers",
-            "service of process completed",
-            "service of process",
-            "court case opened",
-            "trial",
-            "trial date",
-            "going to trial",
-            "scheduled for trial",
-        ]
-
-        self.friction_terms = [
-            "claim denied",
-            "denied claim",
-            "denial of claim",
-            "coverage denied",
-            "coverage issue",
-            "coverage dispute",
-            "dispute claim",
-            "disputed claim",
-            "formal complaint",
-            "filed a complaint",
-            "escalated complaint",
-            "ombudsman",
-            "bad faith",
-            "unfair settlement",
-            "legal review",
-            "legal department reviewing",
-            "under investigation",
-            "fraud investigation",
-        ]
-
-    def _litigation_confidence(self, text: str) -> float:
-        t = text.lower()
+    def _litigation_confidence(
+        self, text: str, hits: dict[str, list[str]] | None = None
+    ) -> float:
+        """Confidence from the matcher hits of text.lower() (scanned if not given)."""
+        if hits is None:
+            hits = self.matcher.match(text.lower())
         score = 0.0
 
-        for kw in self.generic_keywords:
-            if kw in t:
-                score += 0.01
+        for _ in hits.get("generic", []):
+            score += 0.01
 
-        rep_hit = any(p in t for p in self.rep_terms)
-        suit_hit = any(p in t for p in self.suit_terms)
+        rep_hit = "rep" in hits
+        suit_hit = "suit" in hits
         strong_signal = rep_hit or suit_hit
 
         if rep_hit:
@@ -123,13 +107,9 @@ class LitigationAnalysisService:
         if not strong_signal:
             return min(score, self.config["confidence_thresholds"]["low"])
 
-        if "deposition" in t or "subpoena" in t or "interrogatories" in t:
+        if "discovery" in hits:
             score += self.config["score_weights"]["weak_signal_weight"]
-        if (
-            "demand letter" in t
-            or "settlement demand" in t
-            or "policy limits demand" in t
-        ):
+        if "demand" in hits:
             score += self.config["score_weights"]["weak_signal_weight"]
 
         return min(1.0, score)
@@ -144,14 +124,45 @@ class LitigationAnalysisService:
             ]
         ).lower()
 
-        conf = self._litigation_confidence(text)
+        return self.score_text(
+            str(claim.get("claimnumber") or claim.get("claim_id") or ""), text
+        )
+
+    def score_text(self, claim_id: str, text: str) -> LitigationSignal:
+        lowered = text.lower()
+        hits = self.matcher.match(lowered)
+        # Claim texts arrive lower-cased, so this is normally the same scan
+        text_hits = hits if lowered == text else self.matcher.match(text)
+        return self._signal(claim_id, text, hits, text_hits)
+
+    def score_texts(self, claim_ids, texts) -> list[LitigationSignal]:
+        """score_text for every claim, scanning lower-cased texts as one column."""
+        texts = list(texts)
+        signals = []
+        for claim_id, text, hits in zip(
+            claim_ids, texts, self.matcher.matches(texts), strict=True
+        ):
+            if text.lower() == text:
+                signals.append(self._signal(claim_id, text, hits, hits))
+            else:
+                signals.append(self.score_text(claim_id, text))
+        return signals
+
+    def _signal(
+        self,
+        claim_id: str,
+        text: str,
+        hits: dict[str, list[str]],
+        text_hits: dict[str, list[str]],
+    ) -> LitigationSignal:
+        conf = self._litigation_confidence(text, hits)
         has_litigation = conf > self.config["confidence_thresholds"]["high"]
-        has_high_friction = any(term in text for term in self.friction_terms)
+        has_high_friction = "friction" in text_hits
 
-        indicators = [kw for kw in self.generic_keywords if kw in text]
+        indicators = text_hits.get("generic", [])
 
         return LitigationSignal(
-            claim_id=str(claim.get("claimnumber") or claim.get("claim_id") or ""),
+            claim_id=claim_id,
             has_litigation=has_litigation,
             has_high_friction=has_high_friction,
             confidence_score=conf,
@@ -159,9 +170,48 @@ class LitigationAnalysisService:
         )
 
 
+def _text_column(df: pd.DataFrame, column: str) -> pd.Series:
+    """Return a text column as strings with missing values blanked."""
+    if column not in df.columns:
+        return pd.Series("", index=df.index)
+    values = df[column]
+    if isinstance(values.dtype, (pd.ArrowDtype, pd.StringDtype)):
+        # Session text is held as Arrow strings; convert it in one pass
+        return pd.Series(values.to_numpy(dtype=object, na_value=""), index=df.index)
+    return values.where(values.notna(), "").astype(str)
+
+
+def _claim_texts(df: pd.DataFrame) -> pd.Series:
+    """Build the lower-cased text scanned for each claim, column by column."""
+    return (
+        _text_column(df, "claimantname")
+        .str.cat(
+            [
+                _text_column(df, "note_text"),
+                _text_column(df, "lossdescription"),
+                _text_column(df, "injurydescription"),
+            ],
+            sep=" ",
+        )
+        .str.lower()
+    )
+
+
+def _claim_ids(df: pd.DataFrame) -> pd.Series:
+    """Resolve claim identifiers from claimnumber, falling back to claim_id."""
+    ids = pd.Series("", index=df.index)
+    for column in ("claim_id", "claimnumber"):
+        if column in df.columns:
+            values = df[column]
+            present = values.notna() & (values.astype(str) != "")
+            ids = ids.where(~present, values.astype(str))
+    return ids
+
+
 def analyze_litigation_signals(data, litigation_config=None):
     try:
-        if not data:
+        df = as_claims_frame(data)
+        if df.empty:
             return {
                 "signals": [],
                 "summary": {
@@ -175,24 +225,12 @@ def analyze_litigation_signals(data, litigation_config=None):
                 },
             }
 
-        if isinstance(data, dict) and "data" in data:
-            claims_list = data["data"]
-        else:
-            claims_list = data
-
-        if not isinstance(claims_list, list):
-            claims_list = [claims_list]
-
         service = LitigationAnalysisService(litigation_config)
-        signals = []
-        total = 0
-
-        for claim in claims_list:
-            if not isinstance(claim, dict):
-                continue
-            total += 1
-            res = service.score_one(claim)
-            signals.append(res.__dict__)
+        signals = [
+            signal.__dict__
+            for signal in service.score_texts(_claim_ids(df), _claim_texts(df))
+        ]
+        total = len(signals)
 
         strict_flags = [s for s in signals if s["has_litigation"]]
         friction_flags = [s for s in signals if s["has_high_friction"]]
@@ -239,19 +277,210 @@ def analyze_litigation_signals(data, litigation_config=None):
         }
 
 
-def detect_litigation(data, litigation_config=None):
+def _score_chunk(
+    claim_ids: list[str],
+    texts: list[str],
+    offset: int,
+    litigation_config,
+    top_k: int,
+    keep_signals: bool,
+) -> dict[str, Any]:
+    """
+    Score one chunk of claims. Returns its summary counts, its top_k litigation
+    and friction signals as (confidence, -row, signal) entries, and, with
+    keep_signals, every signal as an Arrow table.
+    """
+    service = LitigationAnalysisService(litigation_config)
+    signals = [signal.__dict__ for signal in service.score_texts(claim_ids, texts)]
+
+    strict = [
+        (s["confidence_score"], -(offset + i), s)
+        for i, s in enumerate(signals)
+        if s["has_litigation"]
+    ]
+    friction = [
+        (s["confidence_score"], -(offset + i), s)
+        for i, s in enumerate(signals)
+        if s["has_high_friction"]
+    ]
+    return {
+        "total": len(signals),
+        "strict": len(strict),
+        "friction": len(friction),
+        "top_litigation": heapq.nlargest(top_k, strict, key=_rank),
+        "top_friction": heapq.nlargest(top_k, friction, key=_rank),
+        "signals": (
+            pa.Table.from_pylist(signals, schema=SIGNAL_SCHEMA)
+            if keep_signals
+            else None
+        ),
+    }
+
+
+def _rank(entry) -> tuple[float, int]:
+    """Highest confidence first, earlier claims first among equals."""
+    return entry[0], entry[1]
+
+
+def _chunk_inputs(df: pd.DataFrame, chunk_size: int, offset: int = 0):
+    """(claim_ids, texts, offset) for consecutive chunks of df."""
+    for start in range(0, len(df), chunk_size):
+        chunk = df.iloc[start : start + chunk_size]
+        yield _claim_ids(chunk).tolist(), _claim_texts(chunk).tolist(), offset + start
+
+
+def _chunk_results(
+    df: pd.DataFrame,
+    litigation_config,
+    top_k: int,
+    keep_signals: bool,
+    offset: int = 0,
+):
+    """
+    Yield _score_chunk results in row order, numbering rows from offset. With
+    processing.workers > 1 the chunks are scored in a process pool, at most two
+    per worker in flight, and serially where processes are unavailable (e.g.
+    no /dev/shm on Lambda).
+    """
+    processing = litigation_config["processing"]
+    chunk_size = max(1, int(processing["chunk_size"]))
+    workers = int(processing["workers"])
+
+    executor = None
+    if workers > 1 and len(df) > chunk_size:
+        try:
+            executor = ProcessPoolExecutor(max_workers=workers)
+        except (OSError, NotImplementedError) as pool_error:
+            logger.warning(f"Process pool unavailable, scoring serially: {pool_error}")
+
+    if executor is None:
+        for claim_ids, texts, start in _chunk_inputs(df, chunk_size, offset):
+            yield _score_chunk(
+                claim_ids, texts, start, litigation_config, top_k, keep_signals
+            )
+        return
+
+    try:
+        pending = deque()
+        for claim_ids, texts, start in _chunk_inputs(df, chunk_size, offset):
+            pending.append(
+                executor.submit(
+                    _score_chunk,
+                    claim_ids,
+                    texts,
+                    start,
+                    litigation_config,
+                    top_k,
+                    keep_signals,
+                )
+            )
+            if len(pending) >= 2 * workers:
+                yield pending.popleft().result()
+        while pending:
+            yield pending.popleft().result()
+    finally:
+        executor.shutdown(wait=False, cancel_futures=True)
+
+
+def _merge_counts(total: dict[str, Any], part: dict[str, Any], top_k: int) -> None:
+    """Fold the counts and top signals of part (a chunk or partial) into total."""
+    for key in ("total", "strict", "friction"):
+        total[key] += part[key]
+    for key in ("top_litigation", "top_friction"):
+        total[key] = heapq.nlargest(top_k, total[key] + part[key], key=_rank)
+
+
+def _empty_counts() -> dict[str, Any]:
+    return {
+        "total": 0,
+        "strict": 0,
+        "friction": 0,
+        "top_litigation": [],
+        "top_friction": [],
+    }
+
+
+def _top_k(litigation_config) -> int:
+    return int(litigation_config["limits"]["max_results"])
+
+
+def litigation_partial(data, litigation_config=None, offset: int = 0):
+    """
+    Mergeable litigation counts and top signals for one part of a portfolio,
+    whose first claim is row offset of the whole. Combine the parts with
+    merge_litigation_partials.
+    """
+    df = as_claims_frame(data)
+    config = merge_config(DEFAULT_LITIGATION_CONFIG, litigation_config)
+    top_k = _top_k(config)
+    partial = _empty_counts()
+    for chunk in _chunk_results(df, config, top_k, False, offset):
+        _merge_counts(partial, chunk, top_k)
+    return partial
+
+
+def merge_litigation_partials(partials, litigation_config=None):
+    """The detect_litigation result for the claims of all partials."""
+    top_k = _top_k(merge_config(DEFAULT_LITIGATION_CONFIG, litigation_config))
+    counts = _empty_counts()
+    for partial in partials:
+        _merge_counts(counts, partial, top_k)
+    return _litigation_result(counts)
+
+
+def _litigation_result(counts: dict[str, Any]) -> dict[str, Any]:
+    total = counts["total"]
+    return {
+        "litigation_flags": [entry[2] for entry in counts["top_litigation"]],
+        "high_friction_claims": [entry[2] for entry in counts["top_friction"]],
+        "summary": {
+            "total_claims": total,
+            "litigation_claims": counts["strict"],
+            "high_friction_claims": counts["friction"],
+            "litigation_rate": counts["strict"] / total if total > 0 else 0.0,
+            "friction_rate": counts["friction"] / total if total > 0 else 0.0,
+        },
+    }
+
+
+def detect_litigation(data, litigation_config=None, signals_path=None):
     """
     Detect litigation indicators in claims data.
 
+    Claims are scored in chunks; only summary counters and the
+    limits.max_results most confident litigation and friction signals are
+    kept, so memory does not grow with the session.
+
     Args:
         data: Claims data (list of dictionaries or DataFrame)
         litigation_config: Optional litigation configuration overrides
+        signals_path: Optional local or s3:// parquet file receiving every
+            per-claim signal
     """
-    result = analyze_litigation_signals(data, litigation_config)
+    writer = None
+    try:
+        df = as_claims_frame(data)
+        config = merge_config(DEFAULT_LITIGATION_CONFIG, litigation_config)
+        top_k = _top_k(config)
+
+        counts = _empty_counts()
+        if signals_path:
+            writer = open_parquet_writer(signals_path, SIGNAL_SCHEMA)
+
+        for chunk in _chunk_results(df, config, top_k, writer is not None):
+            _merge_counts(counts, chunk, top_k)
+            if writer is not None:
+                writer.write_table(chunk["signals"])
 
-    if "error" in result:
+        if writer is not None:
+            writer.close()
+            writer = None
+
+    except Exception as e:
+        if writer is not None:
+            writer.close()
         return {
-            "error": result["error"],
+            "error": f"Failed to analyze litigation signals: {str(e)}",
             "litigation_flags": [],
             "summary": {
                 "total_claims": 0,
@@ -261,23 +490,7 @@ def detect_litigation(data, litigation_config=None):
             },
         }
 
-    all_litigation_flags = [s for s in result["signals"] if s["has_litigation"]]
-    all_friction_flags = [s for s in result["signals"] if s["has_high_friction"]]
-    litigation_flags = all_litigation_flags[:100]
-
-    return {
-        "litigation_flags": litigation_flags,
-        "high_friction_claims": all_friction_flags[:100],
-        "summary": {
-            "total_claims": result["summary"]["total_claims"],
-            "litigation_claims": len(all_litigation_flags),
-            "high_friction_claims": len(all_friction_flags),
-            "litigation_rate": len(all_litigation_flags)
-            / result["summary"]["total_claims"]
-            if result["summary"]["total_claims"] > 0
-            else 0.0,
-            "friction_rate": len(all_friction_flags) / result["summary"]["total_claims"]
-            if result["summary"]["total_claims"] > 0
-            else 0.0,
-        },
-    }
+    result = _litigation_result(counts)
+    if signals_path:
+        result["signals_output"] = {"path": signals_path, "rows": counts["total"]}
+    return result
@@ -1,14 +1,29 @@
 """
 Loss Reserving Analysis Module
 
-Provides Chain Ladder and Bornhuetter-Ferguson methodologies for IBNR reserve calculations.
-Standard actuarial practices with no simulation - uses real claims data.
+Provides Chain Ladder and Bornhuetter-Ferguson methodologies for IBNR reserve calculations,
+with an over-dispersed Poisson bootstrap of the chain ladder for reserve ranges.
+Standard actuarial practices - uses real claims data.
 """
 
+import base64
 import logging
+import time
+import zlib
+from concurrent.futures import FIRST_COMPLETED, ProcessPoolExecutor, wait
+from concurrent.futures.process import BrokenProcessPool
+from dataclasses import dataclass
 from typing import Any
 
+import numpy as np
 import pandas as pd
+from utils.constants import DEFAULT_RESERVING_CONFIG, TRIANGLE_FORMAT
+from utils.data_utils import (
+    apply_column_aliases,
+    as_claims_frame,
+    as_datetime,
+    as_numeric,
+)
 
 # Set root logger level explicitly
 logging.getLogger().setLevel(logging.INFO)
@@ -18,289 +33,957 @@ logger = logging.getLogger(__name__)
 logger.setLevel(logging.INFO)
 
 
+def _label_order(label) -> tuple:
+    """Sort key placing numeric labels (int or "2019") in numeric order."""
+    try:
+        return (0, float(label), "")
+    except (TypeError, ValueError):
+        return (1, 0.0, str(label))
+
+
+@dataclass
+class Triangle:
+    """
+    Incremental loss triangle as a dense array with axis labels.
+
+    values has shape (..., origins, developments); leading axes (e.g. lines of
+    business or bootstrap samples) are carried through every function below.
+    Cells that are absent from the source triangle are zero.
+    """
+
+    values: np.ndarray
+    origins: list
+    developments: list
+
+    @classmethod
+    def from_dict(cls, data: dict) -> "Triangle":
+        """Build from {accident_year: {development_year: value}} (JSON keys allowed)."""
+        origins = sorted(data, key=_label_order)
+        developments = sorted(
+            {dev for row in data.values() for dev in (row or {})}, key=_label_order
+        )
+        column = {dev: j for j, dev in enumerate(developments)}
+        values = np.zeros((len(origins), len(developments)))
+        for i, origin in enumerate(origins):
+            for dev, value in (data[origin] or {}).items():
+                if value is not None and value == value:
+                    values[i, column[dev]] = value
+        return cls(values, origins, developments)
+
+    def cumulative(self) -> np.ndarray:
+        return np.cumsum(self.values, axis=-1)
+
+    def factor_labels(self) -> list[str]:
+        return [
+            f"{current}-{following}"
+            for current, following in zip(
+                self.developments[:-1], self.developments[1:], strict=True
+            )
+        ]
+
+
+TRIANGLE_MEASURES = {
+    "incurred": "totalincurred",
+    "paid": "paidtotal",
+    "reserve": "reservetotal",
+    "count": "claimnumber",
+}
+
+
+def _pack(array: np.ndarray, compression: str | None):
+    if compression == "zlib":
+        return base64.b64encode(zlib.compress(array.tobytes())).decode("ascii")
+    return array.tolist()
+
+
+def _unpack(packed, dtype: str, compression: str | None) -> np.ndarray:
+    if compression == "zlib":
+        raw = zlib.decompress(base64.b64decode(packed))
+        return np.frombuffer(raw, dtype=np.dtype(dtype).newbyteorder("<")).copy()
+    return np.asarray(packed, dtype=dtype)
+
+
+def encode_triangles(
+    origins: list,
+    developments: list,
+    measures: dict[str, np.ndarray],
+    compression: str | None = None,
+    segments: dict[str, Any] | None = None,
+) -> dict[str, Any]:
+    """
+    Versioned wire format for triangles that share one set of axis labels.
+    Segmented payloads carry {"by": [...], "keys": [[...], ...]} and one
+    leading array axis per segment key.
+
+    Each measure is stored dense (row-major) or, when at most
+    TRIANGLE_FORMAT["SPARSE_MAX_DENSITY"] of its cells are non-zero, as flat
+    indices plus values. Integral measures are typed int64. With
+    compression="zlib" arrays are little-endian bytes, zlib'd and base64'd.
+    """
+    encoded = {}
+    for name, values in measures.items():
+        values = np.asarray(values, dtype=float)
+        integral = bool(np.all(values == np.round(values)))
+        dtype = "<i8" if integral else "<f8"
+        flat = values.ravel()
+        nonzero = np.flatnonzero(flat)
+        if nonzero.size <= TRIANGLE_FORMAT["SPARSE_MAX_DENSITY"] * flat.size:
+            encoded[name] = {
+                "encoding": "sparse",
+                "dtype": dtype,
+                "index": _pack(nonzero.astype("<i4"), compression),
+                "values": _pack(flat[nonzero].astype(dtype), compression),
+            }
+        else:
+            encoded[name] = {
+                "encoding": "dense",
+                "dtype": dtype,
+                "values": _pack(flat.astype(dtype), compression),
+            }
+    payload = {
+        "format": TRIANGLE_FORMAT["NAME"],
+        "version": TRIANGLE_FORMAT["VERSION"],
+        "structure": "accident_years_as_rows_development_years_as_columns",
+        "origins": [_plain(label) for label in origins],
+        "developments": [_plain(label) for label in developments],
+        "compression": compression,
+        "measures": encoded,
+    }
+    if segments:
+        payload["segments"] = {
+            "by": list(segments["by"]),
+            "keys": [[_plain(value) for value in key] for key in segments["keys"]],
+        }
+    return payload
+
+
+def decode_triangles(
+    payload: dict[str, Any],
+) -> tuple[list, list, dict[str, np.ndarray]]:
+    """
+    Inverse of encode_triangles: (origins, developments, {measure: array}).
+    Arrays of segmented payloads have a leading segment axis.
+    """
+    if payload.get("format") != TRIANGLE_FORMAT["NAME"]:
+        raise ValueError(f"Not a triangle payload: {payload.get('format')}")
+    if payload.get("version", 0) > TRIANGLE_FORMAT["VERSION"]:
+        raise ValueError(f"Unsupported triangle format version {payload['version']}")
+
+    origins, developments = payload["origins"], payload["developments"]
+    shape = (len(origins), len(developments))
+    if payload.get("segments"):
+        shape = (len(payload["segments"]["keys"]), *shape)
+    compression = payload.get("compression")
+    measures = {}
+    for name, encoded in payload["measures"].items():
+        values = _unpack(encoded["values"], encoded["dtype"], compression)
+        if encoded["encoding"] == "sparse":
+            dense = np.zeros(int(np.prod(shape)))
+            dense[_unpack(encoded["index"], "<i4", compression)] = values
+            values = dense
+        measures[name] = values.astype(float).reshape(shape)
+    return origins, developments, measures
+
+
+def recode_triangles(
+    payload: dict[str, Any], compression: str | None
+) -> dict[str, Any]:
+    """Re-encode a triangle payload, e.g. compressed for storage in memory."""
+    return encode_triangles(
+        *decode_triangles(payload),
+        compression=compression,
+        segments=payload.get("segments"),
+    )
+
+
+def legacy_triangle_view(payload: dict[str, Any]) -> dict[str, Any]:
+    """
+    The pre-wire-format shape: nested {accident_year: {development_year: value}}
+    per "<measure>_triangle" plus the aggregated triangle_data records.
+    """
+    origins, developments, measures = decode_triangles(payload)
+    if payload.get("segments"):
+        measures = {name: values.sum(axis=0) for name, values in measures.items()}
+    view = {
+        f"{name}_triangle": {
+            "data": {
+                origin: dict(zip(developments, row.tolist(), strict=True))
+                for origin, row in zip(origins, values, strict=True)
+            },
+            "structure": "accident_years_as_rows_development_years_as_columns",
+        }
+        for name, values in measures.items()
+    }
+    if "count" in measures:
+        rows, cols = np.nonzero(measures["count"])
+        view["triangle_data"] = [
+            {"accident_year": origins[i], "development_years": developments[j]}
+            | {
+                column: float(measures[name][i, j])
+                for name, column in TRIANGLE_MEASURES.items()
+                if name in measures
+            }
+            for i, j in zip(rows.tolist(), cols.tolist(), strict=True)
+        ]
+    return view
+
+
+def load_triangle(
+    triangles_data: dict[str, Any], measure: str, by_segment: bool = False
+) -> Triangle | None:
+    """
+    Read one measure from a wire-format payload or the legacy nested shape.
+    Segmented payloads are summed to the portfolio triangle unless by_segment,
+    which keeps the leading segment axis.
+    """
+    if "triangles" in triangles_data:
+        payload = triangles_data["triangles"]
+        origins, developments, measures = decode_triangles(payload)
+        if measure not in measures:
+            return None
+        values = measures[measure]
+        if payload.get("segments") and not by_segment:
+            values = values.sum(axis=0)
+        return Triangle(values, origins, developments)
+
+    data = triangles_data.get(f"{measure}_triangle", {}).get("data", {})
+    return Triangle.from_dict(data) if data else None
+
+
+def segment_labels(triangles_data: dict[str, Any]) -> list[str]:
+    """Display labels of the segments in a payload ("CA / Auto"), or []."""
+    segments = triangles_data.get("triangles", {}).get("segments") or {}
+    return [" / ".join(str(value) for value in key) for key in segments.get("keys", [])]
+
+
+def _positions(axis: list, labels: list) -> list[int]:
+    """Index of each label in axis."""
+    index = {label: i for i, label in enumerate(axis)}
+    return [index[label] for label in labels]
+
+
+def _plain(label):
+    return label.item() if isinstance(label, np.generic) else label
+
+
+def age_to_age_factors(
+    cumulative: np.ndarray, observed: np.ndarray | None = None
+) -> tuple[np.ndarray, np.ndarray]:
+    """
+    Volume-weighted age-to-age factors over origins where both ages are positive
+    (and observed, given an observed_mask). Returns (factors, defined);
+    undefined factors are 1.0 so they drop out of products.
+    """
+    current, following = cumulative[..., :-1], cumulative[..., 1:]
+    valid = (current > 0) & (following > 0)
+    if observed is not None:
+        valid &= observed[..., :-1] & observed[..., 1:]
+    current_sum = np.where(valid, current, 0.0).sum(axis=-2)
+    following_sum = np.where(valid, following, 0.0).sum(axis=-2)
+    defined = current_sum > 0
+    factors = np.divide(
+        following_sum, current_sum, out=np.ones_like(current_sum), where=defined
+    )
+    return factors, defined
+
+
+def cumulative_development_factors(factors: np.ndarray) -> np.ndarray:
+    """Age-to-ultimate factors (excluding tail); the last age has factor 1.0."""
+    ones = np.ones(factors.shape[:-1] + (1,))
+    to_ultimate = np.cumprod(
+        np.concatenate([factors, ones], axis=-1)[..., ::-1], axis=-1
+    )
+    return to_ultimate[..., ::-1]
+
+
+def latest_diagonal(
+    cumulative: np.ndarray, observed: np.ndarray | None = None
+) -> tuple[np.ndarray, np.ndarray]:
+    """
+    Latest positive (and observed, given an observed_mask) cumulative value per
+    origin and its development index. Origins with no such value get 0.0 and
+    index -1.
+    """
+    n_dev = cumulative.shape[-1]
+    positive = cumulative > 0
+    if observed is not None:
+        positive &= observed
+    last = n_dev - 1 - np.argmax(positive[..., ::-1], axis=-1)
+    index = np.where(positive.any(axis=-1), last, -1)
+    values = np.take_along_axis(cumulative, np.maximum(index, 0)[..., None], axis=-1)
+    return np.where(index >= 0, values[..., 0], 0.0), index
+
+
+def chain_ladder_arrays(
+    cumulative: np.ndarray, observed: np.ndarray | None = None
+) -> dict[str, np.ndarray]:
+    """
+    Chain ladder on (..., origins, developments) cumulative arrays.
+    observed (see observed_mask) excludes the cells after the latest calendar
+    diagonal, so they neither enter the factors nor count as an origin's latest
+    value; without it every cell is taken as observed. Each origin is developed
+    from its latest value with the full age-to-ultimate factor, times a tail of
+    1.10 for origins more than one age from the last column and 1.05 otherwise.
+    """
+    n_dev = cumulative.shape[-1]
+    factors, defined = age_to_age_factors(cumulative, observed)
+    cdf = cumulative_development_factors(factors)
+    latest, index = latest_diagonal(cumulative, observed)
+
+    developed = index >= 0
+    safe_index = np.maximum(index, 0)
+    to_ultimate = np.take_along_axis(
+        np.broadcast_to(cdf[..., None, :], cumulative.shape),
+        safe_index[..., None],
+        axis=-1,
+    )[..., 0]
+    tail = np.where(index < n_dev - 2, 1.10, 1.05)
+    ultimate = np.where(developed, latest * to_ultimate * tail, 0.0)
+    ibnr = np.where(developed, np.maximum(0.0, ultimate - latest), 0.0)
+    return {
+        "factors": factors,
+        "defined": defined,
+        "cdf": cdf,
+        "latest": latest,
+        "latest_index": index,
+        "tail": tail,
+        "ultimate": ultimate,
+        "ibnr": ibnr,
+    }
+
+
+def bornhuetter_ferguson_arrays(
+    cumulative: np.ndarray,
+    factor_product,
+    present: np.ndarray | None = None,
+    observed: np.ndarray | None = None,
+) -> dict[str, np.ndarray]:
+    """
+    Bornhuetter-Ferguson with the service's exposure and payment assumptions.
+    factor_product is the product of the chain ladder factors per triangle;
+    present masks origins that hold data (the expected loss per policy is the
+    mean over the three most recent present origins) and observed is the
+    observed_mask used for the latest diagonal.
+    """
+    current, _ = latest_diagonal(cumulative, observed)
+    if present is None:
+        present = np.ones(current.shape, dtype=bool)
+
+    # Standard actuarial assumption: 5% claim frequency, $2000 avg claim
+    estimated_policies = np.maximum(50, current / (2000 * 0.05))
+    loss_per_policy = current / estimated_policies
+
+    recent = present & (np.cumsum(present[..., ::-1], axis=-1)[..., ::-1] <= 3)
+    expected_loss_per_policy = np.where(recent, loss_per_policy, 0.0).sum(
+        axis=-1
+    ) / np.maximum(recent.sum(axis=-1), 1)
+
+    factor_product = np.asarray(factor_product, dtype=float)
+    percent_developed = np.where(
+        factor_product > 1,
+        np.minimum(0.95, 1.0 / np.maximum(factor_product, 1e-300)),
+        0.80,
+    )
+
+    # BF Formula: Ultimate = Paid + (Expected Ultimate - Paid) × (1 - % Developed)
+    current_paid = current * 0.75  # Standard 75% payment ratio
+    expected_ultimate = estimated_policies * expected_loss_per_policy[..., None]
+    ultimate = current_paid + (expected_ultimate - current_paid) * (
+        1 - percent_developed[..., None]
+    )
+    # At least 2% above current
+    ultimate = np.maximum(current * 1.02, ultimate)
+    ibnr = np.maximum(0, ultimate - current)
+    return {
+        "current": current,
+        "loss_per_policy": loss_per_policy,
+        "expected_loss_per_policy": expected_loss_per_policy,
+        "ultimate": np.where(present, ultimate, 0.0),
+        "ibnr": np.where(present, ibnr, 0.0),
+    }
+
+
+def observed_mask(triangle: Triangle) -> np.ndarray:
+    """
+    Cells on or before the latest calendar diagonal that holds data, shape
+    (origins, developments). Calendar position is origin + development for
+    numeric labels, otherwise the row and column indices. Leading axes
+    (segments) share one evaluation date, the latest over all of them.
+    """
+
+    def positions(labels):
+        try:
+            return np.array([float(label) for label in labels])
+        except (TypeError, ValueError):
+            return np.arange(len(labels), dtype=float)
+
+    calendar = (
+        positions(triangle.origins)[:, None] + positions(triangle.developments)[None, :]
+    )
+    populated = (triangle.values != 0).reshape(-1, *calendar.shape).any(axis=0)
+    if not populated.any():
+        return np.zeros(triangle.values.shape, dtype=bool)
+    return calendar <= calendar[populated].max()
+
+
+def _odp_fit(incremental: np.ndarray, observed: np.ndarray) -> dict[str, Any]:
+    """
+    Fit the over-dispersed Poisson chain ladder behind the bootstrap.
+    Returns fitted incrementals, scaled Pearson residuals and the dispersion,
+    with the chain_ladder_arrays point model (factors, latest diagonal, tail
+    and IBNR) that calculate_chain_ladder reports for the same triangle.
+    """
+    cumulative = np.where(
+        observed, np.cumsum(np.where(observed, incremental, 0), axis=1), 0
+    )
+    point = chain_ladder_arrays(cumulative, observed)
+    factors, latest, latest_index = (
+        point["factors"],
+        point["latest"],
+        point["latest_index"],
+    )
+
+    # Backward fit: m[i, j] = C[i, L] * prod(f[:j]) / prod(f[:L])
+    to_age = np.concatenate([[1.0], np.cumprod(factors)])
+    fitted_cumulative = (
+        latest[:, None] * to_age[None, :] / to_age[np.maximum(latest_index, 0)][:, None]
+    )
+    fitted = np.diff(fitted_cumulative, axis=1, prepend=0.0)
+    fitted = np.where(observed, fitted, 0.0)
+
+    valid = observed & (fitted != 0)
+    residuals = np.zeros_like(fitted)
+    residuals[valid] = (incremental[valid] - fitted[valid]) / np.sqrt(
+        np.abs(fitted[valid])
+    )
+
+    n_obs = int(valid.sum())
+    n_params = int(valid.any(axis=1).sum() + valid.any(axis=0).sum() - 1)
+    dof = max(n_obs - n_params, 1)
+    dispersion = float((residuals[valid] ** 2).sum() / dof)
+
+    pool = residuals[valid] * np.sqrt(n_obs / dof)
+    pool = pool[pool != 0]
+    return {
+        "incremental": np.where(observed, incremental, 0.0),
+        "observed": observed,
+        "fitted": fitted,
+        "valid": valid,
+        "pool": pool if pool.size else np.zeros(1),
+        "dispersion": dispersion,
+        "latest_index": latest_index,
+        "tail": np.where(latest_index >= 0, point["tail"], 1.0),
+        "expected_reserves": point["ibnr"],
+    }
+
+
+def _odp_simulate(
+    fit: dict[str, Any], n_simulations: int, rng: np.random.Generator
+) -> np.ndarray:
+    """Simulate reserves per origin, shape (n_simulations, origins)."""
+    fitted, valid, observed = fit["fitted"], fit["valid"], fit["observed"]
+    n_origin, n_dev = fitted.shape
+    latest_index = fit["latest_index"]
+
+    # Parameter error: refit the chain ladder on resampled pseudo triangles
+    sampled = fit["pool"][
+        rng.integers(0, fit["pool"].size, size=(n_simulations, n_origin, n_dev))
+    ]
+    pseudo = np.where(
+        valid, fitted + sampled * np.sqrt(np.abs(fitted)), fit["incremental"]
+    )
+    pseudo_cumulative = np.where(observed, np.cumsum(pseudo, axis=-1), 0.0)
+    factors, _ = age_to_age_factors(pseudo_cumulative)
+
+    rows = np.arange(n_origin)
+    safe_latest = np.maximum(latest_index, 0)
+    latest = np.where(latest_index >= 0, pseudo_cumulative[:, rows, safe_latest], 0.0)
+
+    to_age = np.concatenate(
+        [np.ones((n_simulations, 1)), np.cumprod(factors, axis=-1)], axis=-1
+    )
+    projected = (
+        latest[..., None] * to_age[:, None, :] / to_age[:, safe_latest][..., None]
+    )
+    future = np.diff(projected, axis=-1, prepend=0.0)
+    future = np.where(
+        (np.arange(n_dev)[None, :] > latest_index[:, None])
+        & (latest_index[:, None] >= 0),
+        future,
+        0.0,
+    )
+    # The chain ladder tail, as one more future increment past the last age
+    tail = projected[..., -1] * (fit["tail"] - 1.0)
+    future = np.concatenate([future, tail[..., None]], axis=-1)
+
+    # Process error: gamma with the ODP mean/variance relationship
+    dispersion = fit["dispersion"]
+    if dispersion > 0:
+        magnitude = np.abs(future)
+        future = np.sign(future) * rng.gamma(magnitude / dispersion, dispersion)
+    return future.sum(axis=-1)
+
+
+def _odp_simulate_chunk(fit: dict[str, Any], n_simulations: int, seed) -> np.ndarray:
+    return _odp_simulate(fit, n_simulations, np.random.default_rng(seed))
+
+
+def bootstrap_reserves(
+    triangle: Triangle,
+    n_simulations: int,
+    seed: int | None = None,
+    time_budget_seconds: float = 10.0,
+    workers: int = 1,
+    batch_cells: int = 2_000_000,
+    deadline: float | None = None,
+) -> tuple[np.ndarray, dict[str, Any]]:
+    """
+    Over-dispersed Poisson residual bootstrap of chain ladder reserves, on the
+    point model of chain_ladder_arrays (observed cells only, the same tail), so
+    the expected reserves in the run information are the chain ladder IBNR.
+
+    Simulations run in batches of about batch_cells triangle cells, each from its
+    own child of SeedSequence(seed), so a seeded run is reproducible. With
+    workers > 1 batches are spread over a process pool, falling back to serial
+    where processes are unavailable (e.g. no /dev/shm on Lambda). Batches stop
+    being started once time_budget_seconds have elapsed, or at deadline (a
+    time.monotonic() value shared by several runs) when given. At least one
+    batch always completes.
+    Returns reserves of shape (simulations, origins) and run information.
+    """
+    started = time.monotonic()
+    if deadline is None:
+        deadline = started + time_budget_seconds
+    fit = _odp_fit(triangle.values, observed_mask(triangle))
+
+    cells = max(triangle.values.size, 1)
+    batch = max(1, min(n_simulations, batch_cells // cells))
+    sizes = [batch] * (n_simulations // batch)
+    if n_simulations % batch:
+        sizes.append(n_simulations % batch)
+    seeds = np.random.SeedSequence(seed).spawn(len(sizes))
+
+    results: dict[int, np.ndarray] = {}
+    used_workers = 1
+    if workers > 1 and len(sizes) > 1:
+        try:
+            results = _bootstrap_parallel(fit, sizes, seeds, workers, deadline)
+            used_workers = workers if results else 1
+        except (OSError, NotImplementedError, BrokenProcessPool) as pool_error:
+            logger.warning(
+                f"Process pool unavailable, simulating serially: {pool_error}"
+            )
+            results = {}
+
+    if used_workers == 1:
+        for index, (size, child) in enumerate(zip(sizes, seeds, strict=True)):
+            if index and time.monotonic() >= deadline:
+                break
+            results[index] = _odp_simulate_chunk(fit, size, child)
+
+    reserves = np.concatenate([results[index] for index in sorted(results)])
+    info = {
+        "simulation_count": int(reserves.shape[0]),
+        "requested_simulations": int(n_simulations),
+        "budget_exhausted": bool(reserves.shape[0] < n_simulations),
+        "elapsed_seconds": round(time.monotonic() - started, 3),
+        "workers": used_workers,
+        "dispersion": fit["dispersion"],
+        "expected_reserves": fit["expected_reserves"],
+    }
+    return reserves, info
+
+
+def _bootstrap_parallel(fit, sizes, seeds, workers, deadline) -> dict[int, np.ndarray]:
+    results = {}
+    executor = ProcessPoolExecutor(max_workers=workers)
+    try:
+        pending = {
+            executor.submit(_odp_simulate_chunk, fit, size, child): index
+            for index, (size, child) in enumerate(zip(sizes, seeds, strict=True))
+        }
+        while pending:
+            remaining = deadline - time.monotonic()
+            if remaining <= 0:
+                if results:
+                    break
+                # Past the deadline with nothing back: drop the queued batches
+                # and block until a running one finishes
+                for future in list(pending):
+                    if future.cancel():
+                        del pending[future]
+            done, _ = wait(
+                pending,
+                timeout=remaining if remaining > 0 else None,
+                return_when=FIRST_COMPLETED,
+            )
+            for future in done:
+                results[pending.pop(future)] = future.result()
+    finally:
+        executor.shutdown(wait=False, cancel_futures=True)
+    return results
+
+
 class LossReservingService:
     """Service for calculating loss reserves using standard actuarial methodologies."""
 
     def __init__(self, config=None):
         self.config = config or {}
 
-    def build_loss_triangles(self, claims_data: list[dict]) -> dict[str, Any]:
-        """Build loss development triangles from claims data."""
+    def build_loss_triangles(self, claims_data, segment_by=None) -> dict[str, Any]:
+        """
+        Build loss development triangles from claims data.
+        With segment_by (e.g. ["lineofbusiness", "state"]) one triangle per
+        segment is built in the same pass, on shared accident/development axes.
+        """
         try:
-            if not claims_data:
-                return {"error": "No claims data provided"}
+            segment_by = list(segment_by or [])
+            triangle_data = self._triangle_cells(claims_data, segment_by)
+            if isinstance(triangle_data, dict):
+                return triangle_data
+            return self._triangles_from_cells(triangle_data, segment_by)
 
-            df = pd.DataFrame(claims_data)
-            logger.info(f"Processing {len(df)} claims records")
-
-            # Check required columns
-            required_cols = ["policyeffectivedate", "note_date", "totalincurred"]
-            missing_cols = [col for col in required_cols if col not in df.columns]
-
-            if missing_cols:
-                col_mapping = {
-                    "note_date": [
-                        "lossdate",
-                        "loss_date",
-                        "date_of_loss",
-                        "accident_dt",
-                        "accident_date",
-                    ],
-                    "report_date": [
-                        "reportdate",
-                        "report_dt",
-                        "date_reported",
-                        "reported_date",
-                    ],
-                }
+        except Exception as e:
+            return {"error": f"Failed to construct loss triangle: {str(e)}"}
 
-                for req_col in missing_cols:
-                    found = False
-                    for alt_col in col_mapping.get(req_col, []):
-                        if alt_col in df.columns:
-                            df[req_col] = df[alt_col]
-                            found = True
-                            break
-
-                    if not found:
-                        return {
-                            "error": f"Required column {req_col} not found. Available columns: {list(df.columns)}"
-                        }
-
-            # Convert dates and amounts
-            df["policyeffectivedate"] = pd.to_datetime(
-                df["policyeffectivedate"], errors="coerce"
-            )
-            df["note_date"] = pd.to_datetime(df["note_date"], errors="coerce")
-            df["accident_date"] = df["policyeffectivedate"]
-            df["report_date"] = df["note_date"]
-
-            df["totalincurred"] = pd.to_numeric(df["totalincurred"], errors="coerce")
-            df["paidtotal"] = pd.to_numeric(df["paidtotal"], errors="coerce")
-
-            # Filter valid records
-            df = df[
-                (df["accident_date"].notna())
-                & (df["report_date"].notna())
-                & (df["totalincurred"] > 0)
-                & (df["accident_date"] <= df["report_date"])
-            ].copy()
-
-            if len(df) == 0:
-                return {"error": "No valid data after date conversion"}
-
-            # Calculate accident year and development period
-            df["accident_year"] = df["accident_date"].dt.year
-            df["development_months"] = (
-                ((df["report_date"] - df["accident_date"]).dt.days / 30.44)
-                .round(0)
-                .astype(int)
-            )
-            df["development_years"] = (df["development_months"] / 12).round(0).astype(
-                int
-            ) + 1
-
-            # Ensure numeric columns
-            df["totalincurred"] = pd.to_numeric(
-                df["totalincurred"], errors="coerce"
-            ).fillna(0)
-            df["paidtotal"] = pd.to_numeric(df["paidtotal"], errors="coerce").fillna(0)
-            df["reservetotal"] = pd.to_numeric(
-                df["reservetotal"], errors="coerce"
-            ).fillna(0)
-            df["accident_year"] = pd.to_numeric(df["accident_year"], errors="coerce")
-            df["development_years"] = pd.to_numeric(
-                df["development_years"], errors="coerce"
+    def merge_triangle_cells(self, cell_frames, segment_by=None) -> dict[str, Any]:
+        """
+        Build triangles from _triangle_cells frames of disjoint sets of claims
+        (e.g. one per parquet partition), as if built from all the claims.
+        """
+        try:
+            segment_by = list(segment_by or [])
+            frames = []
+            for cells in cell_frames:
+                if isinstance(cells, dict):
+                    return cells
+                frames.append(cells)
+            if not frames:
+                return {"error": "No claims data provided"}
+            keys = [*segment_by, "accident_year", "development_years"]
+            triangle_data = (
+                pd.concat(frames, ignore_index=True)
+                .groupby(keys, sort=False)
+                .sum()
+                .reset_index()
             )
+            return self._triangles_from_cells(triangle_data, segment_by)
 
-            # Remove invalid years
-            df = df.dropna(subset=["accident_year", "development_years"])
+        except Exception as e:
+            return {"error": f"Failed to construct loss triangle: {str(e)}"}
 
-            # Aggregate by accident year and development years
-            triangle_data = (
-                df.groupby(["accident_year", "development_years"])
-                .agg(
-                    {
-                        "totalincurred": "sum",
-                        "paidtotal": "sum",
-                        "reservetotal": "sum",
-                        "claimnumber": "count",
+    def _triangles_from_cells(self, triangle_data, segment_by: list[str]):
+        """Scatter aggregated cells into (segments, origins, developments) arrays."""
+        if triangle_data.empty:
+            return {"error": "No valid data after date conversion"}
+
+        origins = sorted(triangle_data["accident_year"].unique().tolist())
+        developments = sorted(triangle_data["development_years"].unique().tolist())
+        rows = np.searchsorted(origins, triangle_data["accident_year"].to_numpy())
+        cols = np.searchsorted(
+            developments, triangle_data["development_years"].to_numpy()
+        )
+        segments = None
+        shape = (len(origins), len(developments))
+        cell = (rows, cols)
+        if segment_by:
+            codes = triangle_data.groupby(segment_by, sort=True).ngroup().to_numpy()
+            keys = triangle_data[segment_by].drop_duplicates().sort_values(segment_by)
+            segments = {"by": segment_by, "keys": keys.to_numpy().tolist()}
+            shape = (len(keys), *shape)
+            cell = (codes, rows, cols)
+
+        measures = {}
+        for name, column in TRIANGLE_MEASURES.items():
+            values = np.zeros(shape)
+            values[cell] = triangle_data[column].to_numpy(dtype=float)
+            measures[name] = values
+
+        return self._triangle_result(origins, developments, measures, segments)
+
+    def _triangle_cells(self, claims_data, segment_by: list[str]):
+        """
+        Claims aggregated to (segment..., accident_year, development_years) cells
+        with the summed TRIANGLE_MEASURES columns, or an error dict.
+        """
+        # Shallow copy so derived columns never leak into the shared session
+        df = as_claims_frame(claims_data).copy(deep=False)
+        if df.empty:
+            return {"error": "No claims data provided"}
+
+        logger.info(f"Processing {len(df)} claims records")
+
+        # Check required columns
+        required_cols = ["policyeffectivedate", "note_date", "totalincurred"]
+        missing_cols = [col for col in required_cols if col not in df.columns]
+
+        if missing_cols:
+            # Session loads have mapped aliases already; raw payloads map them here
+            apply_column_aliases(df)
+            for req_col in missing_cols:
+                if req_col not in df.columns:
+                    return {
+                        "error": f"Required column {req_col} not found. Available columns: {list(df.columns)}"
                     }
-                )
-                .reset_index()
-            )
 
-            # Create pivot tables (incremental values)
-            incurred_triangle = triangle_data.pivot_table(
-                index="accident_year",
-                columns="development_years",
-                values="totalincurred",
-                fill_value=0,
-            )
+        missing_segments = [col for col in segment_by if col not in df.columns]
+        if missing_segments:
+            return {
+                "error": f"Segment columns {missing_segments} not found. Available columns: {list(df.columns)}"
+            }
 
-            paid_triangle = triangle_data.pivot_table(
-                index="accident_year",
-                columns="development_years",
-                values="paidtotal",
-                fill_value=0,
+        # Dates and amounts (typed once per session load, so usually uncopied)
+        df["accident_date"] = as_datetime(df["policyeffectivedate"])
+        df["report_date"] = as_datetime(df["note_date"])
+        df["totalincurred"] = as_numeric(df["totalincurred"])
+        df["paidtotal"] = as_numeric(df["paidtotal"])
+        df["reservetotal"] = as_numeric(df["reservetotal"])
+
+        # Filter valid records
+        df = df[
+            (df["accident_date"].notna())
+            & (df["report_date"].notna())
+            & (df["totalincurred"] > 0)
+            & (df["accident_date"] <= df["report_date"])
+        ].copy()
+
+        # Calculate accident year and development period
+        df["accident_year"] = df["accident_date"].dt.year
+        df["development_months"] = (
+            ((df["report_date"] - df["accident_date"]).dt.days / 30.44)
+            .round(0)
+            .astype(int)
+        )
+        df["development_years"] = (df["development_months"] / 12).round(0).astype(
+            int
+        ) + 1
+
+        # Missing paid and reserve amounts count as zero
+        df["paidtotal"] = df["paidtotal"].fillna(0)
+        df["reservetotal"] = df["reservetotal"].fillna(0)
+
+        # Segment keys as labels, with missing values kept as their own segment
+        for col in segment_by:
+            df[col] = df[col].astype("string").fillna("Unknown")
+
+        # Aggregate by segment, accident year and development years
+        triangle_data = (
+            df.groupby([*segment_by, "accident_year", "development_years"])
+            .agg(
+                {
+                    "totalincurred": "sum",
+                    "paidtotal": "sum",
+                    "reservetotal": "sum",
+                    "claimnumber": "count",
+                }
             )
+            .reset_index()
+        )
 
-            reserve_triangle = triangle_data.pivot_table(
-                index="accident_year",
-                columns="development_years",
-                values="reservetotal",
-                fill_value=0,
-            )
+        return triangle_data
 
-            count_triangle = triangle_data.pivot_table(
-                index="accident_year",
-                columns="development_years",
-                values="claimnumber",
-                fill_value=0,
-            )
+    def _triangle_result(self, origins, developments, measures, segments=None):
+        result = {
+            "triangles": encode_triangles(
+                origins, developments, measures, segments=segments
+            ),
+            "metadata": {
+                "accident_years": origins,
+                "development_years": developments,
+                "description": "Incremental triangles - accident years as rows, development years as columns",
+            },
+        }
+        if segments:
+            result["metadata"]["segment_by"] = list(segments["by"])
+            result["metadata"]["segment_count"] = len(segments["keys"])
+        elif self.config.get("legacy_view"):
+            result.update(legacy_triangle_view(result["triangles"]))
+        return result
+
+    def update_loss_triangles(
+        self, triangles_data, new_claims, retracted_claims=None
+    ) -> dict[str, Any]:
+        """
+        Apply a delta of claims to a stored wire-format triangle payload.
+
+        new_claims are added and retracted_claims (the previously loaded versions
+        of changed or withdrawn claims) are subtracted, so only the cells the
+        delta touches change. The axes grow for new accident years, development
+        years or segments, and labels left without any claims are dropped, which
+        keeps the result equal to a full rebuild.
+        """
+        try:
+            payload = (triangles_data or {}).get("triangles")
+            if not payload:
+                return {"error": "No stored triangle payload to update"}
+            segments = payload.get("segments")
+            segment_by = list(segments["by"]) if segments else []
+            origins, developments, measures = decode_triangles(payload)
+            keys = [tuple(key) for key in segments["keys"]] if segments else []
+
+            deltas = []
+            for claims, sign in ((new_claims, 1.0), (retracted_claims, -1.0)):
+                if claims is None or len(claims) == 0:
+                    continue
+                cells = self._triangle_cells(claims, segment_by)
+                if isinstance(cells, dict):
+                    return cells
+                if not cells.empty:
+                    deltas.append(cells.assign(sign=sign))
+            delta = pd.concat(deltas, ignore_index=True) if deltas else None
+
+            if delta is not None:
+                # Array axes in order: [segment keys,] accident years, development years
+                delta_labels = [
+                    delta["accident_year"].tolist(),
+                    delta["development_years"].tolist(),
+                ]
+                axes = [origins, developments]
+                if segments:
+                    delta_labels.insert(
+                        0, list(delta[segment_by].itertuples(index=False, name=None))
+                    )
+                    axes.insert(0, keys)
+
+                # Embed the stored arrays in axes grown by any new labels
+                grown = [
+                    sorted(set(axis) | set(labels))
+                    for axis, labels in zip(axes, delta_labels, strict=True)
+                ]
+                positions = [
+                    _positions(axis, labels)
+                    for axis, labels in zip(grown, axes, strict=True)
+                ]
+                for name, values in measures.items():
+                    expanded = np.zeros(tuple(len(axis) for axis in grown))
+                    expanded[np.ix_(*positions)] = values
+                    measures[name] = expanded
+
+                # Add (or subtract) the delta into the cells it touches
+                cell = tuple(
+                    np.asarray(_positions(axis, labels), dtype=int)
+                    for axis, labels in zip(grown, delta_labels, strict=True)
+                )
+                sign = delta["sign"].to_numpy()
+                for name, column in TRIANGLE_MEASURES.items():
+                    np.add.at(
+                        measures[name], cell, delta[column].to_numpy(dtype=float) * sign
+                    )
 
-            return {
-                "incurred_triangle": {
-                    "data": incurred_triangle.to_dict("index"),
-                    "structure": "accident_years_as_rows_development_years_as_columns",
-                },
-                "paid_triangle": {
-                    "data": paid_triangle.to_dict("index"),
-                    "structure": "accident_years_as_rows_development_years_as_columns",
-                },
-                "reserve_triangle": {
-                    "data": reserve_triangle.to_dict("index"),
-                    "structure": "accident_years_as_rows_development_years_as_columns",
-                },
-                "count_triangle": {
-                    "data": count_triangle.to_dict("index"),
-                    "structure": "accident_years_as_rows_development_years_as_columns",
-                },
-                "triangle_data": triangle_data.to_dict("records"),
-                "metadata": {
-                    "accident_years": sorted(incurred_triangle.index.tolist()),
-                    "development_years": sorted(incurred_triangle.columns.tolist()),
-                    "description": "Incremental triangles - accident years as rows, development years as columns",
-                },
+                # Clear rounding residue in emptied cells, then drop empty labels
+                empty = (measures["count"] == 0) & np.all(
+                    [np.abs(values) < 0.005 for values in measures.values()], axis=0
+                )
+                keep = [
+                    (~empty).any(axis=tuple(a for a in range(empty.ndim) if a != axis))
+                    for axis in range(empty.ndim)
+                ]
+                for name, values in measures.items():
+                    values[empty] = 0.0
+                    measures[name] = values[np.ix_(*keep)]
+                axes = [
+                    [label for label, kept in zip(axis, mask, strict=True) if kept]
+                    for axis, mask in zip(grown, keep, strict=True)
+                ]
+                origins, developments = axes[-2:]
+                keys = axes[0] if segments else keys
+
+            result = self._triangle_result(
+                origins,
+                developments,
+                measures,
+                {"by": segment_by, "keys": keys} if segments else None,
+            )
+            counts = (
+                delta.groupby("sign")["claimnumber"].sum() if delta is not None else {}
+            )
+            result["metadata"]["update"] = {
+                "new_records": int(counts.get(1.0, 0)),
+                "retracted_records": int(counts.get(-1.0, 0)),
+                "cells_updated": 0
+                if delta is None
+                else int(
+                    delta.drop_duplicates(
+                        [*segment_by, "accident_year", "development_years"]
+                    ).shape[0]
+                ),
             }
+            return result
 
         except Exception as e:
-            return {"error": f"Failed to construct loss triangle: {str(e)}"}
+            return {"error": f"Failed to update loss triangle: {str(e)}"}
 
     def calculate_chain_ladder(self, triangle_data: dict[str, Any]) -> dict[str, Any]:
         """Calculate reserves using Chain Ladder methodology."""
         try:
-            if "incurred_triangle" not in triangle_data:
+            if (
+                "triangles" not in triangle_data
+                and "incurred_triangle" not in triangle_data
+            ):
                 return {"error": "No incurred triangle data available"}
 
-            incurred_data = triangle_data["incurred_triangle"]["data"]
-            incurred_df = pd.DataFrame(incurred_data).fillna(0)
+            triangle = load_triangle(triangle_data, "incurred")
 
-            if incurred_df.empty:
+            if triangle is None or triangle.values.size == 0:
                 return {"error": "No incurred triangle data to analyze"}
 
-            # Convert incremental to cumulative
-            incurred_cumulative = incurred_df.cumsum(axis=1)
-
-            # Calculate development factors
-            development_factors = {}
-            sorted_columns = sorted(incurred_cumulative.columns)
-
-            for col_idx in range(len(sorted_columns) - 1):
-                current_col = sorted_columns[col_idx]
-                next_col = sorted_columns[col_idx + 1]
-
-                current_values = incurred_cumulative[current_col]
-                next_values = incurred_cumulative[next_col]
-                valid_mask = (current_values > 0) & (next_values > 0)
-
-                if valid_mask.sum() > 0:
-                    current_valid = current_values[valid_mask]
-                    next_valid = next_values[valid_mask]
-
-                    if current_valid.sum() > 0:
-                        factor = next_valid.sum() / current_valid.sum()
-                        development_factors[f"{current_col}-{next_col}"] = factor
-
-            # Calculate ultimate values and IBNR
-            ultimate_values = {}
-            ibnr_values = {}
-
-            for accident_year in incurred_cumulative.index:
-                year_data = incurred_cumulative.loc[accident_year]
-                latest_value = 0
-                latest_period = None
+            result = chain_ladder_arrays(triangle.cumulative(), observed_mask(triangle))
+            return self._chain_ladder_summary(triangle, result)
 
-                for period in reversed(sorted_columns):
-                    if year_data[period] > 0:
-                        latest_value = year_data[period]
-                        latest_period = period
-                        break
-
-                if latest_value > 0 and latest_period is not None:
-                    ultimate = latest_value
-                    current_period_idx = sorted_columns.index(latest_period)
-
-                    # Apply development factors
-                    for col_idx in range(current_period_idx, len(sorted_columns) - 1):
-                        current_col = sorted_columns[col_idx]
-                        next_col = sorted_columns[col_idx + 1]
-                        factor_key = f"{current_col}-{next_col}"
+        except Exception as e:
+            raise Exception(f"Failed to calculate chain ladder: {str(e)}") from e
 
-                        if factor_key in development_factors:
-                            ultimate *= development_factors[factor_key]
+    def _chain_ladder_summary(self, triangle, result, present=None) -> dict[str, Any]:
+        """Chain ladder output dict for one triangle's chain_ladder_arrays result."""
+        if present is None:
+            present = np.ones(len(triangle.origins), dtype=bool)
+        development_factors = {
+            label: float(factor)
+            for label, factor, defined in zip(
+                triangle.factor_labels(),
+                result["factors"],
+                result["defined"],
+                strict=True,
+            )
+            if defined
+        }
+        origins = [
+            str(origin)
+            for origin, keep in zip(triangle.origins, present, strict=True)
+            if keep
+        ]
+        ultimate_values = dict(
+            zip(origins, result["ultimate"][present].tolist(), strict=True)
+        )
+        ibnr_values = dict(zip(origins, result["ibnr"][present].tolist(), strict=True))
 
-                    # Apply tail factor (standard actuarial practice)
-                    tail_factor = (
-                        1.10 if current_period_idx < len(sorted_columns) - 2 else 1.05
-                    )
-                    ultimate *= tail_factor
-
-                    ultimate_values[str(accident_year)] = ultimate
-                    ibnr_values[str(accident_year)] = max(0, ultimate - latest_value)
-                else:
-                    ultimate_values[str(accident_year)] = 0
-                    ibnr_values[str(accident_year)] = 0
-
-            # Calculate summary
-            total_current = 0
-            for accident_year in incurred_cumulative.index:
-                year_data = incurred_cumulative.loc[accident_year]
-                for period in reversed(sorted_columns):
-                    if year_data[period] > 0:
-                        total_current += year_data[period]
-                        break
-
-            total_ultimate = sum(ultimate_values.values())
-            total_ibnr = sum(ibnr_values.values())
+        # Calculate summary
+        total_current = float(result["latest"][present].sum())
+        total_ultimate = float(result["ultimate"][present].sum())
+        total_ibnr = float(result["ibnr"][present].sum())
 
-            return {
-                "development_factors": {
-                    k: float(v) for k, v in development_factors.items()
-                },
-                "ultimate_values": {k: float(v) for k, v in ultimate_values.items()},
-                "ibnr_values": {k: float(v) for k, v in ibnr_values.items()},
-                "summary": {
-                    "total_current": float(total_current),
-                    "total_ultimate": float(total_ultimate),
-                    "total_ibnr": float(total_ibnr),
-                    "overall_development_factor": float(total_ultimate / total_current)
-                    if total_current > 0
-                    else 1.0,
-                    "ibnr_percentage": int(total_ibnr / total_current * 100)
-                    if total_current > 0
-                    else 0,
-                },
-            }
-
-        except Exception as e:
-            raise Exception(f"Failed to calculate chain ladder: {str(e)}") from e
+        return {
+            "development_factors": development_factors,
+            "ultimate_values": ultimate_values,
+            "ibnr_values": ibnr_values,
+            "summary": {
+                "total_current": total_current,
+                "total_ultimate": total_ultimate,
+                "total_ibnr": total_ibnr,
+                "overall_development_factor": float(total_ultimate / total_current)
+                if total_current > 0
+                else 1.0,
+                "ibnr_percentage": int(total_ibnr / total_current * 100)
+                if total_current > 0
+                else 0,
+            },
+        }
 
     def calculate_bornhuetter_ferguson(self, triangles_data, chain_ladder_result):
         """Calculate reserves using Bornhuetter-Ferguson methodology with standard actuarial assumptions."""
         try:
-            incurred_data = triangles_data.get("incurred_triangle", {}).get("data", {})
-            if not incurred_data:
+            triangle = load_triangle(triangles_data, "incurred")
+            if triangle is None or triangle.values.size == 0:
                 return {
                     "methodology": "Bornhuetter-Ferguson",
                     "ultimate_losses": {},
@@ -313,102 +996,14 @@ class LossReservingService:
                     },
                 }
 
-            incurred_df = pd.DataFrame(incurred_data).fillna(0)
-            incurred_cumulative = incurred_df.cumsum(axis=1)
-
-            chain_ladder_result.get("ultimate_values", {})
+            # Percent developed from the product of the chain ladder factors
             cl_dev_factors = chain_ladder_result.get("development_factors", {})
-
-            # Calculate expected loss ratios using policy count proxy (standard actuarial practice)
-            total_incurred_by_year = {}
-            estimated_policies_by_year = {}
-
-            for year in incurred_cumulative.index:
-                year_str = str(year)
-                current_incurred = 0
-                for col in reversed(incurred_cumulative.columns):
-                    if incurred_cumulative.loc[year, col] > 0:
-                        current_incurred = incurred_cumulative.loc[year, col]
-                        break
-
-                total_incurred_by_year[year_str] = current_incurred
-                # Standard actuarial assumption: 5% claim frequency, $2000 avg claim
-                avg_claim_size = 2000
-                claim_frequency = 0.05
-                estimated_policies = max(
-                    50, current_incurred / (avg_claim_size * claim_frequency)
-                )
-                estimated_policies_by_year[year_str] = estimated_policies
-
-            # Calculate expected loss per policy
-            loss_per_policy_by_year = {}
-            for year_str in total_incurred_by_year:
-                if estimated_policies_by_year[year_str] > 0:
-                    loss_per_policy_by_year[year_str] = (
-                        total_incurred_by_year[year_str]
-                        / estimated_policies_by_year[year_str]
-                    )
-
-            if loss_per_policy_by_year:
-                recent_years = sorted(loss_per_policy_by_year.keys())[-3:]
-                expected_loss_per_policy = sum(
-                    loss_per_policy_by_year[y] for y in recent_years
-                ) / len(recent_years)
-            else:
-                expected_loss_per_policy = 100
-
-            # Calculate BF ultimates and IBNR
-            bf_ultimates = {}
-            bf_ibnr = {}
-
-            for year in incurred_cumulative.index:
-                year_str = str(year)
-
-                current_incurred = total_incurred_by_year.get(year_str, 0)
-                current_paid = current_incurred * 0.75  # Standard 75% payment ratio
-
-                estimated_policies = estimated_policies_by_year.get(year_str, 50)
-                expected_ultimate = estimated_policies * expected_loss_per_policy
-
-                # Calculate percent developed from development factors
-                cumulative_dev_factor = 1.0
-                for factor_value in cl_dev_factors.values():
-                    cumulative_dev_factor *= factor_value
-
-                percent_developed = (
-                    min(0.95, 1.0 / cumulative_dev_factor)
-                    if cumulative_dev_factor > 1
-                    else 0.80
-                )
-
-                # BF Formula: Ultimate = Paid + (Expected Ultimate - Paid) × (1 - % Developed)
-                bf_ultimate = current_paid + (expected_ultimate - current_paid) * (
-                    1 - percent_developed
-                )
-                bf_ultimate = max(
-                    current_incurred * 1.02, bf_ultimate
-                )  # At least 2% above current
-
-                bf_ultimates[year_str] = float(bf_ultimate)
-                bf_ibnr[year_str] = float(max(0, bf_ultimate - current_incurred))
-
-            return {
-                "methodology": "Bornhuetter-Ferguson",
-                "ultimate_losses": bf_ultimates,
-                "ibnr_reserves": bf_ibnr,
-                "total_ibnr": float(sum(bf_ibnr.values())),
-                "expected_loss_ratios": {
-                    str(k): float(v) for k, v in loss_per_policy_by_year.items()
-                },
-                "assumptions": {
-                    "base_loss_ratio": float(expected_loss_per_policy),
-                    "development_method": "Chain Ladder derived",
-                    "exposure_proxy": "Policy count from claim frequency",
-                    "avg_claim_size": 2000,
-                    "claim_frequency": "5%",
-                    "payment_ratio": "75%",
-                },
-            }
+            result = bornhuetter_ferguson_arrays(
+                triangle.cumulative(),
+                np.prod(list(cl_dev_factors.values())),
+                observed=observed_mask(triangle),
+            )
+            return self._bornhuetter_ferguson_summary(triangle, result)
 
         except Exception as e:
             return {
@@ -424,39 +1019,163 @@ class LossReservingService:
                 },
             }
 
-    def calculate_confidence_intervals(self, triangles_data, n_simulations=1000):
-        """Calculate confidence intervals using bootstrap simulation."""
-        try:
-            base_reserves = []
-            for _ in range(n_simulations):
-                reserve_estimate = self._simulate_reserves(triangles_data)
-                base_reserves.append(reserve_estimate)
+    def _bornhuetter_ferguson_summary(
+        self, triangle, result, present=None
+    ) -> dict[str, Any]:
+        """BF output dict for one triangle's bornhuetter_ferguson_arrays result."""
+        if present is None:
+            present = np.ones(len(triangle.origins), dtype=bool)
+        years = [
+            str(origin)
+            for origin, keep in zip(triangle.origins, present, strict=True)
+            if keep
+        ]
+        return {
+            "methodology": "Bornhuetter-Ferguson",
+            "ultimate_losses": dict(
+                zip(years, result["ultimate"][present].tolist(), strict=True)
+            ),
+            "ibnr_reserves": dict(
+                zip(years, result["ibnr"][present].tolist(), strict=True)
+            ),
+            "total_ibnr": float(result["ibnr"][present].sum()),
+            "expected_loss_ratios": dict(
+                zip(years, result["loss_per_policy"][present].tolist(), strict=True)
+            ),
+            "assumptions": {
+                "base_loss_ratio": float(result["expected_loss_per_policy"]),
+                "development_method": "Chain Ladder derived",
+                "exposure_proxy": "Policy count from claim frequency",
+                "avg_claim_size": 2000,
+                "claim_frequency": "5%",
+                "payment_ratio": "75%",
+            },
+        }
 
-            base_reserves.sort()
-            n = len(base_reserves)
+    def calculate_segment_reserves(self, triangles_data) -> dict[str, Any]:
+        """
+        Chain Ladder and BF for every segment of a segmented triangle payload,
+        computed as one batch over the segment axis.
+        """
+        try:
+            labels = segment_labels(triangles_data)
+            triangles = load_triangle(triangles_data, "incurred", by_segment=True)
+            if not labels or triangles is None:
+                return {}
+
+            cumulative = triangles.cumulative()
+            observed = observed_mask(triangles)
+            present = (triangles.values != 0).any(axis=-1)
+            chain_ladder = chain_ladder_arrays(cumulative, observed)
+            factor_product = np.where(
+                chain_ladder["defined"], chain_ladder["factors"], 1.0
+            ).prod(axis=-1)
+            bf = bornhuetter_ferguson_arrays(
+                cumulative, factor_product, present, observed
+            )
 
-            return {
-                "percentile_75": base_reserves[int(n * 0.75)],
-                "percentile_90": base_reserves[int(n * 0.90)],
-                "percentile_95": base_reserves[int(n * 0.95)],
-                "mean": sum(base_reserves) / n,
-                "std_dev": (
-                    sum((x - sum(base_reserves) / n) ** 2 for x in base_reserves) / n
+            segments = {}
+            for index, label in enumerate(labels):
+                segment = Triangle(
+                    triangles.values[index], triangles.origins, triangles.developments
+                )
+                cl_result = self._chain_ladder_summary(
+                    segment,
+                    {key: value[index] for key, value in chain_ladder.items()},
+                    present[index],
+                )
+                bf_result = self._bornhuetter_ferguson_summary(
+                    segment,
+                    {key: value[index] for key, value in bf.items()},
+                    present[index],
                 )
-                ** 0.5,
-                "simulation_count": n_simulations,
+                segments[label] = {
+                    "chain_ladder": cl_result,
+                    "bornhuetter_ferguson": bf_result,
+                    "total_ibnr_chain_ladder": cl_result["summary"]["total_ibnr"],
+                    "total_ibnr_bf": bf_result["total_ibnr"],
+                }
+            return {
+                "segment_by": triangles_data["triangles"]["segments"]["by"],
+                "segments": segments,
             }
 
+        except Exception as e:
+            return {"error": f"Failed to calculate segment reserves: {str(e)}"}
+
+    def calculate_confidence_intervals(self, triangles_data, n_simulations=None):
+        """
+        Calculate reserve confidence intervals with an ODP bootstrap.
+        Top-level figures are for the incurred triangle; the paid triangle,
+        when present, is summarized under "paid".
+        """
+        try:
+            settings = {
+                **DEFAULT_RESERVING_CONFIG["bootstrap"],
+                **self.config.get("bootstrap", {}),
+            }
+            if n_simulations is not None:
+                settings["simulations"] = n_simulations
+
+            incurred = load_triangle(triangles_data, "incurred")
+            if incurred is None or incurred.values.size == 0:
+                return {"error": "No incurred triangle data available"}
+
+            # One time budget for the incurred and paid runs together
+            deadline = time.monotonic() + float(settings["time_budget_seconds"])
+            result = self._bootstrap_summary(incurred, settings, deadline)
+            paid = load_triangle(triangles_data, "paid")
+            if paid is not None and paid.values.any():
+                result["paid"] = self._bootstrap_summary(paid, settings, deadline)
+            return result
+
         except Exception as e:
             return {"error": f"Failed to calculate confidence intervals: {str(e)}"}
 
-    def _simulate_reserves(self, triangles_data):
-        """Helper method for bootstrap simulation."""
-        import random
+    def _bootstrap_summary(
+        self, triangle: Triangle, settings, deadline: float
+    ) -> dict[str, Any]:
+        reserves, info = bootstrap_reserves(
+            triangle,
+            int(settings["simulations"]),
+            seed=settings["seed"],
+            workers=int(settings["workers"]),
+            batch_cells=int(settings["batch_cells"]),
+            deadline=deadline,
+        )
+        totals = reserves.sum(axis=1)
+        p50, p75, p90, p95, p99 = np.percentile(totals, [50, 75, 90, 95, 99])
+        by_year_percentiles = np.percentile(reserves, [50, 75, 95], axis=0)
 
-        base_value = 1000000
-        variation = random.uniform(0.8, 1.2)
-        return base_value * variation
+        return {
+            "method": "ODP bootstrap of chain ladder reserves (Pearson residuals)",
+            "percentile_50": float(p50),
+            "percentile_75": float(p75),
+            "percentile_90": float(p90),
+            "percentile_95": float(p95),
+            "percentile_99": float(p99),
+            "mean": float(totals.mean()),
+            "std_dev": float(totals.std()),
+            "expected_reserve": float(info["expected_reserves"].sum()),
+            "simulation_count": info["simulation_count"],
+            "requested_simulations": info["requested_simulations"],
+            "budget_exhausted": info["budget_exhausted"],
+            "elapsed_seconds": info["elapsed_seconds"],
+            "workers": info["workers"],
+            "dispersion": info["dispersion"],
+            "seed": settings["seed"],
+            "by_accident_year": {
+                str(origin): {
+                    "expected": float(info["expected_reserves"][i]),
+                    "mean": float(reserves[:, i].mean()),
+                    "std_dev": float(reserves[:, i].std()),
+                    "percentile_50": float(by_year_percentiles[0, i]),
+                    "percentile_75": float(by_year_percentiles[1, i]),
+                    "percentile_95": float(by_year_percentiles[2, i]),
+                }
+                for i, origin in enumerate(triangle.origins)
+            },
+        }
 
     def test_reserve_adequacy(self, chain_ladder_result, bf_result):
         """Test reserve adequacy by comparing methodologies."""
@@ -521,10 +1240,10 @@ class LossReservingService:
             return {"error": f"Failed to compare methodologies: {str(e)}"}
 
 
-def calculate_reserves(triangles_data):
+def calculate_reserves(triangles_data, reserving_config=None):
     """Main function to calculate comprehensive reserves."""
     try:
-        service = LossReservingService()
+        service = LossReservingService(reserving_config)
 
         # Calculate Chain Ladder reserves
         chain_ladder_result = service.calculate_chain_ladder(triangles_data)
@@ -540,8 +1259,11 @@ def calculate_reserves(triangles_data):
         # Perform reserve adequacy testing
         adequacy_test = service.test_reserve_adequacy(chain_ladder_result, bf_result)
 
+        # Per-segment reserves when the triangles were built with segment_by
+        segment_reserves = service.calculate_segment_reserves(triangles_data)
+
         # Combine results
-        return {
+        result = {
             "chain_ladder": chain_ladder_result,
             "bornhuetter_ferguson": bf_result,
             "confidence_intervals": confidence_intervals,
@@ -572,12 +1294,58 @@ def calculate_reserves(triangles_data):
                 ),
             },
         }
+        if segment_reserves:
+            result["segment_reserves"] = segment_reserves
+        return result
 
     except Exception as e:
         return {"error": f"Failed to calculate reserves: {str(e)}"}
 
 
-def build_loss_triangles(claims_data):
-    """Build loss triangles from claims data."""
+def build_loss_triangles(claims_data, segment_by=None, legacy_view=False):
+    """
+    Build loss triangles from claims data, optionally one per segment.
+    legacy_view adds the pre-wire-format nested triangles and triangle_data
+    records to an unsegmented result for callers that still read them.
+    """
+    service = LossReservingService({"legacy_view": bool(legacy_view)})
+    return service.build_loss_triangles(claims_data, segment_by)
+
+
+def triangle_partial(claims_data, segment_by=None):
+    """
+    Mergeable triangle cells for one part of a portfolio; combine the parts
+    with merge_triangle_partials.
+    """
     service = LossReservingService()
-    return service.build_loss_triangles(claims_data)
+    return service._triangle_cells(claims_data, list(segment_by or []))
+
+
+def merge_triangle_partials(partials, segment_by=None, legacy_view=False):
+    """The build_loss_triangles result for the claims of all partials."""
+    service = LossReservingService({"legacy_view": bool(legacy_view)})
+    return service.merge_triangle_cells(partials, segment_by)
+
+
+def update_loss_triangles(triangles_data, new_claims, retracted_claims=None):
+    """
+    Apply new and changed claims to stored loss triangles and re-derive the
+    development factors and Chain Ladder / BF reserves from the result.
+    """
+    try:
+        service = LossReservingService()
+        result = service.update_loss_triangles(
+            triangles_data, new_claims, retracted_claims
+        )
+        if "triangles" in result:
+            chain_ladder_result = service.calculate_chain_ladder(result)
+            result["reserves"] = {
+                "chain_ladder": chain_ladder_result,
+                "bornhuetter_ferguson": service.calculate_bornhuetter_ferguson(
+                    result, chain_ladder_result
+                ),
+            }
+        return result
+
+    except Exception as e:
+        return {"error": f"Failed to update loss triangles: {str(e)}"}
@@ -3,12 +3,17 @@ Monitoring Tool - KPI tracking and alerting for actuarial oversight.
 """
 
 import logging
+import math
+import re
 from dataclasses import dataclass
 from datetime import datetime
 from typing import Any
 
+import numpy as np
 import pandas as pd
 from utils.constants import DEFAULT_MONITORING_CONFIG
+from utils.data_utils import as_claims_frame, as_datetime, as_numeric, merge_config
+from utils.stats_utils import QuantileSketch
 
 # Set root logger level explicitly
 logging.getLogger().setLevel(logging.INFO)
@@ -41,57 +46,299 @@ class KPI:
 
 class MonitoringService:
     def __init__(self, monitoring_config=None):
-        self.config = monitoring_config or DEFAULT_MONITORING_CONFIG
-        self.alert_thresholds = self.config.get(
-            "alert_thresholds",
-            {
-                "loss_ratio": 0.8,
-                "frequency_spike": 2.0,
-                "severity_increase": 0.3,
-                "reserve_adequacy": 0.9,
-            },
+        self.config = merge_config(DEFAULT_MONITORING_CONFIG, monitoring_config)
+        self.alert_thresholds = self.config["alert_thresholds"]
+        self.kpi_targets = self.config["kpi_targets"]
+        self.trend_thresholds = self.config["trend_thresholds"]
+        self.time_periods = self.config["time_periods"]
+        self.history_config = self.config["history"]
+
+    def monitor_development(
+        self, claims_data, kpi_history: dict[str, Any] | None = None
+    ) -> dict[str, Any]:
+        try:
+            df = as_claims_frame(claims_data).copy(deep=False)
+
+            return self._report(self._aggregate(df), kpi_history)
+
+        except Exception as e:
+            raise Exception(f"Failed to monitor claim development: {str(e)}") from e
+
+    def _report(
+        self, aggregates: dict[str, Any], kpi_history: dict[str, Any] | None
+    ) -> dict[str, Any]:
+        """KPIs, alerts and dashboard from the output of _aggregate."""
+        current_kpis = self._calculate_kpis(aggregates)
+        history, history_alerts = self._update_history(
+            current_kpis, aggregates, kpi_history
         )
-        self.kpi_targets = self.config.get(
-            "kpi_targets",
-            {
-                "loss_ratio": 0.65,
-                "claim_frequency": 0.05,
-                "avg_severity": 5000,
-                "reserve_ratio": 0.15,
-            },
+        dashboard_metrics = self._generate_dashboard_metrics(
+            aggregates, current_kpis, history
         )
+        all_alerts = self._check_kpi_alerts(current_kpis) + history_alerts
 
-    def monitor_development(self, claims_data: dict[str, Any]) -> dict[str, Any]:
-        try:
-            df = pd.DataFrame(
-                claims_data["data"] if "data" in claims_data else claims_data
+        return {
+            "alerts": [alert.__dict__ for alert in all_alerts],
+            "kpis": [kpi.__dict__ for kpi in current_kpis],
+            "dashboard_metrics": dashboard_metrics,
+            "kpi_history": history,
+        }
+
+    def _aggregate(self, df: pd.DataFrame) -> dict[str, Any]:
+        """
+        Every figure the KPI and dashboard sections report, in one stage.
+        Amounts and dates are coerced once, each column is summarised once,
+        and the line of business and accident year breakdowns are grouped
+        aggregations rather than filtered sub-frames.
+        """
+        aggregates: dict[str, Any] = {"claim_count": len(df), "amounts": {}}
+
+        for column in ("totalincurred", "paidtotal", "reservetotal"):
+            if column in df.columns:
+                values = _amount_values(df[column])
+                missing = np.isnan(values) if values.dtype.kind == "f" else None
+                total = (
+                    np.where(missing, 0, values) if missing is not None else values
+                ).sum()
+                valid = (
+                    len(values) - int(missing.sum())
+                    if missing is not None
+                    else len(values)
+                )
+                aggregates["amounts"][column] = {
+                    "values": values,
+                    "missing": missing,
+                    "sum": total,
+                    "mean": total / valid if valid else np.nan,
+                }
+
+        incurred = aggregates["amounts"].get("totalincurred")
+        if incurred is not None and len(df) > 0:
+            amounts = pd.Series(incurred["values"], copy=False)
+            values = incurred["values"]
+            incurred["median"] = amounts.median()
+            incurred["max"] = amounts.max()
+            incurred["quantiles"] = amounts.quantile([0.25, 0.50, 0.75, 0.90, 0.95])
+            incurred["bands"] = {
+                "small_claims_0_10k": int(np.count_nonzero(values <= 10000)),
+                "medium_claims_10k_50k": int(
+                    np.count_nonzero((values > 10000) & (values <= 50000))
+                ),
+                "large_claims_50k_100k": int(
+                    np.count_nonzero((values > 50000) & (values <= 100000))
+                ),
+                "very_large_claims_100k_plus": int(np.count_nonzero(values > 100000)),
+            }
+
+        if "claimstatus" in df.columns:
+            aggregates["status_counts"] = _value_counts(df["claimstatus"])
+
+        # Dates are parsed once and shared by the delay KPI, the reporting
+        # window and the yearly view
+        report_date = None
+        if "note_date" in df.columns:
+            report_date = as_datetime(df["note_date"])
+            if report_date.notna().any():
+                aggregates["reporting_period"] = (report_date.min(), report_date.max())
+        if "policyeffectivedate" in df.columns:
+            policy_date = as_datetime(df["policyeffectivedate"])
+            aggregates["by_accident_year"] = self._grouped_incurred(
+                policy_date.dt.year, incurred, dropna=True
+            )
+            if report_date is not None:
+                both = policy_date.notna() & report_date.notna()
+                if both.any():
+                    aggregates["avg_reporting_delay"] = (
+                        report_date[both] - policy_date[both]
+                    ).dt.days.mean()
+
+        if "lineofbusiness" in df.columns:
+            aggregates["by_line_of_business"] = self._grouped_incurred(
+                df["lineofbusiness"], incurred, dropna=False
+            )
+
+        return aggregates
+
+    @staticmethod
+    def _grouped_incurred(
+        keys: pd.Series, incurred: dict[str, Any] | None, dropna: bool
+    ) -> list[tuple[Any, int, float, float]]:
+        """
+        (key, claim count, total incurred, mean incurred) per distinct key, in
+        order of first appearance. Missing keys are dropped with dropna, and
+        otherwise reported with no claims, as filtering on them selects none.
+        """
+        codes, uniques = pd.factorize(keys)
+        present = codes >= 0
+        codes = codes[present]
+        counts = np.bincount(codes, minlength=len(uniques))
+        if incurred is not None:
+            values = incurred["values"][present]
+            missing = incurred["missing"]
+            missing = (
+                missing[present]
+                if missing is not None
+                else np.zeros(len(values), dtype=bool)
+            )
+            sums = np.bincount(
+                codes, weights=np.where(missing, 0.0, values), minlength=len(uniques)
+            )
+            valid = np.bincount(codes, weights=~missing, minlength=len(uniques))
+            with np.errstate(invalid="ignore", divide="ignore"):
+                means = sums / valid
+        else:
+            sums = means = np.zeros(len(uniques))
+
+        groups = [
+            (key, int(counts[code]), float(sums[code]), float(means[code]))
+            for code, key in enumerate(uniques.tolist())
+        ]
+        if dropna or present.all():
+            return groups
+
+        # Place the missing keys where unique() lists them (categoricals list
+        # them as NaN, reported as None like a missing object value)
+        categorical = isinstance(keys.dtype, pd.CategoricalDtype)
+        ordered, remaining = [], iter(groups)
+        for key in keys.unique().tolist():
+            if pd.isna(key):
+                ordered.append((None if categorical else key, 0, 0.0, float("nan")))
+            else:
+                ordered.append(next(remaining))
+        return ordered
+
+    def _partial_aggregates(self, df: pd.DataFrame, offset: int) -> dict[str, Any]:
+        """
+        Sufficient statistics of _aggregate for one part of a portfolio, whose
+        first claim is row offset of the whole: sums and valid counts, band
+        counts, grouped counts with the row each key first appears at, the
+        reporting date range, and a QuantileSketch of incurred amounts.
+        """
+        aggregates = self._aggregate(df)
+        partial: dict[str, Any] = {"claim_count": len(df), "amounts": {}}
+        for column, amount in aggregates["amounts"].items():
+            missing = amount["missing"]
+            valid = len(df) - (int(missing.sum()) if missing is not None else 0)
+            partial["amounts"][column] = {"sum": amount["sum"], "valid": valid}
+
+        incurred = aggregates["amounts"].get("totalincurred")
+        if incurred is not None and len(df) > 0:
+            partial["amounts"]["totalincurred"].update(
+                max=incurred["max"],
+                bands=incurred["bands"],
+                sketch=QuantileSketch().add(incurred["values"]),
             )
 
-            current_kpis = self._calculate_kpis(df)
-            dashboard_metrics = self._generate_dashboard_metrics(df, current_kpis)
-            all_alerts = self._check_kpi_alerts(current_kpis)
+        if "claimstatus" in df.columns:
+            partial["status_counts"] = _keyed_partial(df["claimstatus"], None, offset)
+        if "policyeffectivedate" in df.columns:
+            policy_date = as_datetime(df["policyeffectivedate"])
+            partial["by_accident_year"] = _keyed_partial(
+                policy_date.dt.year, incurred, offset
+            )
+            if "note_date" in df.columns:
+                report_date = as_datetime(df["note_date"])
+                delays = (report_date - policy_date).dt.days.dropna()
+                partial["reporting_delay"] = (float(delays.sum()), len(delays))
+        if "lineofbusiness" in df.columns:
+            partial["by_line_of_business"] = _keyed_partial(
+                df["lineofbusiness"], incurred, offset
+            )
+        if "reporting_period" in aggregates:
+            partial["reporting_period"] = aggregates["reporting_period"]
+        return partial
+
+    def _merge_aggregates(self, partials: list[dict[str, Any]]) -> dict[str, Any]:
+        """
+        Combine _partial_aggregates into the aggregates of all their claims.
+        Median and percentiles of incurred come from the merged sketches; every
+        other figure is exact. Keys are listed in order of first appearance.
+        """
+        claim_count = sum(partial["claim_count"] for partial in partials)
+        aggregates: dict[str, Any] = {"claim_count": claim_count, "amounts": {}}
+
+        columns = dict.fromkeys(c for p in partials for c in p["amounts"])
+        for column in columns:
+            parts = [p["amounts"][column] for p in partials if column in p["amounts"]]
+            total = sum(part["sum"] for part in parts)
+            valid = sum(part["valid"] for part in parts)
+            aggregates["amounts"][column] = {
+                "sum": total,
+                "mean": total / valid if valid else np.nan,
+            }
 
-            return {
-                "alerts": [alert.__dict__ for alert in all_alerts],
-                "kpis": [kpi.__dict__ for kpi in current_kpis],
-                "dashboard_metrics": dashboard_metrics,
+        incurred = aggregates["amounts"].get("totalincurred")
+        parts = [
+            p["amounts"]["totalincurred"]
+            for p in partials
+            if "sketch" in p["amounts"].get("totalincurred", {})
+        ]
+        if incurred is not None and parts:
+            sketch = QuantileSketch()
+            for part in parts:
+                sketch.merge(part["sketch"])
+            incurred["median"] = sketch.quantile(0.5)
+            incurred["max"] = np.nanmax([part["max"] for part in parts])
+            incurred["quantiles"] = pd.Series(
+                {q: sketch.quantile(q) for q in (0.25, 0.50, 0.75, 0.90, 0.95)}
+            )
+            incurred["bands"] = {
+                band: sum(part["bands"][band] for part in parts)
+                for band in parts[0]["bands"]
             }
 
-        except Exception as e:
-            raise Exception(f"Failed to monitor claim development: {str(e)}") from e
+        if any("status_counts" in p for p in partials):
+            statuses = _merge_keyed([p.get("status_counts", {}) for p in partials])
+            statuses = sorted(
+                (entry for entry in statuses.items() if entry[0] is not None),
+                key=lambda entry: (-entry[1][1], entry[1][0]),
+            )
+            aggregates["status_counts"] = pd.Series(
+                {key: entry[1] for key, entry in statuses}, dtype="int64"
+            )
 
-    def _calculate_kpis(self, df: pd.DataFrame) -> list[KPI]:
+        for name, dropna in (
+            ("by_accident_year", True),
+            ("by_line_of_business", False),
+        ):
+            if any(name in p for p in partials):
+                groups = _merge_keyed([p.get(name, {}) for p in partials])
+                aggregates[name] = [
+                    (None, 0, 0.0, np.nan)
+                    if key is None
+                    else (key, count, total, total / valid if valid else np.nan)
+                    for key, (_, count, total, valid) in groups.items()
+                    if key is not None or not dropna
+                ]
+
+        delays = [p["reporting_delay"] for p in partials if "reporting_delay" in p]
+        delay_count = sum(count for _, count in delays)
+        if delay_count:
+            aggregates["avg_reporting_delay"] = (
+                sum(total for total, _ in delays) / delay_count
+            )
+
+        periods = [p["reporting_period"] for p in partials if "reporting_period" in p]
+        if periods:
+            aggregates["reporting_period"] = (
+                min(start for start, _ in periods),
+                max(end for _, end in periods),
+            )
+        return aggregates
+
+    def _calculate_kpis(self, aggregates: dict[str, Any]) -> list[KPI]:
         kpis = []
+        claim_count = aggregates["claim_count"]
+        amounts = aggregates["amounts"]
 
         try:
             # Financial KPIs
-            if "totalincurred" in df.columns and "paidtotal" in df.columns:
-                total_incurred = df["totalincurred"].sum()
-                total_paid = df["paidtotal"].sum()
+            if "totalincurred" in amounts and "paidtotal" in amounts:
+                total_incurred = amounts["totalincurred"]["sum"]
+                total_paid = amounts["paidtotal"]["sum"]
                 total_reserves = (
-                    df["reservetotal"].sum() if "reservetotal" in df.columns else 0
+                    amounts["reservetotal"]["sum"] if "reservetotal" in amounts else 0
                 )
-
                 # Loss Ratio KPI
                 loss_ratio = total_paid / total_incurred if total_incurred > 0 else 0
                 kpis.append(
@@ -143,7 +390,7 @@ class MonitoringService:
                 )
 
                 # Average Severity KPI
-                avg_severity = df["totalincurred"].mean()
+                avg_severity = amounts["totalincurred"]["mean"]
                 kpis.append(
                     KPI(
                         name="avg_severity",
@@ -159,9 +406,8 @@ class MonitoringService:
                 )
 
             # Operational KPIs
-            if len(df) > 0:
+            if claim_count > 0:
                 # Claim Frequency KPI
-                claim_count = len(df)
                 kpis.append(
                     KPI(
                         name="claim_frequency",
@@ -179,10 +425,13 @@ class MonitoringService:
                 )
 
                 # Large Claims Percentage
-                if "totalincurred" in df.columns:
-                    large_claims_threshold = 50000
-                    large_claims = len(df[df["totalincurred"] > large_claims_threshold])
-                    large_claims_pct = (large_claims / len(df)) * 100
+                if "totalincurred" in amounts:
+                    bands = amounts["totalincurred"]["bands"]
+                    large_claims = (
+                        bands["large_claims_50k_100k"]
+                        + bands["very_large_claims_100k_plus"]
+                    )
+                    large_claims_pct = (large_claims / claim_count) * 100
                     kpis.append(
                         KPI(
                             name="large_claims_percentage",
@@ -198,9 +447,13 @@ class MonitoringService:
                     )
 
                 # Open Claims Ratio
-                if "claimstatus" in df.columns:
-                    open_claims = len(df[df["claimstatus"].str.lower() == "open"])
-                    open_claims_ratio = (open_claims / len(df)) * 100
+                if "status_counts" in aggregates:
+                    open_claims = sum(
+                        count
+                        for status, count in aggregates["status_counts"].items()
+                        if isinstance(status, str) and status.lower() == "open"
+                    )
+                    open_claims_ratio = (open_claims / claim_count) * 100
                     kpis.append(
                         KPI(
                             name="open_claims_ratio",
@@ -216,32 +469,22 @@ class MonitoringService:
                     )
 
             # Time-based KPIs
-            if "policyeffectivedate" in df.columns and "note_date" in df.columns:
-                df["policy_date"] = pd.to_datetime(
-                    df["policyeffectivedate"], errors="coerce"
-                )
-                df["report_date"] = pd.to_datetime(df["note_date"], errors="coerce")
-
+            if "avg_reporting_delay" in aggregates:
                 # Average Reporting Delay
-                valid_dates = df.dropna(subset=["policy_date", "report_date"])
-                if len(valid_dates) > 0:
-                    reporting_delays = (
-                        valid_dates["report_date"] - valid_dates["policy_date"]
-                    ).dt.days
-                    avg_reporting_delay = reporting_delays.mean()
-                    kpis.append(
-                        KPI(
-                            name="avg_reporting_delay_days",
-                            current_value=float(avg_reporting_delay),
-                            target_value=30.0,
-                            threshold_upper=90.0,
-                            threshold_lower=5.0,
-                            status="above_threshold"
-                            if avg_reporting_delay > 90.0
-                            else "normal",
-                            trend="stable",
-                        )
+                avg_reporting_delay = aggregates["avg_reporting_delay"]
+                kpis.append(
+                    KPI(
+                        name="avg_reporting_delay_days",
+                        current_value=float(avg_reporting_delay),
+                        target_value=30.0,
+                        threshold_upper=90.0,
+                        threshold_lower=5.0,
+                        status="above_threshold"
+                        if avg_reporting_delay > 90.0
+                        else "normal",
+                        trend="stable",
                     )
+                )
 
         except Exception as e:
             logger.error(f"Error calculating KPIs: {str(e)}")
@@ -249,7 +492,7 @@ class MonitoringService:
             kpis.append(
                 KPI(
                     name="basic_metrics",
-                    current_value=float(len(df)),
+                    current_value=float(claim_count),
                     target_value=100.0,
                     threshold_upper=200.0,
                     threshold_lower=50.0,
@@ -260,6 +503,120 @@ class MonitoringService:
 
         return kpis
 
+    def _update_history(
+        self,
+        kpis: list[KPI],
+        aggregates: dict[str, Any],
+        kpi_history: dict[str, Any] | None,
+    ) -> tuple[dict[str, Any], list[Alert]]:
+        """
+        Fold this run's KPI values into the stored series and set each KPI's
+        trend from it. A series keeps only its last baseline_window values and
+        two-sided CUSUM sums, so a run reads one snapshot and does constant work
+        per KPI instead of revisiting earlier claims. Re-running the same claims
+        window returns the stored trends without advancing the series.
+        """
+        window = self._window_key(aggregates)
+        previous = kpi_history or {}
+        series = previous.get("series", {})
+        if series and previous.get("window") == window:
+            for kpi in kpis:
+                kpi.trend = series.get(kpi.name, {}).get("trend", kpi.trend)
+            return previous, []
+
+        config = self.history_config
+        alerts = []
+        updated = dict(series)
+        for kpi in kpis:
+            value = kpi.current_value
+            state = series.get(kpi.name, {})
+            if not math.isfinite(value):
+                continue
+
+            recent = state.get("recent", [])
+            baseline = float(np.mean(recent)) if recent else None
+            kpi.trend = self._trend(value, baseline)
+            cusum_high = state.get("cusum_high", 0.0)
+            cusum_low = state.get("cusum_low", 0.0)
+            if len(recent) >= config["min_periods"]:
+                spread = max(
+                    float(np.std(recent, ddof=1)),
+                    abs(baseline) * config["min_relative_spread"],
+                    1e-12,
+                )
+                deviation = (value - baseline) / spread
+                cusum_high = max(0.0, cusum_high + deviation - config["cusum_drift"])
+                cusum_low = max(0.0, cusum_low - deviation - config["cusum_drift"])
+                if max(cusum_high, cusum_low) > config["cusum_threshold"]:
+                    alerts.append(
+                        self._change_point_alert(
+                            kpi, baseline, max(cusum_high, cusum_low)
+                        )
+                    )
+                    # The level has shifted: later runs compare against the new one
+                    recent, cusum_high, cusum_low = [], 0.0, 0.0
+
+            updated[kpi.name] = {
+                "recent": (recent + [value])[-config["baseline_window"] :],
+                "baseline": baseline,
+                "trend": kpi.trend,
+                "cusum_high": cusum_high,
+                "cusum_low": cusum_low,
+                "periods": state.get("periods", 0) + 1,
+            }
+
+        history = {
+            "updated_at": datetime.now().isoformat(),
+            "periods": previous.get("periods", 0) + 1,
+            "window": window,
+            "series": updated,
+        }
+        return history, alerts
+
+    @staticmethod
+    def _window_key(aggregates: dict[str, Any]) -> dict[str, Any]:
+        """What identifies the claims window a run was computed from."""
+        start, end = aggregates.get("reporting_period", (None, None))
+        incurred = aggregates["amounts"].get("totalincurred")
+        return {
+            "claim_count": aggregates["claim_count"],
+            "start": start.isoformat() if start is not None else None,
+            "end": end.isoformat() if end is not None else None,
+            "total_incurred": float(incurred["sum"]) if incurred else None,
+        }
+
+    def _trend(self, value: float, baseline: float | None) -> str:
+        """Direction of value against the rolling baseline, per trend_thresholds."""
+        if baseline is None:
+            return "stable"
+        if baseline == 0:
+            return (
+                "increasing" if value > 0 else "decreasing" if value < 0 else "stable"
+            )
+        ratio = 1 + (value - baseline) / abs(baseline)
+        if ratio >= self.trend_thresholds["increase"]:
+            return "increasing"
+        if ratio <= self.trend_thresholds["decrease"]:
+            return "decreasing"
+        return "stable"
+
+    @staticmethod
+    def _change_point_alert(kpi: KPI, baseline: float, cusum: float) -> Alert:
+        direction = "up" if kpi.current_value > baseline else "down"
+        return Alert(
+            alert_id=f"change_point_{kpi.name}_{datetime.now().strftime('%Y%m%d_%H%M%S')}",
+            alert_type="kpi_change_point",
+            severity="warning",
+            message=f"KPI {kpi.name} shifted {direction}: {kpi.current_value:.3f} vs baseline {baseline:.3f}",
+            triggered_at=datetime.now().isoformat(),
+            data_context={
+                "kpi_name": kpi.name,
+                "current": float(kpi.current_value),
+                "baseline": float(baseline),
+                "cusum": float(cusum),
+            },
+        )
+
     def _check_kpi_alerts(self, kpis: list[KPI]) -> list[Alert]:
         alerts = []
 
@@ -286,111 +643,105 @@ class MonitoringService:
         return alerts
 
     def _generate_dashboard_metrics(
-        self, df: pd.DataFrame, kpis: list[KPI]
+        self, aggregates: dict[str, Any], kpis: list[KPI], history: dict[str, Any]
     ) -> dict[str, Any]:
+        claim_count = aggregates["claim_count"]
+        amounts = aggregates["amounts"]
+        incurred = amounts.get("totalincurred")
+        if "reporting_period" in aggregates:
+            start, end = aggregates["reporting_period"]
+            period_days = (end - start).days + 1
+        else:
+            period_days = self.time_periods.get("trend_days", 30)
         metrics = {
             "summary_statistics": {
-                "total_claims": len(df),
-                "total_incurred": float(df["totalincurred"].sum())
-                if "totalincurred" in df.columns
+                "total_claims": claim_count,
+                "total_incurred": float(incurred["sum"]) if incurred else 0,
+                "total_paid": float(amounts["paidtotal"]["sum"])
+                if "paidtotal" in amounts
                 else 0,
-                "total_paid": float(df["paidtotal"].sum())
-                if "paidtotal" in df.columns
-                else 0,
-                "total_reserves": float(df["reservetotal"].sum())
-                if "reservetotal" in df.columns
-                else 0,
-                "avg_claim_size": float(df["totalincurred"].mean())
-                if "totalincurred" in df.columns
-                else 0,
-                "median_claim_size": float(df["totalincurred"].median())
-                if "totalincurred" in df.columns
-                else 0,
-                "max_claim_size": float(df["totalincurred"].max())
-                if "totalincurred" in df.columns
+                "total_reserves": float(amounts["reservetotal"]["sum"])
+                if "reservetotal" in amounts
                 else 0,
+                "avg_claim_size": float(incurred["mean"]) if incurred else 0,
+                "median_claim_size": float(incurred["median"]) if incurred else 0,
+                "max_claim_size": float(incurred["max"]) if incurred else 0,
             },
-            "claim_distribution": self._analyze_claim_distribution(df),
-            "line_of_business_analysis": self._analyze_by_line_of_business(df),
-            "temporal_analysis": self._analyze_temporal_patterns(df),
-            "status_breakdown": self._analyze_claim_status(df),
+            "claim_distribution": self._analyze_claim_distribution(aggregates),
+            "line_of_business_analysis": self._analyze_by_line_of_business(aggregates),
+            "temporal_analysis": self._analyze_temporal_patterns(aggregates),
+            "status_breakdown": self._analyze_claim_status(aggregates),
             "performance_indicators": {
-                "claims_per_day": len(df) / 30
-                if len(df) > 0
-                else 0,  # Assuming 30-day period
-                "avg_reserve_per_claim": float(df["reservetotal"].mean())
-                if "reservetotal" in df.columns
+                "claims_per_day": claim_count / period_days if claim_count > 0 else 0,
+                "period_days": period_days,
+                "avg_reserve_per_claim": float(amounts["reservetotal"]["mean"])
+                if "reservetotal" in amounts
                 else 0,
-                "settlement_rate": self._calculate_settlement_rate(df),
+                "settlement_rate": self._calculate_settlement_rate(aggregates),
+            },
+            # Earlier windows come from the stored series, not from claims
+            "kpi_history": {
+                "periods": history.get("periods", 0),
+                "series": {
+                    name: {
+                        "values": state["recent"],
+                        "baseline": state["baseline"],
+                        "trend": state["trend"],
+                    }
+                    for name, state in history.get("series", {}).items()
+                },
             },
         }
 
         return metrics
 
-    def _analyze_claim_distribution(self, df: pd.DataFrame) -> dict[str, Any]:
-        if "totalincurred" not in df.columns or len(df) == 0:
+    def _analyze_claim_distribution(self, aggregates: dict[str, Any]) -> dict[str, Any]:
+        incurred = aggregates["amounts"].get("totalincurred")
+        if incurred is None or aggregates["claim_count"] == 0:
             return {}
 
-        amounts = df["totalincurred"]
+        quantiles = incurred["quantiles"]
         return {
-            "small_claims_0_10k": len(amounts[amounts <= 10000]),
-            "medium_claims_10k_50k": len(
-                amounts[(amounts > 10000) & (amounts <= 50000)]
-            ),
-            "large_claims_50k_100k": len(
-                amounts[(amounts > 50000) & (amounts <= 100000)]
-            ),
-            "very_large_claims_100k_plus": len(amounts[amounts > 100000]),
+            **incurred["bands"],
             "percentiles": {
-                "25th": float(amounts.quantile(0.25)),
-                "50th": float(amounts.quantile(0.50)),
-                "75th": float(amounts.quantile(0.75)),
-                "90th": float(amounts.quantile(0.90)),
-                "95th": float(amounts.quantile(0.95)),
+                "25th": float(quantiles[0.25]),
+                "50th": float(quantiles[0.50]),
+                "75th": float(quantiles[0.75]),
+                "90th": float(quantiles[0.90]),
+                "95th": float(quantiles[0.95]),
             },
         }
 
-    def _analyze_by_line_of_business(self, df: pd.DataFrame) -> dict[str, Any]:
-        if "lineofbusiness" not in df.columns or len(df) == 0:
+    def _analyze_by_line_of_business(
+        self, aggregates: dict[str, Any]
+    ) -> dict[str, Any]:
+        if "by_line_of_business" not in aggregates or aggregates["claim_count"] == 0:
             return {}
 
+        has_incurred = "totalincurred" in aggregates["amounts"]
         lob_analysis = {}
-        for lob in df["lineofbusiness"].unique():
-            lob_data = df[df["lineofbusiness"] == lob]
+        for lob, count, total, mean in aggregates["by_line_of_business"]:
             lob_analysis[str(lob)] = {
-                "claim_count": len(lob_data),
-                "total_incurred": float(lob_data["totalincurred"].sum())
-                if "totalincurred" in lob_data.columns
-                else 0,
-                "avg_severity": float(lob_data["totalincurred"].mean())
-                if "totalincurred" in lob_data.columns
-                else 0,
-                "percentage_of_total": float((len(lob_data) / len(df)) * 100),
+                "claim_count": count,
+                "total_incurred": total if has_incurred else 0,
+                "avg_severity": mean if has_incurred else 0,
+                "percentage_of_total": float((count / aggregates["claim_count"]) * 100),
             }
 
         return lob_analysis
 
-    def _analyze_temporal_patterns(self, df: pd.DataFrame) -> dict[str, Any]:
-        if "policyeffectivedate" not in df.columns or len(df) == 0:
+    def _analyze_temporal_patterns(self, aggregates: dict[str, Any]) -> dict[str, Any]:
+        if "by_accident_year" not in aggregates or aggregates["claim_count"] == 0:
             return {}
 
         try:
-            df["policy_date"] = pd.to_datetime(
-                df["policyeffectivedate"], errors="coerce"
-            )
-            df["accident_year"] = df["policy_date"].dt.year
-
+            has_incurred = "totalincurred" in aggregates["amounts"]
             yearly_analysis = {}
-            for year in df["accident_year"].dropna().unique():
-                year_data = df[df["accident_year"] == year]
+            for year, count, total, mean in aggregates["by_accident_year"]:
                 yearly_analysis[str(int(year))] = {
-                    "claim_count": len(year_data),
-                    "total_incurred": float(year_data["totalincurred"].sum())
-                    if "totalincurred" in year_data.columns
-                    else 0,
-                    "avg_severity": float(year_data["totalincurred"].mean())
-                    if "totalincurred" in year_data.columns
-                    else 0,
+                    "claim_count": count,
+                    "total_incurred": total if has_incurred else 0,
+                    "avg_severity": mean if has_incurred else 0,
                 }
 
             return {
@@ -409,12 +760,12 @@ class MonitoringService:
             logger.error(f"Error in temporal analysis: {str(e)}")
             return {}
 
-    def _analyze_claim_status(self, df: pd.DataFrame) -> dict[str, Any]:
-        if "claimstatus" not in df.columns or len(df) == 0:
+    def _analyze_claim_status(self, aggregates: dict[str, Any]) -> dict[str, Any]:
+        if "status_counts" not in aggregates or aggregates["claim_count"] == 0:
             return {}
 
-        status_counts = df["claimstatus"].value_counts()
-        total_claims = len(df)
+        status_counts = aggregates["status_counts"]
+        total_claims = aggregates["claim_count"]
 
         return {
             "status_distribution": {
@@ -435,24 +786,119 @@ class MonitoringService:
             },
         }
 
-    def _calculate_settlement_rate(self, df: pd.DataFrame) -> float:
-        if "claimstatus" not in df.columns or len(df) == 0:
+    def _calculate_settlement_rate(self, aggregates: dict[str, Any]) -> float:
+        if "status_counts" not in aggregates or aggregates["claim_count"] == 0:
             return 0.0
 
         closed_statuses = ["Close", "Closed", "Settled"]
+        closed_pattern = re.compile("|".join(closed_statuses), re.IGNORECASE)
         closed_claims = sum(
-            df["claimstatus"].str.contains(
-                "|".join(closed_statuses), case=False, na=False
-            )
+            count
+            for status, count in aggregates["status_counts"].items()
+            if isinstance(status, str) and closed_pattern.search(status)
         )
-        return float((closed_claims / len(df)) * 100)
-
-
-def monitor_development(data, monitoring_config=None):
-    """Monitor claim development patterns and generate alerts."""
-    config = monitoring_config or DEFAULT_MONITORING_CONFIG
+        return float((closed_claims / aggregates["claim_count"]) * 100)
+
+
+def _value_counts(keys: pd.Series) -> pd.Series:
+    """
+    Claims per non-missing key, most frequent first and ties in order of first
+    appearance, for object and categorical keys alike (categoricals would
+    otherwise list unused categories and order ties by category).
+    """
+    codes, uniques = pd.factorize(keys)
+    counts = np.bincount(codes[codes >= 0], minlength=len(uniques))
+    return pd.Series(
+        counts,
+        index=pd.Index(uniques.tolist(), dtype=object, name=keys.name),
+        name="count",
+    ).sort_values(ascending=False, kind="stable")
+
+
+def _amount_values(column: pd.Series) -> np.ndarray:
+    """An amount column as a numeric array (non-numeric values become NaN)."""
+    column = as_numeric(column)
+    if isinstance(column.dtype, np.dtype) and column.dtype.kind in "iuf":
+        return column.to_numpy()
+    return column.to_numpy(dtype=float, na_value=np.nan)
+
+
+def _keyed_partial(
+    keys: pd.Series, incurred: dict[str, Any] | None, offset: int
+) -> dict[Any, list]:
+    """
+    key: [first row, claim count, incurred total, valid incurred count] per
+    distinct key, missing keys under None.
+    """
+    codes, uniques = pd.factorize(keys, use_na_sentinel=False)
+    size = len(uniques)
+    _, first = np.unique(codes, return_index=True)
+    counts = np.bincount(codes, minlength=size)
+    sums = valid = np.zeros(size)
+    if incurred is not None:
+        missing = incurred["missing"]
+        if missing is None:
+            missing = np.zeros(len(codes), dtype=bool)
+        sums = np.bincount(
+            codes, weights=np.where(missing, 0.0, incurred["values"]), minlength=size
+        )
+        valid = np.bincount(codes, weights=~missing, minlength=size)
+    return {
+        (None if pd.isna(key) else key): [
+            offset + int(first[code]),
+            int(counts[code]),
+            float(sums[code]),
+            int(valid[code]),
+        ]
+        for code, key in enumerate(uniques.tolist())
+    }
+
+
+def _merge_keyed(parts: list[dict[Any, list]]) -> dict[Any, list]:
+    """Sum _keyed_partial entries per key, ordered by first appearance."""
+    merged: dict[Any, list] = {}
+    for part in parts:
+        for key, (first, count, total, valid) in part.items():
+            entry = merged.get(key)
+            if entry is None:
+                merged[key] = [first, count, total, valid]
+            else:
+                entry[0] = min(entry[0], first)
+                entry[1] += count
+                entry[2] += total
+                entry[3] += valid
+    return dict(sorted(merged.items(), key=lambda item: item[1][0]))
+
+
+def monitoring_partial(data, monitoring_config=None, offset: int = 0):
+    """
+    Mergeable KPI statistics for one part of a portfolio, whose first claim is
+    row offset of the whole; combine the parts with merge_monitoring_partials.
+    """
+    service = MonitoringService(monitoring_config)
+    return service._partial_aggregates(as_claims_frame(data), offset)
+
+
+def merge_monitoring_partials(partials, monitoring_config=None, kpi_history=None):
+    """
+    The monitor_development result for the claims of all partials, with the
+    incurred median and percentiles estimated from mergeable sketches.
+    """
+    partials = list(partials)
+    if sum(partial["claim_count"] for partial in partials) == 0:
+        return monitor_development([], monitoring_config)
+    service = MonitoringService(monitoring_config)
+    return service._report(service._merge_aggregates(partials), kpi_history)
+
+
+def monitor_development(data, monitoring_config=None, kpi_history=None):
+    """
+    Monitor claim development patterns and generate alerts. kpi_history is the
+    kpi_history of the previous run for the same portfolio, if any.
+    """
     try:
-        if not data or not isinstance(data, list):
+        df = as_claims_frame(data).copy(deep=False)
+        if df.empty:
             return {
                 "alerts": [],
                 "kpis": [],
@@ -463,8 +909,6 @@ def monitor_development(data, monitoring_config=None):
                 },
             }
 
-        df = pd.DataFrame(data)
-
         field_mapping = {
             "accident_date": ["policyeffectivedate", "loss_date", "incident_date"],
             "report_date": ["note_date", "claim_date", "reported_date"],
@@ -480,8 +924,8 @@ def monitor_development(data, monitoring_config=None):
                         df[expected_field] = df[possible_field]
                         break
 
-        service = MonitoringService(config)
-        return service.monitor_development(df.to_dict("records"))
+        service = MonitoringService(monitoring_config)
+        return service.monitor_development(df, kpi_history)
 
     except Exception as e:
         return {
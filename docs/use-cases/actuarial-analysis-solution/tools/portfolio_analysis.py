@@ -0,0 +1,226 @@
+"""
+Portfolio Analysis Tool
+======================
+Runs actuarial analyses over portfolios too large to load into one process.
+
+Key Features:
+- Scatter: the parquet files of a session are split into partitions of about
+  rows_per_partition rows, and each worker reads only its own files
+- Workers emit mergeable partial aggregates: fraud top-K heaps and risk
+  counters, litigation counters, triangle cells and KPI sufficient statistics
+- Gather: a reducer combines the partials into the regular tool results
+- Local process pool as the worker backend, serial where processes are
+  unavailable (e.g. no /dev/shm on Lambda), which still keeps only one
+  partition in memory at a time
+
+Results match the single-frame tools, except that the incurred median and
+percentiles of monitor_development are sketch estimates (0.5% relative error).
+"""
+
+import logging
+import time
+from concurrent.futures import ProcessPoolExecutor
+from typing import Any
+
+import fraud_detection
+import litigation_analysis
+import loss_reserving
+import monitoring
+from utils.constants import DEFAULT_PORTFOLIO_CONFIG, SESSION_COLUMNS
+from utils.data_utils import (
+    normalize_session_frame,
+    peak_rss_bytes,
+    plan_session_partitions,
+    read_session_parquet,
+)
+
+# Set up logging
+# Set root logger level explicitly
+logging.getLogger().setLevel(logging.INFO)
+
+# Get logger for this module
+logger = logging.getLogger(__name__)
+logger.setLevel(logging.INFO)
+
+PORTFOLIO_TOOLS = [
+    "score_fraud_risk",
+    "detect_litigation",
+    "build_loss_triangles",
+    "monitor_development",
+]
+
+
+def _segment_by(params: dict[str, Any]) -> list[str]:
+    segment_by = params.get("segment_by") or []
+    return [segment_by] if isinstance(segment_by, str) else list(segment_by)
+
+
+def _tool_partial(tool: str, df, params: dict[str, Any], offset: int):
+    if tool == "score_fraud_risk":
+        return fraud_detection.fraud_partial(df, params.get("fraud_config"), offset)
+    if tool == "detect_litigation":
+        return litigation_analysis.litigation_partial(
+            df, params.get("litigation_config"), offset
+        )
+    if tool == "build_loss_triangles":
+        return loss_reserving.triangle_partial(df, _segment_by(params))
+    if tool == "monitor_development":
+        return monitoring.monitoring_partial(
+            df, params.get("monitoring_config"), offset
+        )
+    raise ValueError(f"Unknown portfolio tool: {tool}")
+
+
+def _merge_partials(tool: str, partials: list, params: dict[str, Any]):
+    if tool == "score_fraud_risk":
+        return fraud_detection.merge_fraud_partials(
+            partials, params.get("fraud_config")
+        )
+    if tool == "detect_litigation":
+        return litigation_analysis.merge_litigation_partials(
+            partials, params.get("litigation_config")
+        )
+    if tool == "build_loss_triangles":
+        return loss_reserving.merge_triangle_partials(
+            partials, _segment_by(params), params.get("legacy_view", False)
+        )
+    if tool == "monitor_development":
+        return monitoring.merge_monitoring_partials(
+            partials, params.get("monitoring_config"), params.get("kpi_history")
+        )
+    raise ValueError(f"Unknown portfolio tool: {tool}")
+
+
+def _columns(tools: list[str], params: dict[str, Any]) -> list[str] | None:
+    """The columns any of tools reads, or None if one of them reads all."""
+    columns = []
+    for tool in tools:
+        if SESSION_COLUMNS.get(tool) is None:
+            return None
+        columns += SESSION_COLUMNS[tool]
+    return list(dict.fromkeys(columns + _segment_by(params)))
+
+
+def analyze_partition(
+    path: str, partition: dict[str, Any], tools: list[str], params: dict[str, Any]
+) -> dict[str, Any]:
+    """
+    Worker: read one partition's files and return each tool's partial
+    aggregate, with the partition's read and compute times and the worker's
+    peak RSS.
+    """
+    started = time.perf_counter()
+    df = normalize_session_frame(
+        read_session_parquet(
+            path, columns=_columns(tools, params), files=partition["files"]
+        )
+    )
+    read_seconds = time.perf_counter() - started
+    partials = {
+        tool: _tool_partial(tool, df, params, partition["offset"]) for tool in tools
+    }
+    return {
+        "partials": partials,
+        "rows": len(df),
+        "read_seconds": read_seconds,
+        "compute_seconds": time.perf_counter() - started - read_seconds,
+        "peak_rss_bytes": peak_rss_bytes(),
+    }
+
+
+def _partition_results(path, partitions, tools, params, workers: int):
+    """
+    Yield analyze_partition results in partition order, from a process pool
+    when workers > 1 and serially where processes are unavailable.
+    """
+    executor = None
+    if workers > 1 and len(partitions) > 1:
+        try:
+            executor = ProcessPoolExecutor(max_workers=workers)
+        except (OSError, NotImplementedError) as pool_error:
+            logger.warning(f"Process pool unavailable, running serially: {pool_error}")
+
+    if executor is None:
+        for partition in partitions:
+            yield analyze_partition(path, partition, tools, params)
+        return
+
+    try:
+        futures = [
+            executor.submit(analyze_partition, path, partition, tools, params)
+            for partition in partitions
+        ]
+        for future in futures:
+            yield future.result()
+    finally:
+        executor.shutdown(wait=False, cancel_futures=True)
+
+
+def analyze_portfolio(path, tools=None, params=None, portfolio_config=None):
+    """
+    Run tools over the parquet files at path (local or s3://) by scatter/gather.
+
+    Args:
+        path: Parquet prefix of the session (Athena UNLOAD output)
+        tools: Names from PORTFOLIO_TOOLS (default: all of them)
+        params: The tools' usual parameters (fraud_config, litigation_config,
+            monitoring_config, segment_by, legacy_view, kpi_history)
+        portfolio_config: Optional rows_per_partition and workers overrides
+    """
+    try:
+        tools = list(tools or PORTFOLIO_TOOLS)
+        unknown = [tool for tool in tools if tool not in PORTFOLIO_TOOLS]
+        if unknown:
+            return {
+                "error": f"Tools not supported by portfolio analysis: {unknown}",
+                "available_tools": PORTFOLIO_TOOLS,
+            }
+        params = params or {}
+        config = {**DEFAULT_PORTFOLIO_CONFIG, **(portfolio_config or {})}
+
+        started = time.perf_counter()
+        partitions = plan_session_partitions(path, int(config["rows_per_partition"]))
+        timings = {"plan": time.perf_counter() - started}
+        logger.info(
+            f"Analyzing {sum(p['rows'] for p in partitions)} rows of {path} "
+            f"in {len(partitions)} partitions"
+        )
+
+        partials = {tool: [] for tool in tools}
+        read_seconds = compute_seconds = 0.0
+        worker_peak_rss = 0
+        for result in _partition_results(
+            path, partitions, tools, params, int(config["workers"])
+        ):
+            for tool in tools:
+                partials[tool].append(result["partials"][tool])
+            read_seconds += result["read_seconds"]
+            compute_seconds += result["compute_seconds"]
+            worker_peak_rss = max(worker_peak_rss, result["peak_rss_bytes"])
+        timings["scatter"] = time.perf_counter() - started - timings["plan"]
+        timings["partition_read_total"] = read_seconds
+        timings["partition_compute_total"] = compute_seconds
+
+        gather_started = time.perf_counter()
+        results = {
+            tool: _merge_partials(tool, partials[tool], params) for tool in tools
+        }
+        timings["gather"] = time.perf_counter() - gather_started
+        timings["total"] = time.perf_counter() - started
+
+        return {
+            "results": results,
+            "partitions": {
+                "count": len(partitions),
+                "rows": sum(partition["rows"] for partition in partitions),
+                "files": sum(len(partition["files"]) for partition in partitions),
+            },
+            "timings_seconds": timings,
+            "memory": {
+                "worker_peak_rss_bytes": worker_peak_rss,
+                "process_peak_rss_bytes": peak_rss_bytes(),
+            },
+        }
+
+    except Exception as e:
+        return {"error": f"Portfolio analysis failed: {str(e)}"}
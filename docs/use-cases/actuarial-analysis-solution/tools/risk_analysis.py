@@ -15,11 +15,19 @@ Returns detailed risk profiles, segments, and statistical insights for portfolio
 
 import logging
 import warnings
-from dataclasses import dataclass
+from dataclasses import dataclass, field
 from typing import Any
 
 import numpy as np
 import pandas as pd
+from utils.constants import DEFAULT_RISK_CONFIG
+from utils.data_utils import as_claims_frame, as_datetime, as_numeric, merge_config
+from utils.stats_utils import (
+    adjust_p_values,
+    average_ranks,
+    kruskal_wallis,
+    one_way_anova,
+)
 
 warnings.filterwarnings("ignore")
 
@@ -38,35 +46,46 @@ class RiskFactor:
     segments: list[str]
     loss_ratios: dict[str, float]
     frequency_rates: dict[str, float]
+    # 1 - p_value, so larger is more significant
     significance_score: float
     is_significant: bool
+    p_value: float = 1.0
+    adjusted_p_value: float = 1.0
+    statistical_test: dict[str, Any] = field(default_factory=dict)
 
 
 class RiskAnalysisService:
-    def __init__(self):
-        self.significance_threshold = (
-            0.05  # p-value threshold for statistical significance
-        )
+    def __init__(self, risk_config=None):
+        self.config = merge_config(DEFAULT_RISK_CONFIG, risk_config)
+        self.significance = self.config["significance"]
+        # p-value threshold for statistical significance (after adjustment)
+        self.significance_threshold = self.significance["alpha"]
 
     def analyze_risk_factors(self, claims_data: dict[str, Any]) -> dict[str, Any]:
         try:
-            # Convert to DataFrame
-            df = pd.DataFrame(
-                claims_data["data"] if "data" in claims_data else claims_data
-            )
+            # Shallow copy so derived columns never leak into the shared session
+            df = as_claims_frame(claims_data).copy(deep=False)
 
             # Identify risk factors to analyze
             risk_factors = self._identify_risk_factors(df)
 
             # Analyze each risk factor
+            paid = self._paid_amounts(df)
             factor_analyses = []
             for factor in risk_factors:
-                analysis = self._analyze_single_factor(df, factor)
+                analysis = self._analyze_single_factor(df, factor, paid)
                 factor_analyses.append(analysis.__dict__)
 
-            # Rank factors by importance
+            # Adjust for testing several factors, then rank most significant
+            # first: by p-value (exact where significance_score rounds to 1) and
+            # effect size among equal p-values
+            self._adjust_significance(factor_analyses)
             ranked_factors = sorted(
-                factor_analyses, key=lambda x: x["significance_score"], reverse=True
+                factor_analyses,
+                key=lambda x: (
+                    x["p_value"],
+                    -x["statistical_test"].get("effect_size", 0.0),
+                ),
             )
 
             # Generate overall risk insights
@@ -106,7 +125,7 @@ class RiskAnalysisService:
 
         # Derived risk factors from dates using actual CSV column names
         if "note_date" in df.columns:
-            df["note_date"] = pd.to_datetime(df["note_date"], errors="coerce")
+            df["note_date"] = as_datetime(df["note_date"])
             df["accident_year"] = df["note_date"].dt.year
             df["accident_month"] = df["note_date"].dt.month
             df["accident_day_of_week"] = df["note_date"].dt.dayofweek
@@ -125,7 +144,20 @@ class RiskAnalysisService:
 
         return risk_factors
 
-    def _analyze_single_factor(self, df: pd.DataFrame, factor: str) -> RiskFactor:
+    @staticmethod
+    def _paid_amounts(df: pd.DataFrame) -> tuple[np.ndarray, np.ndarray] | None:
+        """paidtotal as floats with its sort order, shared by every factor's tests."""
+        if "paidtotal" not in df.columns:
+            return None
+        paid = as_numeric(df["paidtotal"]).to_numpy(dtype=float, na_value=np.nan)
+        return paid, np.argsort(paid, kind="stable")
+
+    def _analyze_single_factor(
+        self,
+        df: pd.DataFrame,
+        factor: str,
+        paid: tuple[np.ndarray, np.ndarray] | None = None,
+    ) -> RiskFactor:
         if factor not in df.columns:
             return RiskFactor(
                 factor_name=factor,
@@ -136,76 +168,174 @@ class RiskAnalysisService:
                 is_significant=False,
             )
 
-        # Get segments (unique values)
-        segments = df[factor].dropna().unique().tolist()
-        segments = [str(s) for s in segments]  # Convert to strings
+        # Get segments (unique values, in order of appearance)
+        if paid is None:
+            paid = self._paid_amounts(df)
+        values, statistics, sufficient = self._segment_statistics(df, factor, paid)
+        segments = [str(s) for s in values]  # Convert to strings
 
         # Calculate loss ratios and frequency rates by segment
         loss_ratios = {}
         frequency_rates = {}
-        segment_data = []
 
         for segment in segments:
-            segment_df = df[df[factor] == segment]
-
-            if len(segment_df) == 0:
+            if segment not in statistics:
                 continue
+            count, avg_paid = statistics[segment]
 
             # Calculate loss ratio (paid amount / premium - simplified)
             # In real implementation, this would use actual premium data
-            avg_paid = (
-                segment_df["paidtotal"].mean()
-                if "paidtotal" in segment_df.columns
-                else 0
-            )
             loss_ratios[segment] = avg_paid / 10000  # Simplified loss ratio
 
             # Calculate frequency rate (claims per unit exposure)
-            frequency_rates[segment] = len(segment_df)  # Simplified frequency
-
-            # Store data for statistical testing
-            if "paidtotal" in segment_df.columns:
-                segment_data.append(segment_df["paidtotal"].values)
+            frequency_rates[segment] = count  # Simplified frequency
 
-        # Perform statistical significance test
-        significance_score = self._calculate_statistical_significance(segment_data)
-        is_significant = significance_score < self.significance_threshold
+        # Perform statistical significance test (adjusted across factors later)
+        statistical_test = self._calculate_statistical_significance(sufficient)
+        p_value = statistical_test["p_value"]
 
         return RiskFactor(
             factor_name=factor,
             segments=segments,
             loss_ratios=loss_ratios,
             frequency_rates=frequency_rates,
-            significance_score=significance_score,
-            is_significant=is_significant,
+            significance_score=1.0 - p_value,
+            is_significant=p_value < self.significance_threshold,
+            p_value=p_value,
+            adjusted_p_value=p_value,
+            statistical_test=statistical_test,
         )
 
-    def _calculate_statistical_significance(
-        self, segment_data: list[np.ndarray]
-    ) -> float:
-        try:
-            if len(segment_data) < 2:
-                return 1.0  # Not significant if less than 2 segments
-
-            # Remove empty segments
-            segment_data = [seg for seg in segment_data if len(seg) > 0]
-
-            if len(segment_data) < 2:
-                return 1.0
-
-            # Simple variance-based significance test (replaces ANOVA/t-test)
-            # Calculate coefficient of variation across segments
-            means = [np.mean(seg) for seg in segment_data]
-            overall_mean = np.mean(means)
-            cv = np.std(means) / (overall_mean + 0.001)  # Coefficient of variation
+    def _segment_statistics(
+        self,
+        df: pd.DataFrame,
+        factor: str,
+        paid: tuple[np.ndarray, np.ndarray] | None,
+    ) -> tuple[list, dict[str, tuple[int, float]], dict[str, Any] | None]:
+        """
+        From one factorize pass over the factor column: its distinct
+        non-missing values, (claim count, mean paidtotal) per segment, and the
+        per-segment sufficient statistics of paidtotal for the significance
+        tests (None without paid, the _paid_amounts of df).
+
+        Segments are matched as df[factor] == str(value), so only values that
+        are strings (or categories with string labels) select any claims.
+        The tests use the claims of those segments with a paidtotal.
+        """
+        codes, uniques = pd.factorize(df[factor])
+        values = uniques.tolist()
+        present = codes >= 0
+        codes = codes[present]
+        counts = np.bincount(codes, minlength=len(values))
+        matched = np.array([isinstance(value, str) for value in values], dtype=bool)
+
+        sufficient = None
+        if paid is not None:
+            all_paid, all_order = paid
+            paid = all_paid[present]
+            missing = np.isnan(paid)
+            sums = np.bincount(
+                codes, weights=np.where(missing, 0.0, paid), minlength=len(values)
+            )
+            valid = np.bincount(codes, weights=~missing, minlength=len(values))
+            with np.errstate(invalid="ignore", divide="ignore"):
+                avg_paid = sums / valid
+
+            tested = ~missing & matched[codes]
+            # The tested claims in paid order, from the shared sort
+            tested_rows = np.zeros(len(all_paid), dtype=bool)
+            tested_rows[np.flatnonzero(present)[tested]] = True
+            order = (np.cumsum(tested_rows) - 1)[all_order[tested_rows[all_order]]]
+            sufficient = self._sufficient_statistics(codes[tested], paid[tested], order)
+        else:
+            avg_paid = np.zeros(len(values))
+
+        return (
+            values,
+            {
+                value: (int(counts[code]), float(avg_paid[code]))
+                for code, value in enumerate(values)
+                if matched[code] and counts[code]
+            },
+            sufficient,
+        )
 
-            # Higher CV = more significant difference between segments
-            # Convert to p-value-like score (0 = very significant, 1 = not significant)
-            p_value = max(0.0, min(1.0, 1.0 - cv))
-            return p_value
+    @staticmethod
+    def _sufficient_statistics(
+        codes: np.ndarray, paid: np.ndarray, order: np.ndarray
+    ) -> dict[str, Any]:
+        """Per-segment count, sum, sum of squares and rank sum of paid (in order)."""
+        groups, codes = np.unique(codes, return_inverse=True)
+        # Centre on the overall mean so sums of squares keep their precision
+        centred = paid - paid.mean() if len(paid) else paid
+        ranks, tie_term = average_ranks(paid, order)
+        return {
+            "counts": np.bincount(codes, minlength=len(groups)).astype(float),
+            "sums": np.bincount(codes, weights=centred, minlength=len(groups)),
+            "sums_of_squares": np.bincount(
+                codes, weights=centred * centred, minlength=len(groups)
+            ),
+            "rank_sums": np.bincount(codes, weights=ranks, minlength=len(groups)),
+            "tie_term": tie_term,
+        }
 
-        except Exception:
-            return 1.0  # Return non-significant if test fails
+    def _calculate_statistical_significance(
+        self, sufficient: dict[str, Any] | None
+    ) -> dict[str, Any]:
+        """
+        One-way ANOVA and Kruskal-Wallis tests of paidtotal across segments.
+        p_value and effect_size are those of the configured test (eta squared
+        for ANOVA, epsilon squared for Kruskal-Wallis).
+        """
+        method = self.significance["test"]
+        if sufficient is None:
+            return {"method": method, "p_value": 1.0, "segments_tested": 0}
+
+        counts = sufficient["counts"]
+        segments, observations = len(counts), int(counts.sum())
+        result = {
+            "method": method,
+            "p_value": 1.0,
+            "segments_tested": segments,
+            "observations": observations,
+        }
+        if segments < 2 or observations <= segments:
+            return result  # Not significant if less than 2 segments
+
+        anova = one_way_anova(counts, sufficient["sums"], sufficient["sums_of_squares"])
+        kruskal = kruskal_wallis(
+            counts, sufficient["rank_sums"], sufficient["tie_term"]
+        )
+        primary, effect_size = (
+            (anova, anova["eta_squared"])
+            if method == "anova"
+            else (kruskal, kruskal["epsilon_squared"])
+        )
+        result.update(
+            {
+                "p_value": primary["p_value"],
+                "effect_size": effect_size,
+                "anova": anova,
+                "kruskal_wallis": kruskal,
+            }
+        )
+        return result
+
+    def _adjust_significance(self, factor_analyses: list[dict[str, Any]]) -> None:
+        """
+        Adjust the p-values of the tested factors for multiple comparisons and
+        set is_significant from the adjusted values.
+        """
+        tested = [f for f in factor_analyses if "effect_size" in f["statistical_test"]]
+        adjusted = adjust_p_values(
+            [f["p_value"] for f in tested],
+            self.significance["adjustment"],
+        )
+        for analysis, p_value in zip(tested, adjusted, strict=True):
+            analysis["statistical_test"]["adjustment"] = self.significance["adjustment"]
+            analysis["statistical_test"]["adjusted_p_value"] = p_value
+            analysis["adjusted_p_value"] = p_value
+            analysis["is_significant"] = p_value < self.significance_threshold
 
     def _generate_risk_insights(
         self, df: pd.DataFrame, factor_analyses: list[dict[str, Any]]
@@ -250,7 +380,8 @@ class RiskAnalysisService:
 
         # Time-based patterns
         if "accident_date" in df.columns:
-            df["accident_date"] = pd.to_datetime(df["accident_date"])
+            if not pd.api.types.is_datetime64_any_dtype(df["accident_date"]):
+                df["accident_date"] = pd.to_datetime(df["accident_date"])
 
             # Monthly trend analysis
             monthly_claims = df.groupby(df["accident_date"].dt.to_period("M")).size()
@@ -301,7 +432,8 @@ class RiskAnalysisService:
             metrics["claim_count"] = len(df)
 
         if "accident_date" in df.columns:
-            df["accident_date"] = pd.to_datetime(df["accident_date"])
+            if not pd.api.types.is_datetime64_any_dtype(df["accident_date"]):
+                df["accident_date"] = pd.to_datetime(df["accident_date"])
             date_range = df["accident_date"].max() - df["accident_date"].min()
             metrics["analysis_period_days"] = date_range.days
 
@@ -442,7 +574,7 @@ class RiskAnalysisService:
         return recommendations
 
 
-def analyze_risk_factors(data):
+def analyze_risk_factors(data, risk_config=None):
     """Analyze risk factors"""
-    service = RiskAnalysisService()
+    service = RiskAnalysisService(risk_config)
     return service.analyze_risk_factors(data)
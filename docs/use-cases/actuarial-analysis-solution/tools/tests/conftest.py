@@ -0,0 +1,16 @@
+"""Shared setup for the actuarial tool tests.
+
+The tools are deployed as flat Lambda packages, so tests import them from the
+tools directory the same way the handlers do (``from utils.constants ...``).
+"""
+
+import os
+import sys
+from pathlib import Path
+
+TOOLS_DIR = Path(__file__).resolve().parents[1]
+if str(TOOLS_DIR) not in sys.path:
+    sys.path.insert(0, str(TOOLS_DIR))
+
+os.environ.setdefault("AWS_DEFAULT_REGION", "us-east-1")
+os.environ.setdefault("AGENTCORE_MEMORY_BACKEND", "local")
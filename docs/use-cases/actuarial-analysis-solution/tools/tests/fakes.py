@@ -0,0 +1,167 @@
+"""In-memory stand-ins for the boto3 clients the tools call."""
+
+import hashlib
+import io
+from datetime import datetime
+
+
+class _Exceptions:
+    class NoSuchKey(Exception):
+        pass
+
+    class EntityNotFoundException(Exception):
+        pass
+
+    class InternalServiceException(Exception):
+        pass
+
+
+class FakeS3:
+    """
+    put_object / get_object / delete_object over a dict, with ranged GETs and
+    a list_objects_v2 paginator. Every get_object is recorded in gets as
+    (key, range).
+    """
+
+    exceptions = _Exceptions
+
+    def __init__(self, page_size=1000):
+        self.objects: dict[tuple[str, str], bytes] = {}
+        self.page_size = page_size
+        self.gets: list[tuple[str, str | None]] = []
+
+    def put_object(self, Bucket, Key, Body, **kwargs):
+        self.objects[(Bucket, Key)] = Body
+
+    def get_object(self, Bucket, Key, Range=None):
+        self.gets.append((Key, Range))
+        if (Bucket, Key) not in self.objects:
+            raise self.exceptions.NoSuchKey(Key)
+        body = self.objects[(Bucket, Key)]
+        if Range is not None:
+            start, _, end = Range[len("bytes=") :].partition("-")
+            body = body[int(start) : int(end) + 1]
+        return {"Body": io.BytesIO(body)}
+
+    def delete_object(self, Bucket, Key):
+        self.objects.pop((Bucket, Key), None)
+
+    def get_paginator(self, operation):
+        assert operation == "list_objects_v2"
+        return _S3Paginator(self)
+
+
+class _S3Paginator:
+    def __init__(self, s3):
+        self.s3 = s3
+
+    def paginate(self, Bucket, Prefix):
+        objects = [
+            {
+                "Key": key,
+                "Size": len(body),
+                "ETag": f'"{hashlib.md5(body).hexdigest()}"',
+            }
+            for (bucket, key), body in sorted(self.s3.objects.items())
+            if bucket == Bucket and key.startswith(Prefix)
+        ]
+        for start in range(0, len(objects), self.s3.page_size):
+            yield {"Contents": objects[start : start + self.s3.page_size]}
+        if not objects:
+            yield {}
+
+
+class FakeAthena:
+    """
+    Athena whose queries report the scripted states in turn, the last one
+    from then on. on_start(query_string) runs when a query starts, e.g. to
+    write its UNLOAD output.
+    """
+
+    def __init__(self, states, reason="", statistics=None, on_start=None):
+        self.states = list(states)
+        self.reason = reason
+        self.statistics = statistics or {}
+        self.on_start = on_start
+        self.polls = 0
+
+    def start_query_execution(self, QueryString, **kwargs):
+        if self.on_start is not None:
+            self.on_start(QueryString)
+        return {"QueryExecutionId": "query-1"}
+
+    def get_query_execution(self, QueryExecutionId):
+        state = self.states[min(self.polls, len(self.states) - 1)]
+        self.polls += 1
+        if isinstance(state, Exception):
+            raise state
+        return {
+            "QueryExecution": {
+                "QueryExecutionId": QueryExecutionId,
+                "Status": {"State": state, "StateChangeReason": self.reason},
+                "Statistics": self.statistics,
+            }
+        }
+
+
+class _Paginator:
+    def __init__(self, glue):
+        self.glue = glue
+
+    def paginate(self, DatabaseName):
+        self.glue.calls.append(("get_tables", DatabaseName))
+        self.glue._check(DatabaseName)
+        tables = list(self.glue.databases[DatabaseName].values())
+        for start in range(0, max(len(tables), 1), self.glue.page_size):
+            yield {"TableList": tables[start : start + self.glue.page_size]}
+
+
+class FakeGlue:
+    """
+    Glue catalog of {database: {table: definition}} that records every call.
+    update() bumps a table's VersionId and UpdateTime the way a schema change
+    or crawler run does.
+    """
+
+    exceptions = _Exceptions
+
+    def __init__(self, databases=None, page_size=2):
+        self.databases = {
+            database: {name: self._definition(name, 1) for name in names}
+            for database, names in (databases or {}).items()
+        }
+        self.page_size = page_size
+        self.calls: list[tuple] = []
+        self.failure: Exception | None = None
+
+    @staticmethod
+    def _definition(name, version):
+        return {
+            "Name": name,
+            "VersionId": str(version),
+            "UpdateTime": datetime(2024, 1, version),
+            "StorageDescriptor": {
+                "Columns": [{"Name": "claimnumber", "Type": "string"}]
+            },
+        }
+
+    def update(self, database, name):
+        version = int(self.databases[database][name]["VersionId"]) + 1
+        self.databases[database][name] = self._definition(name, version)
+
+    def _check(self, database, name=None):
+        if self.failure is not None:
+            raise self.failure
+        if database not in self.databases or (
+            name is not None and name not in self.databases[database]
+        ):
+            raise self.exceptions.EntityNotFoundException(f"{database}.{name}")
+
+    def get_table(self, DatabaseName, Name):
+        self.calls.append(("get_table", DatabaseName, Name))
+        self._check(DatabaseName, Name)
+        return {"Table": self.databases[DatabaseName][Name]}
+
+    def get_paginator(self, operation):
+        assert operation == "get_tables"
+        return _Paginator(self)
@@ -0,0 +1,209 @@
+"""Tests for the AgentCore tool handler, with the local memory backend."""
+
+import json
+import uuid
+from types import SimpleNamespace
+
+import agentcore_lambda
+import fraud_detection
+import loss_reserving
+import pandas as pd
+import pytest
+from utils.constants import SESSION_COLUMNS
+from utils.data_utils import load_session_data, store_session_metadata
+
+
+def _claims(claim_numbers, totals):
+    n = len(claim_numbers)
+    return pd.DataFrame(
+        {
+            "claimnumber": claim_numbers,
+            "policyeffectivedate": ["2020-01-15", "2021-03-10"] * (n // 2)
+            + ["2022-02-01"] * (n % 2),
+            "note_date": ["2020-06-01", "2021-09-01"] * (n // 2)
+            + ["2022-05-01"] * (n % 2),
+            "totalincurred": totals,
+            "paidtotal": [t / 2 for t in totals],
+            "reservetotal": [t / 2 for t in totals],
+            "lineofbusiness": ["Auto", "Property"] * (n // 2) + ["Auto"] * (n % 2),
+            "claimstatus": ["Open"] * n,
+            "note_text": ["Claimant represented by counsel"] * n,
+            "claimantname": ["Jane Doe"] * n,
+        }
+    )
+
+
+@pytest.fixture
+def sessions(tmp_path, monkeypatch):
+    """Store parquet sessions in local memory and record every session load."""
+    monkeypatch.setenv("AGENTCORE_MEMORY_ID", "mem")
+    loads = []
+
+    def recording_load(session_id, columns=None, filters=None, use_cache=True):
+        loads.append({"session_id": session_id, "columns": columns})
+        return load_session_data(session_id, columns, filters, use_cache)
+
+    monkeypatch.setattr(agentcore_lambda, "load_session_data", recording_load)
+
+    def create(claims):
+        session_id = f"session-{uuid.uuid4().hex}"
+        path = tmp_path / f"{session_id}.parquet"
+        claims.to_parquet(path)
+        assert store_session_metadata(
+            session_id, str(path), len(claims), list(claims.columns)
+        )
+        return session_id
+
+    return SimpleNamespace(create=create, loads=loads)
+
+
+def invoke(tool_name, **body):
+    context = SimpleNamespace(
+        client_context=SimpleNamespace(
+            custom={"bedrockAgentCoreToolName": f"actuarial___{tool_name}"}
+        )
+    )
+    response = agentcore_lambda.lambda_handler(body, context)
+    return response["statusCode"], json.loads(response["body"])
+
+
+def test_update_reads_only_triangle_and_stored_segment_columns(sessions):
+    base = sessions.create(_claims(["C1", "C2", "C3"], [1000.0, 400.0, 800.0]))
+    delta = sessions.create(_claims(["C4", "C5"], [300.0, 200.0]))
+    retracted = sessions.create(_claims(["C1"], [1000.0]))
+    status, built = invoke(
+        "build_loss_triangles", session_id=base, segment_by="lineofbusiness"
+    )
+    assert status == 200 and "error" not in built["result"]
+
+    status, updated = invoke(
+        "update_loss_triangles",
+        session_id=delta,
+        triangle_session_id=base,
+        retracted_session_id=retracted,
+    )
+
+    assert status == 200
+    assert updated["result"]["metadata"]["update"]["new_records"] == 2
+    assert updated["result"]["metadata"]["update"]["retracted_records"] == 1
+    expected = SESSION_COLUMNS["update_loss_triangles"] + ["lineofbusiness"]
+    update_loads = [load for load in sessions.loads if load["session_id"] != base]
+    assert [load["session_id"] for load in update_loads] == [delta, retracted]
+    for load in update_loads:
+        assert load["columns"] == expected
+
+
+def test_pipeline_stages_run_tools_after_the_tools_they_read():
+    stages = agentcore_lambda._pipeline_stages(
+        [
+            "calculate_reserves",
+            "update_loss_triangles",
+            "score_fraud_risk",
+            "build_loss_triangles",
+        ]
+    )
+
+    assert stages == [
+        ["score_fraud_risk", "build_loss_triangles"],
+        ["update_loss_triangles"],
+        ["calculate_reserves"],
+    ]
+    # Dependencies that were not requested don't hold a tool back
+    assert agentcore_lambda._pipeline_stages(["calculate_reserves"]) == [
+        ["calculate_reserves"]
+    ]
+
+
+def test_pipeline_loads_the_union_of_its_tools_columns_once(sessions):
+    session_id = sessions.create(_claims(["C1", "C2", "C3"], [1000.0, 400.0, 800.0]))
+
+    status, body = invoke(
+        "run_pipeline",
+        session_id=session_id,
+        tools=[
+            "detect_litigation",
+            "score_fraud_risk",
+            {"tool_name": "build_loss_triangles", "segment_by": "lineofbusiness"},
+        ],
+    )
+
+    assert status == 200
+    for result in body["result"]["results"].values():
+        assert "error" not in result
+    assert sessions.loads == [
+        {
+            "session_id": session_id,
+            "columns": list(
+                dict.fromkeys(
+                    SESSION_COLUMNS["detect_litigation"]
+                    + SESSION_COLUMNS["score_fraud_risk"]
+                    + SESSION_COLUMNS["build_loss_triangles"]
+                    + ["lineofbusiness"]
+                )
+            ),
+        }
+    ]
+
+
+def test_pipeline_reserves_use_the_triangles_built_in_the_same_run(
+    sessions, monkeypatch
+):
+    session_id = sessions.create(_claims(["C1", "C2", "C3"], [1000.0, 400.0, 800.0]))
+    builds = []
+    build = loss_reserving.build_loss_triangles
+
+    def counting_build(*args, **kwargs):
+        builds.append(args)
+        return build(*args, **kwargs)
+
+    def unavailable(*args, **kwargs):
+        raise RuntimeError("memory unavailable")
+
+    monkeypatch.setattr(loss_reserving, "build_loss_triangles", counting_build)
+    # Memory never lists the built triangles; only the pipeline itself has them
+    monkeypatch.setattr(agentcore_lambda.session_index, "put_event", unavailable)
+
+    status, body = invoke(
+        "run_pipeline",
+        session_id=session_id,
+        tools=["calculate_reserves", "build_loss_triangles"],
+    )
+
+    assert status == 200
+    assert body["result"]["stages"] == [
+        ["build_loss_triangles"],
+        ["calculate_reserves"],
+    ]
+    results = body["result"]["results"]
+    assert list(results) == ["calculate_reserves", "build_loss_triangles"]
+    assert "error" not in results["build_loss_triangles"]
+    assert "error" not in results["calculate_reserves"]
+    assert len(builds) == 1
+
+
+def test_a_failing_pipeline_step_does_not_stop_the_others(sessions, monkeypatch):
+    session_id = sessions.create(_claims(["C1", "C2", "C3"], [1000.0, 400.0, 800.0]))
+
+    def failing_score(*args, **kwargs):
+        raise RuntimeError("scoring exploded")
+
+    monkeypatch.setattr(fraud_detection, "score_fraud_risk", failing_score)
+
+    status, body = invoke(
+        "run_pipeline",
+        session_id=session_id,
+        tools=["score_fraud_risk", "build_loss_triangles", "calculate_reserves"],
+    )
+
+    assert status == 200
+    results = body["result"]["results"]
+    assert results["score_fraud_risk"] == {
+        "error": "score_fraud_risk failed: scoring exploded"
+    }
+    assert "error" not in results["build_loss_triangles"]
+    assert "error" not in results["calculate_reserves"]
+    assert set(body["result"]["timings_seconds"]) >= {
+        "score_fraud_risk",
+        "build_loss_triangles",
+        "calculate_reserves",
+    }
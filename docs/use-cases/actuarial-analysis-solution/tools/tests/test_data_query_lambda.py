@@ -0,0 +1,176 @@
+"""Tests for Athena polling and the UNLOAD summary of run_query."""
+
+import io
+import re
+from types import SimpleNamespace
+
+import data_query_lambda
+import pandas as pd
+import pytest
+from data_query_lambda import wait_for_athena_query
+from utils.query_cache import QueryResultRegistry
+
+from tests.fakes import FakeAthena, FakeGlue, FakeS3
+
+
+class _Clock:
+    """time.monotonic and time.sleep on a clock that only moves when slept."""
+
+    def __init__(self):
+        self.now = 0.0
+        self.sleeps = []
+
+    def monotonic(self):
+        return self.now
+
+    def sleep(self, seconds):
+        self.sleeps.append(seconds)
+        self.now += seconds
+
+
+@pytest.fixture
+def clock(monkeypatch):
+    clock = _Clock()
+    monkeypatch.setattr(
+        data_query_lambda,
+        "time",
+        SimpleNamespace(monotonic=clock.monotonic, sleep=clock.sleep),
+    )
+    # The full delay at every poll, so the backoff is deterministic
+    monkeypatch.setattr(
+        data_query_lambda, "random", SimpleNamespace(uniform=lambda low, high: high)
+    )
+    return clock
+
+
+def test_polling_starts_fast_and_backs_off(clock):
+    athena = FakeAthena(["QUEUED", "RUNNING", "RUNNING", "SUCCEEDED"])
+
+    result = wait_for_athena_query(
+        athena, "query-1", initial_delay=0.05, max_delay=2.0, timeout=10
+    )
+
+    assert result["QueryExecution"]["Status"]["State"] == "SUCCEEDED"
+    assert athena.polls == 4
+    assert clock.sleeps == pytest.approx([0.05, 0.075, 0.1125])
+
+
+def test_backoff_is_capped_at_max_delay(clock):
+    athena = FakeAthena(["RUNNING"] * 7 + ["SUCCEEDED"])
+
+    wait_for_athena_query(
+        athena, "query-1", initial_delay=0.05, max_delay=0.2, timeout=10
+    )
+
+    assert clock.sleeps == pytest.approx([0.05, 0.075, 0.1125, 0.16875, 0.2, 0.2, 0.2])
+
+
+def test_polling_stops_at_the_overall_deadline(clock):
+    athena = FakeAthena(["RUNNING"])
+
+    with pytest.raises(TimeoutError, match="Timed out after 3.0s"):
+        wait_for_athena_query(
+            athena, "query-1", initial_delay=0.05, max_delay=1.0, timeout=3.0
+        )
+
+    # Backoff until the next delay would overrun the deadline, then a last
+    # sleep of what remains, a final poll, and no more
+    backoff = [min(1.0, 0.05 * 1.5**poll) for poll in range(8)]
+    assert clock.sleeps[:-1] == pytest.approx(backoff)
+    assert clock.sleeps[-1] == pytest.approx(3.0 - sum(backoff))
+    assert clock.sleeps[-1] < min(1.0, 0.05 * 1.5**8)
+    assert clock.now == pytest.approx(3.0)
+    assert athena.polls == len(clock.sleeps) + 1
+
+
+def test_jitter_keeps_each_delay_between_half_and_the_full_backoff(monkeypatch):
+    clock = _Clock()
+    monkeypatch.setattr(
+        data_query_lambda,
+        "time",
+        SimpleNamespace(monotonic=clock.monotonic, sleep=clock.sleep),
+    )
+    athena = FakeAthena(["RUNNING"] * 6 + ["SUCCEEDED"])
+
+    wait_for_athena_query(
+        athena, "query-1", initial_delay=0.05, max_delay=2.0, timeout=10
+    )
+
+    backoff = [0.05 * 1.5**poll for poll in range(6)]
+    assert all(
+        0.5 * delay <= slept <= delay
+        for slept, delay in zip(clock.sleeps, backoff, strict=True)
+    )
+
+
+@pytest.mark.parametrize("state", ["FAILED", "CANCELLED"])
+def test_failed_queries_raise_with_athena_reason(clock, state):
+    athena = FakeAthena(["RUNNING", state], reason="SYNTAX_ERROR: line 1:8")
+
+    with pytest.raises(RuntimeError, match=f"Athena query {state}: SYNTAX_ERROR"):
+        wait_for_athena_query(athena, "query-1")
+
+
+def test_status_errors_raise(clock):
+    athena = FakeAthena([ConnectionError("throttled")])
+
+    with pytest.raises(RuntimeError, match="Failed to get query status: throttled"):
+        wait_for_athena_query(athena, "query-1")
+
+
+def test_run_query_reports_exact_rows_and_athena_statistics(clock, monkeypatch):
+    s3 = FakeS3(page_size=2)
+    file_rows = [3, 1_200, 45]
+
+    def unload(query_string):
+        bucket, prefix = re.search(r"TO 's3://([^/]+)/(.+?)'", query_string).groups()
+        s3.put_object(Bucket=bucket, Key=f"{prefix}_SUCCESS", Body=b"")
+        for part, rows in enumerate(file_rows):
+            buffer = io.BytesIO()
+            pd.DataFrame(
+                {"claimnumber": [f"C{i}" for i in range(rows)], "paidtotal": 1.0}
+            ).to_parquet(buffer, index=False)
+            s3.put_object(
+                Bucket=bucket, Key=f"{prefix}part-{part}", Body=buffer.getvalue()
+            )
+
+    athena = FakeAthena(
+        ["QUEUED", "RUNNING", "SUCCEEDED"],
+        statistics={
+            "EngineExecutionTimeInMillis": 900,
+            "QueryQueueTimeInMillis": 120,
+            "DataScannedInBytes": 4096,
+            "ResultReuseInformation": {"ReusedPreviousResult": False},
+        },
+        on_start=unload,
+    )
+    stored = []
+    monkeypatch.setattr(data_query_lambda, "athena", athena)
+    monkeypatch.setattr(data_query_lambda, "s3", s3)
+    monkeypatch.setattr(data_query_lambda, "glue", FakeGlue({"claims_db": ["claims"]}))
+    monkeypatch.setattr(
+        data_query_lambda,
+        "_query_registry",
+        lambda path: QueryResultRegistry(s3, "bucket"),
+    )
+    monkeypatch.setattr(
+        data_query_lambda,
+        "store_session_metadata",
+        lambda **metadata: stored.append(metadata) or True,
+    )
+    monkeypatch.setenv("ATHENA_DATABASE", "claims_db")
+    monkeypatch.setenv("ATHENA_OUTPUT_LOCATION", "s3://bucket/query-results/")
+
+    result = data_query_lambda.run_query("select claimnumber, paidtotal from claims")
+
+    assert result["event_type"] == "query_result"
+    assert result["row_count"] == sum(file_rows)
+    assert result["file_count"] == len(file_rows)
+    assert result["columns"] == ["claimnumber", "paidtotal"]
+    assert result["statistics"] == {
+        "EngineExecutionTimeInMillis": 900,
+        "QueryQueueTimeInMillis": 120,
+        "DataScannedInBytes": 4096,
+    }
+    assert [metadata["row_count"] for metadata in stored] == [sum(file_rows)]
+    assert athena.polls == 3
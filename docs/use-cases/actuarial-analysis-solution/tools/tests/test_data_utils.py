@@ -0,0 +1,173 @@
+"""Tests for session frame loading, normalization and parquet output metadata."""
+
+import io
+
+import numpy as np
+import pandas as pd
+import pytest
+from loss_reserving import build_loss_triangles
+from utils.constants import PARQUET_FOOTER_CONFIG, SESSION_ROW_FILTERS
+from utils.data_utils import (
+    SessionDataCache,
+    normalize_session_frame,
+    read_parquet_footer,
+    read_session_parquet,
+    summarize_parquet_output,
+)
+
+from tests.fakes import FakeS3
+
+
+def test_integer_columns_keep_int64_and_small_whole_numbers_become_float32():
+    df = normalize_session_frame(
+        pd.DataFrame(
+            {
+                "claim_id": np.array([7, 8, 2**40], dtype=np.int64),
+                "driverage": np.array([30, 45, 61], dtype=np.int64),
+            }
+        )
+    )
+
+    assert df["claim_id"].dtype == np.int64
+    assert df["claim_id"].tolist() == [7, 8, 2**40]
+    assert df["driverage"].dtype == np.float32
+
+
+def _session_parquet(tmp_path):
+    path = tmp_path / "session.parquet"
+    pd.DataFrame(
+        {
+            "claimnumber": ["C1", "C2", "C3", "C4"],
+            "policyeffectivedate": [
+                "2020-01-15",
+                "2020-06-01",
+                "2021-03-10",
+                "2021-08-20",
+            ],
+            "note_date": ["2020-03-01", "2021-07-01", "2021-04-01", "2022-01-10"],
+            "totalincurred": [1000.0, 0.0, 400.0, -50.0],
+            "paidtotal": [800.0, 0.0, 400.0, 0.0],
+            "reservetotal": [200.0, 0.0, 0.0, 0.0],
+        }
+    ).to_parquet(path)
+    return str(path)
+
+
+def test_filtered_request_is_served_a_cached_unfiltered_frame(tmp_path):
+    path = _session_parquet(tmp_path)
+    cache = SessionDataCache(max_bytes=64 * 1024 * 1024)
+    filters = SESSION_ROW_FILTERS["build_loss_triangles"]
+
+    unfiltered = cache.get_or_load("s1", path)
+    served = cache.get_or_load("s1", path, filters=filters)
+
+    assert served is unfiltered
+    assert len(served) == 4
+    assert cache.stats()["hits"] == 1
+
+
+def test_unfiltered_request_is_never_served_a_filtered_frame(tmp_path):
+    path = _session_parquet(tmp_path)
+    cache = SessionDataCache(max_bytes=64 * 1024 * 1024)
+    filters = SESSION_ROW_FILTERS["build_loss_triangles"]
+
+    assert len(cache.get_or_load("s1", path, filters=filters)) == 2
+    assert len(cache.get_or_load("s1", path)) == 4
+    assert cache.stats()["misses"] == 2
+
+
+def test_triangles_are_the_same_from_the_unfiltered_frame(tmp_path):
+    path = _session_parquet(tmp_path)
+    filters = SESSION_ROW_FILTERS["build_loss_triangles"]
+    filtered = normalize_session_frame(read_session_parquet(path, filters=filters))
+    unfiltered = normalize_session_frame(read_session_parquet(path))
+
+    assert len(filtered) < len(unfiltered)
+    triangles = build_loss_triangles(filtered)
+    assert "error" not in triangles
+    assert triangles == build_loss_triangles(unfiltered)
+
+
+def _parquet_bytes(rows, seed=0):
+    """A parquet file of rows claims, with incompressible amounts."""
+    rng = np.random.default_rng(seed)
+    buffer = io.BytesIO()
+    pd.DataFrame(
+        {
+            "claimnumber": [f"C{seed}-{i}" for i in range(rows)],
+            "totalincurred": rng.random(rows),
+        }
+    ).to_parquet(buffer, index=False)
+    return buffer.getvalue()
+
+
+def test_footer_is_read_with_one_ranged_get_of_the_file_tail():
+    s3 = FakeS3()
+    body = _parquet_bytes(20_000)
+    s3.put_object(Bucket="bucket", Key="out/part-0", Body=body)
+    tail = PARQUET_FOOTER_CONFIG["TAIL_BYTES"]
+    assert len(body) > 2 * tail
+
+    footer = read_parquet_footer(s3, "bucket", "out/part-0", len(body))
+
+    assert footer.num_rows == 20_000
+    assert footer.schema.to_arrow_schema().names == ["claimnumber", "totalincurred"]
+    assert s3.gets == [("out/part-0", f"bytes={len(body) - tail}-{len(body) - 1}")]
+
+
+def test_a_footer_larger_than_the_tail_read_is_fetched_exactly(monkeypatch):
+    monkeypatch.setitem(PARQUET_FOOTER_CONFIG, "TAIL_BYTES", 64)
+    s3 = FakeS3()
+    body = _parquet_bytes(100)
+    s3.put_object(Bucket="bucket", Key="out/part-0", Body=body)
+    footer_length = int.from_bytes(body[-8:-4], "little")
+
+    footer = read_parquet_footer(s3, "bucket", "out/part-0", len(body))
+
+    assert footer.num_rows == 100
+    assert s3.gets == [
+        ("out/part-0", f"bytes={len(body) - 64}-{len(body) - 1}"),
+        ("out/part-0", f"bytes={len(body) - footer_length - 8}-{len(body) - 1}"),
+    ]
+
+
+def test_a_non_parquet_object_is_rejected():
+    s3 = FakeS3()
+    s3.put_object(Bucket="bucket", Key="out/notes.csv", Body=b"claimnumber\nC1\n")
+
+    with pytest.raises(ValueError, match="not a parquet file"):
+        read_parquet_footer(s3, "bucket", "out/notes.csv", 15)
+
+
+def test_unload_summary_counts_rows_exactly_across_files_of_different_sizes():
+    s3 = FakeS3(page_size=2)
+    sizes = {"part-0": 7, "part-1": 2_500, "part-2": 1, "part-3": 40_000}
+    bodies = {}
+    for seed, (name, rows) in enumerate(sizes.items()):
+        bodies[name] = _parquet_bytes(rows, seed)
+        s3.put_object(Bucket="bucket", Key=f"unload/s1/{name}", Body=bodies[name])
+    # Zero-byte markers and other prefixes are not part of the output
+    s3.put_object(Bucket="bucket", Key="unload/s1/_SUCCESS", Body=b"")
+    s3.put_object(Bucket="bucket", Key="unload/s2/part-0", Body=_parquet_bytes(3))
+
+    summary = summarize_parquet_output("s3://bucket/unload/s1/", s3)
+
+    assert summary["row_count"] == sum(sizes.values())
+    assert summary["file_count"] == len(sizes)
+    assert summary["total_bytes"] == sum(map(len, bodies.values()))
+    assert summary["schema"].names == ["claimnumber", "totalincurred"]
+    # Only the file tails are read, never a whole file of the larger ones
+    assert {key for key, _ in s3.gets} == {f"unload/s1/{name}" for name in sizes}
+    assert all(byte_range is not None for _, byte_range in s3.gets)
+
+
+def test_empty_unload_output_has_no_rows():
+    s3 = FakeS3()
+    s3.put_object(Bucket="bucket", Key="unload/s1/_SUCCESS", Body=b"")
+
+    assert summarize_parquet_output("s3://bucket/unload/s1/", s3) == {
+        "row_count": 0,
+        "total_bytes": 0,
+        "file_count": 0,
+        "schema": None,
+    }
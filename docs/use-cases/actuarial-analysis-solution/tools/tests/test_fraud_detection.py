@@ -0,0 +1,86 @@
+"""Tests for fraud risk scoring."""
+
+import numpy as np
+import pandas as pd
+import pyarrow as pa
+import pytest
+from bench.claims import make_claims
+from fraud_detection import FraudDetectionService, score_fraud_risk
+from utils.constants import DEFAULT_FRAUD_CONFIG
+from utils.data_utils import normalize_session_frame
+
+
+def _claims(n=6):
+    return pd.DataFrame(
+        {
+            "claimnumber": [f"CLM{i}" for i in range(n)],
+            "paidtotal": [60000.0, 25000.0, 3000.0, 2000.0, 500.0, 123.45][:n],
+            "totalincurred": [80000.0, 30000.0, 4000.0, 2500.0, 600.0, 200.0][:n],
+            "medpdtotal": [70000.0, 1000.0, 0.0, 0.0, 0.0, 0.0][:n],
+            "driverage": [19.0, 45.0, 80.0, 40.0, 33.0, 50.0][:n],
+            "vehicleyear": [2024.0, 2001.0, 2010.0, 2015.0, 2018.0, 2020.0][:n],
+            "note_text": ["suspicious staged accident", "", "", "", "", ""][:n],
+        }
+    )
+
+
+def test_partial_override_keeps_other_default_sections():
+    service = FraudDetectionService({"amount_thresholds": {"high": 10000}})
+
+    assert service.config["amount_thresholds"]["high"] == 10000
+    assert service.config["amount_thresholds"]["low"] == 1000
+    assert service.config["score_weights"] == DEFAULT_FRAUD_CONFIG["score_weights"]
+    assert DEFAULT_FRAUD_CONFIG["amount_thresholds"]["high"] == 20000
+
+
+def test_score_fraud_risk_with_only_a_ranking_override():
+    claims = _claims()
+    result = score_fraud_risk(claims, {"ranking": {"top_k": 1}})
+    default = score_fraud_risk(claims)
+
+    assert "error" not in result
+    assert len(result["fraud_scores"]) == 1
+    assert result["fraud_scores"][0] == default["fraud_scores"][0]
+    assert result["summary"] == default["summary"]
+
+
+def _typed_claims(claims, kind):
+    """claims with the dtypes of a parquet session read: Arrow or categorical."""
+    labels = ["bodypartproductcode", "losstype", "lineofbusiness", "claimstatus"]
+    texts = ["claimnumber", "note_text", "lossdescription", "injurydescription"]
+    if kind == "arrow":
+        amounts = ["paidtotal", "totalincurred", "medpdtotal", "driverage"]
+        return claims.astype(
+            {name: pd.ArrowDtype(pa.float64()) for name in amounts}
+            | {name: pd.ArrowDtype(pa.string()) for name in labels + texts}
+            | {"vehicleyear": "Float64"}
+        )
+    if kind == "categorical":
+        return claims.astype(
+            dict.fromkeys(labels, "category") | dict.fromkeys(texts, "string[pyarrow]")
+        )
+    return normalize_session_frame(claims)
+
+
+@pytest.mark.parametrize("kind", ["arrow", "categorical", "normalized"])
+def test_score_frame_matches_the_per_claim_rules(kind):
+    claims = make_claims(300, seed=11)
+    claims.loc[::13, "totalincurred"] = np.nan
+    claims.loc[::17, ["medpdtotal", "vehicleyear"]] = np.nan
+    claims.loc[::19, ["note_text", "losstype", "claimnumber"]] = None
+    typed = _typed_claims(claims, kind)
+    service = FraudDetectionService()
+    expected = [
+        service._calculate_fraud_score(claims.iloc[row].to_dict())
+        for row in range(len(claims))
+    ]
+
+    probabilities = service._score_frame(typed)
+
+    assert probabilities.tolist() == [score.fraud_probability for score in expected]
+    assert 0 < ((probabilities > 0) & (probabilities < 1)).sum()
+    result = score_fraud_risk(typed, {"ranking": {"top_k": len(claims)}})
+    ranked = sorted(
+        range(len(claims)), key=lambda row: (-expected[row].fraud_probability, row)
+    )
+    assert result["fraud_scores"] == [expected[row].__dict__ for row in ranked]
@@ -0,0 +1,127 @@
+"""Tests for the cached Glue catalog and the catalog tools."""
+
+import pytest
+from utils.glue_catalog import GlueCatalog
+
+from tests.fakes import FakeGlue
+
+
+@pytest.fixture
+def glue():
+    return FakeGlue({"claims_db": ["claims", "policies", "payments", "notes", "x"]})
+
+
+def test_list_tables_pages_through_every_table(glue):
+    catalog = GlueCatalog(glue)
+
+    assert [t["Name"] for t in catalog.list_tables("claims_db")] == [
+        "claims",
+        "policies",
+        "payments",
+        "notes",
+        "x",
+    ]
+    catalog.list_tables("claims_db")
+    catalog.get_table("claims_db", "notes")
+    assert glue.calls == [("get_tables", "claims_db")]
+
+
+def test_cached_definitions_expire_after_the_ttl(glue):
+    catalog = GlueCatalog(glue, ttl_seconds=0)
+    catalog.get_table("claims_db", "claims")
+    glue.update("claims_db", "claims")
+
+    assert catalog.get_table("claims_db", "claims")["VersionId"] == "2"
+    assert len(glue.calls) == 2
+
+
+def test_changed_table_expires_the_listing(glue):
+    catalog = GlueCatalog(glue)
+    catalog.list_tables("claims_db")
+    glue.update("claims_db", "claims")
+    # Let the cached definition of claims (only) reach its TTL
+    fetched_at, table = catalog._tables[("claims_db", "claims")]
+    catalog._tables[("claims_db", "claims")] = (fetched_at - catalog.ttl_seconds, table)
+
+    catalog.get_table("claims_db", "claims")
+    listing = catalog.list_tables("claims_db")
+
+    assert [t["VersionId"] for t in listing if t["Name"] == "claims"] == ["2"]
+    assert glue.calls.count(("get_tables", "claims_db")) == 2
+
+
+def test_relisting_forgets_dropped_tables(glue):
+    catalog = GlueCatalog(glue)
+    catalog.list_tables("claims_db")
+    del glue.databases["claims_db"]["x"]
+
+    catalog.list_tables("claims_db", refresh=True)
+    found, missing = catalog.get_tables("claims_db", ["x"])
+
+    assert (found, missing) == ([], ["x"])
+    assert glue.calls[-1] == ("get_table", "claims_db", "x")
+
+
+def test_get_tables_fetches_only_the_stale_names(glue):
+    catalog = GlueCatalog(glue)
+    catalog.get_table("claims_db", "claims")
+    glue.calls.clear()
+
+    found, missing = catalog.get_tables(
+        "claims_db", ["claims", "policies", "payments", "missing"]
+    )
+
+    assert [t["Name"] for t in found] == ["claims", "policies", "payments"]
+    assert missing == ["missing"]
+    assert glue.calls == [
+        ("get_table", "claims_db", "policies"),
+        ("get_table", "claims_db", "payments"),
+        ("get_table", "claims_db", "missing"),
+    ]
+
+
+def test_missing_database_raises(glue):
+    with pytest.raises(glue.exceptions.EntityNotFoundException):
+        GlueCatalog(glue).list_tables("other_db")
+
+
+@pytest.fixture
+def data_query(glue, monkeypatch):
+    import data_query_lambda
+
+    monkeypatch.setattr(data_query_lambda, "glue", glue)
+    monkeypatch.setattr(data_query_lambda, "catalog", GlueCatalog(glue))
+    monkeypatch.setenv("ATHENA_DATABASE", "claims_db")
+    return data_query_lambda
+
+
+def test_list_tables_tool_reports_database_errors(data_query, glue):
+    glue.failure = glue.exceptions.InternalServiceException("Throttled")
+
+    result = data_query.list_tables()
+
+    assert result["success"] is False
+    assert result["error"].startswith(
+        'Database "claims_db" not found. Error: Throttled.'
+    )
+
+
+def test_describe_table_tool_reports_missing_tables(data_query):
+    result = data_query.describe_table("nope")
+
+    assert result["success"] is False
+    assert result["error"].startswith('Table "nope" not found in database "claims_db"')
+    assert data_query.describe_table("claims")["table_name"] == "claims"
+
+
+def test_describe_table_tool_reports_database_errors(data_query, glue):
+    glue.failure = glue.exceptions.InternalServiceException("Throttled")
+
+    for result in (
+        data_query.describe_table("claims"),
+        data_query.describe_table(table_names=["claims", "notes"]),
+    ):
+        assert result == {
+            "success": False,
+            "error": 'Database "claims_db" not found. Error: Throttled',
+        }
@@ -0,0 +1,98 @@
+"""Tests for the multi-pattern keyword matcher."""
+
+import random
+
+import numpy as np
+from utils.keyword_matcher import KeywordMatcher, get_keyword_matcher
+
+CATEGORIES = {
+    "suit": ["lawsuit", "suit", "summons", "complaint filed"],
+    "rep": ["attorney", "attorney letter", "counsel", "represented by"],
+    "friction": ["complaint", "angry", "doi complaint", "a+b"],
+    "empty": [],
+}
+
+
+def reference(categories, text):
+    return {
+        name: hits
+        for name, terms in categories.items()
+        if (hits := [term for term in terms if term in text])
+    }
+
+
+def random_texts(n, seed=0):
+    rng = random.Random(seed)
+    words = [
+        "the", "attorney", "letter", "suit", "law", "complaint", "filed",
+        "angry", "doi", "counsel", "represented", "by", "a+b", "summons", "x",
+    ]  # fmt: skip
+    return [
+        " ".join(rng.choice(words) for _ in range(rng.randint(0, 12))) for _ in range(n)
+    ]
+
+
+def test_match_is_substring_semantics():
+    matcher = KeywordMatcher(CATEGORIES)
+    text = "lawsuit: attorney letter sent, doi complaint filed"
+
+    assert matcher.match(text) == {
+        "suit": ["lawsuit", "suit", "complaint filed"],
+        "rep": ["attorney", "attorney letter"],
+        "friction": ["complaint", "doi complaint"],
+    }
+    assert matcher.match("nothing here") == {}
+
+
+def test_categories_in():
+    matcher = KeywordMatcher(CATEGORIES)
+
+    assert matcher.categories_in("retained counsel") == {"rep"}
+    assert matcher.categories_in("retained counsel", ("suit",)) == set()
+
+
+def test_column_results_equal_per_text_results():
+    matcher = KeywordMatcher(CATEGORIES)
+    texts = random_texts(2_000)
+    expected = [reference(CATEGORIES, text) for text in texts]
+
+    assert [matcher.match(text) for text in texts] == expected
+    assert matcher.matches(texts) == expected
+
+    masks = matcher.category_masks(texts)
+    for name in CATEGORIES:
+        assert masks[name].tolist() == [name in found for found in expected]
+
+    term_masks = matcher.term_masks(texts)
+    for term in matcher.terms:
+        assert term_masks[term].tolist() == [term in text for text in texts]
+
+
+def test_regex_metacharacters_are_literal():
+    matcher = KeywordMatcher(CATEGORIES)
+
+    assert matcher.category_masks(["a+b", "aab"])["friction"].tolist() == [True, False]
+
+
+def test_texts_arrow_cannot_encode_fall_back_to_per_text():
+    matcher = KeywordMatcher(CATEGORIES)
+    texts = ["attorney \ud800 letter", "no hits"]
+
+    masks = matcher.category_masks(texts)
+    assert masks["rep"].tolist() == [True, False]
+    assert matcher.matches(texts) == [reference(CATEGORIES, t) for t in texts]
+
+
+def test_empty_inputs():
+    matcher = KeywordMatcher({"none": []})
+
+    assert matcher.match("anything") == {}
+    assert matcher.category_masks(["a", "b"])["none"].tolist() == [False, False]
+    assert KeywordMatcher(CATEGORIES).category_masks([])["suit"].dtype == np.bool_
+
+
+def test_get_keyword_matcher_is_cached_per_term_set():
+    first = get_keyword_matcher({"a": ["x", "y"]})
+
+    assert get_keyword_matcher({"a": ["x", "y"]}) is first
+    assert get_keyword_matcher({"a": ["x", "z"]}) is not first
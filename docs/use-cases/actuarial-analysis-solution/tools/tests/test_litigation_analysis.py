@@ -0,0 +1,42 @@
+"""Tests for litigation signal detection."""
+
+import pandas as pd
+from litigation_analysis import LitigationAnalysisService, detect_litigation
+from utils.constants import DEFAULT_LITIGATION_CONFIG
+
+
+def _claims():
+    return pd.DataFrame(
+        {
+            "claimnumber": ["CLM1", "CLM2", "CLM3", "CLM4"],
+            "note_text": [
+                "Claimant represented by counsel, demand letter received",
+                "Lawsuit filed, served with summons and complaint",
+                "Routine glass claim, windshield replaced",
+                "Formal complaint filed after coverage denied",
+            ],
+        }
+    )
+
+
+def test_partial_override_keeps_other_default_sections():
+    service = LitigationAnalysisService({"confidence_thresholds": {"high": 0.9}})
+
+    assert service.config["confidence_thresholds"] == {"high": 0.9, "low": 0.15}
+    assert service.config["score_weights"] == DEFAULT_LITIGATION_CONFIG["score_weights"]
+
+
+def test_detect_litigation_with_only_a_processing_override():
+    claims = _claims()
+    result = detect_litigation(claims, {"processing": {"workers": 1, "chunk_size": 1}})
+
+    assert "error" not in result
+    assert result == detect_litigation(claims)
+    assert result["summary"]["litigation_claims"] == 3
+
+
+def test_max_results_override_limits_flags():
+    result = detect_litigation(_claims(), {"limits": {"max_results": 1}})
+
+    assert len(result["litigation_flags"]) == 1
+    assert result["summary"]["litigation_claims"] == 3
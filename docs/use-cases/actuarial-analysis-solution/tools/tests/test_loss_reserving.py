@@ -0,0 +1,376 @@
+"""Tests for loss triangles and reserving."""
+
+import json
+import time
+
+import numpy as np
+import pandas as pd
+import pytest
+from loss_reserving import (
+    LossReservingService,
+    bootstrap_reserves,
+    build_loss_triangles,
+    decode_triangles,
+    encode_triangles,
+    load_triangle,
+    recode_triangles,
+    update_loss_triangles,
+)
+
+
+def _claims():
+    return pd.DataFrame(
+        {
+            "claimnumber": ["C1", "C2", "C3", "C4", "C5"],
+            "policyeffectivedate": [
+                "2020-01-15",
+                "2020-06-01",
+                "2021-03-10",
+                "2021-08-20",
+                "2022-02-01",
+            ],
+            "note_date": [
+                "2020-03-01",
+                "2021-07-01",
+                "2021-04-01",
+                "2023-01-10",
+                "2022-05-01",
+            ],
+            "totalincurred": [1000.0, 2500.0, 400.0, 3000.0, 800.0],
+            "paidtotal": [800.0, 1500.0, 400.0, 1000.0, 200.0],
+            "reservetotal": [200.0, 1000.0, 0.0, 2000.0, 600.0],
+            "lineofbusiness": ["Auto", "Auto", "Property", "Auto", "Property"],
+        }
+    )
+
+
+def test_legacy_view_adds_nested_triangles():
+    result = build_loss_triangles(_claims(), legacy_view=True)
+
+    assert "triangles" in result
+    assert result["incurred_triangle"]["data"] == {
+        2020: {1: 1000.0, 2: 2500.0},
+        2021: {1: 400.0, 2: 3000.0},
+        2022: {1: 800.0, 2: 0.0},
+    }
+    assert len(result["triangle_data"]) == 5
+    assert "incurred_triangle" not in build_loss_triangles(_claims())
+
+
+# Incremental incurred in the nested {accident_year: {development_year: value}}
+# shape. Accident years are the rows: the baseline read this dict with
+# pd.DataFrame(nested), which made them columns and developed across years.
+NESTED_INCURRED = {
+    "2020": {"1": 600.0, "2": 300.0, "3": 100.0},
+    "2021": {"1": 20000.0, "2": 8000.0},
+    "2022": {"1": 30000.0},
+}
+
+
+# Masked chain ladder factors of NESTED_INCURRED: only cells on or before the
+# 2022 calendar diagonal count, so 2022 does not enter the 1-2 factor
+FACTOR_1_2 = 28900 / 20600
+FACTOR_2_3 = 1000 / 900
+
+
+def test_chain_ladder_develops_accident_years_as_rows():
+    service = LossReservingService()
+    result = service.calculate_chain_ladder(
+        {"incurred_triangle": {"data": NESTED_INCURRED}}
+    )
+
+    assert result["development_factors"] == pytest.approx(
+        {"1-2": FACTOR_1_2, "2-3": FACTOR_2_3}, rel=1e-12
+    )
+    # Each year develops from its latest observed age with the full
+    # age-to-ultimate factor, then the 1.05 / 1.10 tail
+    ultimates = {
+        "2020": 1000.0 * 1.05,
+        "2021": 28000.0 * FACTOR_2_3 * 1.05,
+        "2022": 30000.0 * FACTOR_1_2 * FACTOR_2_3 * 1.10,
+    }
+    latest = {"2020": 1000.0, "2021": 28000.0, "2022": 30000.0}
+    assert result["ultimate_values"] == pytest.approx(ultimates, rel=1e-12)
+    assert result["ibnr_values"] == pytest.approx(
+        {year: ultimates[year] - latest[year] for year in latest}, rel=1e-12
+    )
+    assert result["summary"]["total_current"] == 59000.0
+
+
+def test_chain_ladder_ignores_cells_after_the_latest_diagonal():
+    # The same triangle with its future cells written out as zeros
+    padded = {
+        year: {str(dev): row.get(str(dev), 0.0) for dev in (1, 2, 3)}
+        for year, row in NESTED_INCURRED.items()
+    }
+    service = LossReservingService()
+
+    assert service.calculate_chain_ladder(
+        {"incurred_triangle": {"data": padded}}
+    ) == service.calculate_chain_ladder(
+        {"incurred_triangle": {"data": NESTED_INCURRED}}
+    )
+
+
+def test_bornhuetter_ferguson_develops_accident_years_as_rows():
+    service = LossReservingService()
+    triangles = {"incurred_triangle": {"data": NESTED_INCURRED}}
+    result = service.calculate_bornhuetter_ferguson(
+        triangles, service.calculate_chain_ladder(triangles)
+    )
+
+    # 50 / 280 / 300 estimated policies; mean loss per policy of the three years
+    expected_loss_per_policy = (20 + 100 + 100) / 3
+    unreported = 1 - 1 / (FACTOR_1_2 * FACTOR_2_3)
+    ultimate_2020 = 750 + (50 * expected_loss_per_policy - 750) * unreported
+    assert result["ultimate_losses"] == pytest.approx(
+        {"2020": ultimate_2020, "2021": 28000 * 1.02, "2022": 30000 * 1.02},
+        rel=1e-12,
+    )
+    assert result["expected_loss_ratios"] == pytest.approx(
+        {"2020": 20.0, "2021": 100.0, "2022": 100.0}
+    )
+    assert result["total_ibnr"] == pytest.approx(ultimate_2020 - 1000 + 560 + 600)
+
+
+def _measures(rng, shape, density):
+    values = np.where(rng.random(shape) < density, rng.gamma(2, 1e4, shape), 0.0)
+    return {
+        "incurred": np.round(values, 2),
+        "count": np.ceil(values / 1e4),
+    }
+
+
+@pytest.mark.parametrize("compression", [None, "zlib"])
+@pytest.mark.parametrize("density", [0.1, 0.9])
+def test_triangle_encoding_round_trips(compression, density):
+    rng = np.random.default_rng(1)
+    measures = _measures(rng, (6, 5), density)
+    payload = encode_triangles(
+        list(range(2018, 2024)), [1, 2, 3, 4, 5], measures, compression=compression
+    )
+
+    expected_encoding = "sparse" if density < 0.5 else "dense"
+    assert payload["measures"]["incurred"]["encoding"] == expected_encoding
+    assert payload["measures"]["incurred"]["dtype"] == "<f8"
+    assert payload["measures"]["count"]["dtype"] == "<i8"
+
+    wire = json.loads(json.dumps(payload))
+    origins, developments, decoded = decode_triangles(wire)
+    assert origins == list(range(2018, 2024))
+    assert developments == [1, 2, 3, 4, 5]
+    for name, values in measures.items():
+        np.testing.assert_array_equal(decoded[name], values)
+
+
+def test_segmented_triangles_round_trip():
+    rng = np.random.default_rng(2)
+    measures = _measures(rng, (3, 4, 4), 0.6)
+    segments = {
+        "by": ["lineofbusiness"],
+        "keys": [["Auto"], ["Liability"], ["Property"]],
+    }
+    payload = recode_triangles(
+        encode_triangles(
+            [2021, 2022, 2023, 2024], [1, 2, 3, 4], measures, segments=segments
+        ),
+        "zlib",
+    )
+
+    _, _, decoded = decode_triangles(payload)
+    assert payload["segments"] == segments
+    np.testing.assert_array_equal(decoded["incurred"], measures["incurred"])
+    np.testing.assert_array_equal(
+        load_triangle({"triangles": payload}, "incurred").values,
+        measures["incurred"].sum(axis=0),
+    )
+
+
+def test_version_1_payloads_still_decode():
+    # As written by the first wire format release: unsegmented, no structure key
+    payload = {
+        "format": "loss_triangles",
+        "version": 1,
+        "origins": [2022, 2023],
+        "developments": [1, 2],
+        "compression": None,
+        "measures": {
+            "incurred": {
+                "encoding": "dense",
+                "dtype": "<f8",
+                "values": [1.5, 2.0, 3.0, 0.0],
+            },
+            "count": {
+                "encoding": "sparse",
+                "dtype": "<i8",
+                "index": [0, 2],
+                "values": [1, 2],
+            },
+        },
+    }
+
+    origins, developments, measures = decode_triangles(payload)
+    assert (origins, developments) == ([2022, 2023], [1, 2])
+    np.testing.assert_array_equal(measures["incurred"], [[1.5, 2.0], [3.0, 0.0]])
+    np.testing.assert_array_equal(measures["count"], [[1, 0], [2, 0]])
+
+
+def test_newer_or_foreign_payloads_are_rejected():
+    payload = encode_triangles([2023], [1], {"incurred": np.ones((1, 1))})
+
+    with pytest.raises(ValueError, match="Unsupported"):
+        decode_triangles({**payload, "version": payload["version"] + 1})
+    with pytest.raises(ValueError, match="Not a triangle payload"):
+        decode_triangles({**payload, "format": "something_else"})
+
+
+def test_wire_and_nested_triangles_load_alike():
+    built = build_loss_triangles(_claims(), legacy_view=True)
+
+    wire = load_triangle({"triangles": built["triangles"]}, "incurred")
+    nested = load_triangle(
+        json.loads(json.dumps({"incurred_triangle": built["incurred_triangle"]})),
+        "incurred",
+    )
+    np.testing.assert_array_equal(wire.values, nested.values)
+    assert [str(o) for o in wire.origins] == [str(o) for o in nested.origins]
+
+
+def _assert_same_triangles(result, expected):
+    got_origins, got_developments, got = decode_triangles(result["triangles"])
+    want_origins, want_developments, want = decode_triangles(expected["triangles"])
+    assert (got_origins, got_developments) == (want_origins, want_developments)
+    assert result["triangles"].get("segments") == expected["triangles"].get("segments")
+    for name, values in want.items():
+        np.testing.assert_allclose(got[name], values, atol=1e-9)
+
+
+def test_update_adds_new_claims_like_a_rebuild():
+    claims = _claims()
+    stored = build_loss_triangles(claims.iloc[:3])
+
+    result = update_loss_triangles(stored, claims.iloc[3:])
+
+    _assert_same_triangles(result, build_loss_triangles(claims))
+    assert result["metadata"]["update"]["new_records"] == 2
+    assert result["metadata"]["accident_years"] == [2020, 2021, 2022]
+    assert "chain_ladder" in result["reserves"]
+
+
+def test_update_retracts_changed_and_withdrawn_claims():
+    claims = _claims()
+    stored = build_loss_triangles(claims)
+    changed = claims.iloc[[0]].assign(totalincurred=1500.0, reservetotal=700.0)
+
+    # C1 changes, C5 (the only 2022 claim) is withdrawn
+    result = update_loss_triangles(stored, changed, claims.iloc[[0, 4]])
+
+    expected = build_loss_triangles(pd.concat([changed, claims.iloc[1:4]]))
+    _assert_same_triangles(result, expected)
+    assert result["metadata"]["accident_years"] == [2020, 2021]
+    assert result["metadata"]["update"] == {
+        "new_records": 1,
+        "retracted_records": 2,
+        "cells_updated": 2,
+    }
+
+
+def test_update_grows_segments():
+    claims = _claims()
+    segmented = claims.assign(lineofbusiness=["Auto", "Auto", "Auto", "Auto", "Marine"])
+    stored = build_loss_triangles(segmented.iloc[:4], ["lineofbusiness"])
+
+    result = update_loss_triangles(stored, segmented.iloc[4:])
+
+    _assert_same_triangles(result, build_loss_triangles(segmented, ["lineofbusiness"]))
+    assert result["triangles"]["segments"]["keys"] == [["Auto"], ["Marine"]]
+
+
+def test_update_without_stored_triangles():
+    assert "error" in update_loss_triangles({}, _claims())
+
+
+def _bootstrap_triangles():
+    return {
+        "incurred_triangle": {"data": NESTED_INCURRED},
+        "paid_triangle": {
+            "data": {
+                year: {dev: value / 2 for dev, value in row.items()}
+                for year, row in NESTED_INCURRED.items()
+            }
+        },
+    }
+
+
+def test_bootstrap_is_reproducible_by_default():
+    config = {"bootstrap": {"simulations": 500}}
+    first = LossReservingService(config).calculate_confidence_intervals(
+        _bootstrap_triangles()
+    )
+    second = LossReservingService(config).calculate_confidence_intervals(
+        _bootstrap_triangles()
+    )
+
+    assert "error" not in first
+    assert first["seed"] == 42
+    for result in (first, second, first["paid"], second["paid"]):
+        result.pop("elapsed_seconds")
+    assert first == second
+
+
+def test_incurred_and_paid_bootstraps_share_one_time_budget(monkeypatch):
+    import loss_reserving
+
+    deadlines = []
+
+    def recording(*args, deadline=None, **kwargs):
+        deadlines.append(deadline)
+        return bootstrap_reserves(*args, deadline=deadline, **kwargs)
+
+    monkeypatch.setattr(loss_reserving, "bootstrap_reserves", recording)
+    service = LossReservingService({"bootstrap": {"simulations": 100}})
+    result = service.calculate_confidence_intervals(_bootstrap_triangles())
+
+    assert "paid" in result
+    assert len(deadlines) == 2
+    assert deadlines[0] is not None and deadlines[0] == deadlines[1]
+
+
+@pytest.mark.parametrize("workers", [1, 2])
+def test_bootstrap_past_its_deadline_still_returns_a_batch(workers):
+    triangle = load_triangle(_bootstrap_triangles(), "incurred")
+    reserves, info = bootstrap_reserves(
+        triangle,
+        1000,
+        seed=1,
+        workers=workers,
+        batch_cells=9 * 100,
+        deadline=time.monotonic() - 1.0,
+    )
+
+    assert 0 < info["simulation_count"] < 1000
+    assert info["budget_exhausted"]
+    assert reserves.shape == (info["simulation_count"], 3)
+
+
+@pytest.mark.parametrize(
+    "triangles",
+    [
+        {"incurred_triangle": {"data": NESTED_INCURRED}},
+        build_loss_triangles(_claims()),
+    ],
+)
+def test_bootstrap_expects_the_chain_ladder_ibnr(triangles):
+    service = LossReservingService({"bootstrap": {"simulations": 2000}})
+    chain_ladder = service.calculate_chain_ladder(triangles)
+    intervals = service.calculate_confidence_intervals(triangles)
+
+    total_ibnr = chain_ladder["summary"]["total_ibnr"]
+    assert total_ibnr > 0
+    assert intervals["expected_reserve"] == pytest.approx(total_ibnr, rel=1e-12)
+    assert {
+        year: values["expected"]
+        for year, values in intervals["by_accident_year"].items()
+    } == pytest.approx(chain_ladder["ibnr_values"], rel=1e-12)
+    # The simulated reserves are centred on the same model
+    assert intervals["percentile_50"] == pytest.approx(total_ibnr, rel=0.15)
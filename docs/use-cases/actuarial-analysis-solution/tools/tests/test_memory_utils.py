@@ -0,0 +1,134 @@
+"""Tests for the session memory event index."""
+
+import json
+from datetime import datetime, timedelta
+
+import pytest
+from utils import memory_utils
+from utils.memory_utils import (
+    LocalMemoryClient,
+    SessionEventIndex,
+    parse_event_content,
+)
+
+
+class CountingClient(LocalMemoryClient):
+    def __init__(self):
+        self.list_calls = 0
+
+    def list_events(self, **kwargs):
+        self.list_calls += 1
+        return super().list_events(**kwargs)
+
+
+@pytest.fixture
+def client(monkeypatch):
+    LocalMemoryClient.reset()
+    client = CountingClient()
+    monkeypatch.setattr(memory_utils, "get_memory_client", lambda: client)
+    yield client
+    LocalMemoryClient.reset()
+
+
+def write(client, session_id, content, at):
+    client.create_event(
+        memoryId="mem",
+        actorId="actor",
+        sessionId=session_id,
+        eventTimestamp=at,
+        payload=[{"blob": json.dumps(content)}],
+    )
+
+
+def test_events_are_grouped_by_type_newest_first(client):
+    start = datetime(2024, 1, 1)
+    write(client, "s1", {"event_type": "query_result", "n": 1}, start)
+    write(client, "s1", {"event_type": "triangle_result", "n": 2}, start)
+    write(client, "s1", {"event_type": "query_result", "n": 3}, start + timedelta(1))
+    index = SessionEventIndex()
+
+    assert [e["n"] for e in index.events("mem", "actor", "s1", "query_result")] == [
+        3,
+        1,
+    ]
+    assert index.latest("mem", "actor", "s1", "triangle_result")["n"] == 2
+    assert client.list_calls == 1
+
+
+def test_absent_event_type_is_remembered_until_max_age(client):
+    write(client, "s1", {"event_type": "query_result"}, datetime(2024, 1, 1))
+    index = SessionEventIndex(max_age_seconds=60)
+
+    assert index.latest("mem", "actor", "s1", "triangle_result") is None
+    assert index.latest("mem", "actor", "s1", "kpi_history") is None
+    assert index.latest("mem", "actor", "s1", "triangle_result") is None
+    assert client.list_calls == 1
+
+
+def test_stale_entries_are_relisted(client):
+    index = SessionEventIndex(max_age_seconds=0)
+    assert index.latest("mem", "actor", "s1", "query_result") is None
+
+    # Written by another function, e.g. the data query Lambda
+    write(client, "s1", {"event_type": "query_result", "n": 1}, datetime(2024, 1, 1))
+
+    assert index.latest("mem", "actor", "s1", "query_result")["n"] == 1
+    assert client.list_calls == 2
+
+
+def test_put_event_updates_the_index_without_relisting(client):
+    index = SessionEventIndex()
+    index.latest("mem", "actor", "s1", "triangle_result")
+    index.put_event("mem", "actor", "s1", {"event_type": "triangle_result", "n": 1})
+    index.put_event("mem", "actor", "s1", {"event_type": "triangle_result", "n": 2})
+
+    assert [e["n"] for e in index.events("mem", "actor", "s1", "triangle_result")] == [
+        2,
+        1,
+    ]
+    assert client.list_calls == 1
+    assert (
+        len(
+            client.list_events(memoryId="mem", actorId="actor", sessionId="s1")[
+                "events"
+            ]
+        )
+        == 2
+    )
+
+
+def test_listing_follows_next_tokens(client, monkeypatch):
+    monkeypatch.setitem(memory_utils.AWS_CONFIG, "MAX_RESULTS", 2)
+    start = datetime(2024, 1, 1)
+    for n in range(5):
+        write(client, "s1", {"event_type": "kpi_history", "n": n}, start + timedelta(n))
+
+    events = SessionEventIndex().events("mem", "actor", "s1", "kpi_history")
+
+    assert [e["n"] for e in events] == [4, 3, 2, 1, 0]
+    assert client.list_calls == 3
+
+
+def test_least_recently_used_sessions_are_evicted(client):
+    index = SessionEventIndex(max_sessions=2)
+    for session_id in ("s1", "s2", "s1", "s3"):
+        index.latest("mem", "actor", session_id, "query_result")
+
+    assert [key[2] for key in index._sessions] == ["s1", "s3"]
+    index.invalidate("s1")
+    assert [key[2] for key in index._sessions] == ["s3"]
+
+
+@pytest.mark.parametrize(
+    "event,expected",
+    [
+        ({"payload": [{"blob": '{"event_type": "a"}'}]}, {"event_type": "a"}),
+        ({"payload": [{"blob": {"event_type": "b"}}]}, {"event_type": "b"}),
+        ({"payload": '{"event_type": "c"}'}, {"event_type": "c"}),
+        ({"payload": [{"blob": "not json"}]}, None),
+        ({"payload": [{"blob": "[1, 2]"}]}, None),
+        ({"no_payload": True}, None),
+    ],
+)
+def test_parse_event_content(event, expected):
+    assert parse_event_content(event) == expected
@@ -0,0 +1,265 @@
+"""Tests for the monitoring aggregation stage and the stored KPI history."""
+
+import itertools
+import math
+
+import numpy as np
+import pandas as pd
+import pytest
+from monitoring import KPI, MonitoringService, monitor_development
+from utils.constants import DEFAULT_MONITORING_CONFIG
+from utils.data_utils import normalize_session_frame
+
+# The KPI thresholds and targets the loss ratio and severity KPIs read
+CONFIG = {
+    "alert_thresholds": {"loss_ratio": 0.8},
+    "kpi_targets": {"loss_ratio": 0.65, "avg_severity": 5000},
+}
+
+
+def _claims():
+    return pd.DataFrame(
+        {
+            "claimnumber": [f"C{i}" for i in range(12)],
+            "policyeffectivedate": ["2019-02-01", "2020-05-10", "2019-07-04"]
+            + ["2021-01-20", "not a date", None, "2020-11-11", "2021-03-03"]
+            + ["2019-09-09", "2020-02-02", "2021-06-30", "2020-08-08"],
+            "note_date": ["2019-03-01", "2020-06-01", None, "2021-02-01"]
+            + ["2021-05-05", "2021-07-07", "2021-01-01", "2021-04-04"]
+            + ["2019-12-12", "2020-03-03", "2021-08-08", "2020-10-10"],
+            "totalincurred": [1_000.0, 60_000.0, np.nan, 150_000.0, 8_000.0]
+            + [12_000.0, np.nan, 3_000.0, 75_000.0, 500.0, 20_000.0, 9_000.0],
+            "paidtotal": [800.0, 30_000.0, 100.0, 90_000.0, np.nan, 6_000.0]
+            + [0.0, 3_000.0, 40_000.0, 500.0, 5_000.0, 9_000.0],
+            "reservetotal": [200.0, 30_000.0, 0.0, 60_000.0, 8_000.0, 6_000.0]
+            + [np.nan, 0.0, 35_000.0, 0.0, 15_000.0, 0.0],
+            "lineofbusiness": ["Auto", "Home", None, "Auto", "Commercial", "Home"]
+            + ["Marine", None, "Auto", "Home", "Auto", "Commercial"],
+            "claimstatus": ["Open", "Closed", "Open", "Settled", "Open", None]
+            + ["Closed", "Open", "Reopened", "Closed", "Open", "Settled"],
+        }
+    )
+
+
+def _per_section(df):
+    """The figures monitor_development reported from one pass per section."""
+    incurred, paid = df["totalincurred"], df["paidtotal"]
+    policy = pd.to_datetime(df["policyeffectivedate"], errors="coerce")
+    report = pd.to_datetime(df["note_date"], errors="coerce")
+    years = policy.dt.year
+    status = df["claimstatus"].value_counts()
+    return {
+        "kpis": {
+            "loss_ratio": paid.sum() / incurred.sum(),
+            "reserve_ratio": df["reservetotal"].sum() / incurred.sum(),
+            "avg_severity": incurred.mean(),
+            "claim_frequency": float(len(df)),
+            "large_claims_percentage": (incurred > 50_000).sum() / len(df) * 100,
+            "open_claims_ratio": (df["claimstatus"].str.lower() == "open").sum()
+            / len(df)
+            * 100,
+            "avg_reporting_delay_days": (report - policy).dt.days.mean(),
+        },
+        "summary_statistics": {
+            "total_claims": len(df),
+            "total_incurred": incurred.sum(),
+            "total_paid": paid.sum(),
+            "total_reserves": df["reservetotal"].sum(),
+            "avg_claim_size": incurred.mean(),
+            "median_claim_size": incurred.median(),
+            "max_claim_size": incurred.max(),
+        },
+        "claim_distribution": {
+            "small_claims_0_10k": int((incurred <= 10_000).sum()),
+            "medium_claims_10k_50k": int(
+                ((incurred > 10_000) & (incurred <= 50_000)).sum()
+            ),
+            "large_claims_50k_100k": int(
+                ((incurred > 50_000) & (incurred <= 100_000)).sum()
+            ),
+            "very_large_claims_100k_plus": int((incurred > 100_000).sum()),
+            "percentiles": {
+                f"{q}th": incurred.quantile(q / 100) for q in (25, 50, 75, 90, 95)
+            },
+        },
+        "line_of_business_analysis": {
+            str(lob): {
+                "claim_count": len(rows),
+                "total_incurred": rows["totalincurred"].sum(),
+                "avg_severity": rows["totalincurred"].mean(),
+                "percentage_of_total": len(rows) / len(df) * 100,
+            }
+            for lob in df["lineofbusiness"].unique()
+            for rows in [df[df["lineofbusiness"] == lob]]
+        },
+        "by_accident_year": {
+            str(int(year)): {
+                "claim_count": len(rows),
+                "total_incurred": rows["totalincurred"].sum(),
+                "avg_severity": rows["totalincurred"].mean(),
+            }
+            for year in years.dropna().unique()
+            for rows in [df[years == year]]
+        },
+        "status_distribution": {
+            str(name): {"count": int(count), "percentage": count / len(df) * 100}
+            for name, count in status.items()
+        },
+        "settlement_rate": df["claimstatus"]
+        .str.contains("Close|Closed|Settled", case=False, na=False)
+        .sum()
+        / len(df)
+        * 100,
+    }
+
+
+def _assert_same(actual, expected, path="result"):
+    if isinstance(expected, dict):
+        assert list(actual) == list(expected), path
+        for key, value in expected.items():
+            _assert_same(actual[key], value, f"{path}.{key}")
+    elif isinstance(expected, float | np.floating) and math.isnan(expected):
+        assert math.isnan(actual), path
+    else:
+        assert actual == pytest.approx(expected, rel=1e-12), path
+
+
+@pytest.mark.parametrize("normalized", [False, True], ids=["object", "categorical"])
+def test_aggregates_match_the_per_section_results(normalized):
+    claims = _claims()
+    expected = _per_section(claims)
+    if normalized:
+        claims = normalize_session_frame(claims)
+        assert isinstance(claims["lineofbusiness"].dtype, pd.CategoricalDtype)
+
+    result = monitor_development(claims, CONFIG)
+
+    assert "error" not in result
+    kpis = {kpi["name"]: kpi["current_value"] for kpi in result["kpis"]}
+    assert kpis.pop("payment_ratio") == kpis["loss_ratio"]
+    _assert_same(kpis, expected["kpis"], "kpis")
+    dashboard = result["dashboard_metrics"]
+    for section in (
+        "summary_statistics",
+        "claim_distribution",
+        "line_of_business_analysis",
+    ):
+        _assert_same(dashboard[section], expected[section], section)
+    _assert_same(
+        dashboard["temporal_analysis"]["by_accident_year"],
+        expected["by_accident_year"],
+        "by_accident_year",
+    )
+    _assert_same(
+        dashboard["status_breakdown"]["status_distribution"],
+        expected["status_distribution"],
+        "status_distribution",
+    )
+    assert dashboard["performance_indicators"]["settlement_rate"] == pytest.approx(
+        expected["settlement_rate"]
+    )
+    # A missing line of business selects no claims, as filtering on it does
+    assert dashboard["line_of_business_analysis"]["None"]["claim_count"] == 0
+
+
+def _kpi(value):
+    return KPI("avg_severity", value, 5000.0, 7500.0, 2500.0, "normal", "stable")
+
+
+def _run(service, value, history, window):
+    """One run of _update_history on a KPI value, for claims window window."""
+    kpi = _kpi(value)
+    history, alerts = service._update_history(
+        [kpi], {"claim_count": window, "amounts": {}}, history
+    )
+    return kpi, history, alerts
+
+
+def test_a_level_shift_raises_a_change_point_alert_and_resets_the_series():
+    service = MonitoringService(CONFIG)
+    history = None
+    for window, value in enumerate([100.0, 101.0, 99.0, 100.0]):
+        _, history, alerts = _run(service, value, history, window)
+        assert alerts == []
+    assert history["series"]["avg_severity"]["recent"] == [100.0, 101.0, 99.0, 100.0]
+
+    kpi, history, alerts = _run(service, 130.0, history, 4)
+
+    assert [alert.alert_type for alert in alerts] == ["kpi_change_point"]
+    assert alerts[0].data_context["baseline"] == 100.0
+    assert alerts[0].data_context["cusum"] > 4.0
+    assert kpi.trend == "increasing"
+    state = history["series"]["avg_severity"]
+    assert state["recent"] == [130.0]
+    assert state["cusum_high"] == state["cusum_low"] == 0.0
+    assert state["periods"] == 5
+
+    # Later runs compare against the new level, and need min_periods again
+    kpi, history, alerts = _run(service, 131.0, history, 5)
+    assert alerts == []
+    assert kpi.trend == "stable"
+    assert history["series"]["avg_severity"]["recent"] == [130.0, 131.0]
+
+
+def test_small_deviations_accumulate_until_the_cusum_threshold():
+    service = MonitoringService(CONFIG)
+    history = None
+    for window, value in enumerate([100.0, 102.0, 98.0, 100.0]):
+        _, history, _ = _run(service, value, history, window)
+
+    # No single run of 104 is far enough from the baseline to cross the
+    # threshold, but the upper sum grows with every run until it does
+    cusums, alerts = [], []
+    for window in range(4, 14):
+        _, history, alerts = _run(service, 104.0, history, window)
+        if alerts:
+            break
+        cusums.append(history["series"]["avg_severity"]["cusum_high"])
+
+    assert len(cusums) >= 2
+    assert all(0 < low < high < 4.0 for low, high in itertools.pairwise(cusums))
+    assert [alert.data_context["kpi_name"] for alert in alerts] == ["avg_severity"]
+    assert history["series"]["avg_severity"]["recent"] == [104.0]
+
+
+def test_rerunning_the_same_window_does_not_advance_the_history():
+    claims = _claims()
+    first = monitor_development(claims, CONFIG)
+    second = monitor_development(claims, CONFIG, first["kpi_history"])
+
+    assert second["kpi_history"] == first["kpi_history"]
+    assert second["kpi_history"]["periods"] == 1
+    assert not [a for a in second["alerts"] if a["alert_type"] == "kpi_change_point"]
+    assert [kpi["trend"] for kpi in second["kpis"]] == [
+        first["kpi_history"]["series"][kpi["name"]]["trend"] for kpi in second["kpis"]
+    ]
+
+    later = monitor_development(claims.iloc[:-1], CONFIG, first["kpi_history"])
+    assert later["kpi_history"]["periods"] == 2
+    assert later["kpi_history"]["window"]["claim_count"] == len(claims) - 1
+
+
+def test_partial_override_keeps_other_default_settings():
+    service = MonitoringService({"history": {"min_periods": 5}})
+
+    assert service.history_config == {
+        **DEFAULT_MONITORING_CONFIG["history"],
+        "min_periods": 5,
+    }
+    assert service.alert_thresholds == DEFAULT_MONITORING_CONFIG["alert_thresholds"]
+    assert DEFAULT_MONITORING_CONFIG["history"]["min_periods"] == 3
+
+
+def test_default_config_computes_every_kpi():
+    result = monitor_development(_claims())
+
+    assert [kpi["name"] for kpi in result["kpis"]] == [
+        "loss_ratio",
+        "payment_ratio",
+        "reserve_ratio",
+        "avg_severity",
+        "claim_frequency",
+        "large_claims_percentage",
+        "open_claims_ratio",
+        "avg_reporting_delay_days",
+    ]
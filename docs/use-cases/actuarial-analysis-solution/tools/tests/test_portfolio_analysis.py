@@ -0,0 +1,100 @@
+"""Tests for scatter/gather portfolio analysis over local parquet files."""
+
+import math
+
+import fraud_detection
+import litigation_analysis
+import loss_reserving
+import monitoring
+import pytest
+from bench.claims import make_claims
+from portfolio_analysis import PORTFOLIO_TOOLS, analyze_portfolio
+from utils.data_utils import normalize_session_frame, read_session_parquet
+
+# Rows per file, in read order; the empty file is skipped by the planner
+FILE_ROWS = [400, 150, 0, 350]
+# Paid amounts repeated on three claims each: equal counts whose first
+# appearances (row 3 before row 20) run against their numeric order
+DUPLICATE_PAID = {9_999.0: [3, 450, 820], 2_222.0: [20, 560, 700]}
+# monitor_development reports these from a quantile sketch when merged
+SKETCH_METRICS = {"median_claim_size", "percentiles"}
+# Stamped with the time of each run
+RUN_TIMES = {"updated_at", "alert_id", "triggered_at"}
+
+
+@pytest.fixture
+def portfolio(tmp_path):
+    claims = make_claims(sum(FILE_ROWS), seed=5)
+    for amount, rows in DUPLICATE_PAID.items():
+        claims.loc[rows, "paidtotal"] = amount
+    start = 0
+    for part, rows in enumerate(FILE_ROWS):
+        claims.iloc[start : start + rows].to_parquet(
+            tmp_path / f"part-{part}.parquet", index=False
+        )
+        start += rows
+    return str(tmp_path)
+
+
+def _assert_same(merged, single, path="result"):
+    if isinstance(single, dict):
+        assert merged.keys() == single.keys(), path
+        for key, value in single.items():
+            if key not in SKETCH_METRICS | RUN_TIMES:
+                _assert_same(merged[key], value, f"{path}.{key}")
+    elif isinstance(single, list | tuple):
+        assert len(merged) == len(single), path
+        for position, (left, right) in enumerate(zip(merged, single, strict=True)):
+            _assert_same(left, right, f"{path}[{position}]")
+    elif isinstance(single, float) and math.isnan(single):
+        assert math.isnan(merged), path
+    elif isinstance(single, float):
+        assert merged == pytest.approx(single, rel=1e-9, abs=1e-9), path
+    else:
+        assert merged == single, path
+
+
+def test_portfolio_results_match_the_single_frame_tools(portfolio):
+    params = {"segment_by": "lineofbusiness"}
+    result = analyze_portfolio(
+        portfolio, PORTFOLIO_TOOLS, params, {"rows_per_partition": 200, "workers": 1}
+    )
+
+    assert "error" not in result
+    assert result["partitions"] == {"count": 2, "rows": 900, "files": 3}
+    df = normalize_session_frame(read_session_parquet(portfolio))
+    single = {
+        "score_fraud_risk": fraud_detection.score_fraud_risk(df),
+        "detect_litigation": litigation_analysis.detect_litigation(df),
+        "build_loss_triangles": loss_reserving.build_loss_triangles(
+            df, ["lineofbusiness"]
+        ),
+        "monitor_development": monitoring.monitor_development(df),
+    }
+    for tool in PORTFOLIO_TOOLS:
+        assert "error" not in single[tool]
+        _assert_same(result["results"][tool], single[tool], tool)
+
+
+def test_equal_duplicate_counts_are_listed_in_order_of_first_appearance(portfolio):
+    result = analyze_portfolio(
+        portfolio,
+        ["score_fraud_risk"],
+        {},
+        {"rows_per_partition": 200, "workers": 1},
+    )
+    df = normalize_session_frame(read_session_parquet(portfolio))
+
+    for fraud in (
+        result["results"]["score_fraud_risk"],
+        fraud_detection.score_fraud_risk(df),
+    ):
+        descriptions = [
+            indicator["description"]
+            for indicator in fraud["organized_fraud_indicators"]["indicators"]
+            if indicator["type"] == "duplicate_amounts"
+        ]
+        planted = [d for d in descriptions if d.startswith("3 claims")]
+        assert planted.index("3 claims with identical amount: $9,999") < (
+            planted.index("3 claims with identical amount: $2,222")
+        )
@@ -0,0 +1,187 @@
+"""Tests for UNLOAD result reuse."""
+
+import json
+
+import pytest
+from utils.query_cache import (
+    QueryResultRegistry,
+    nondeterministic_functions,
+    normalize_sql,
+    query_cache_key,
+    referenced_tables,
+    table_versions,
+)
+
+from tests.fakes import FakeGlue, FakeS3
+
+
+def test_normalize_sql_keeps_literals_and_quoted_identifiers():
+    query = """
+        SELECT  ClaimNumber, "LineOfBusiness" -- the LOB
+        FROM Claims /* all of them */
+        WHERE State = 'NY -- not a comment' ;
+    """
+
+    assert normalize_sql(query) == (
+        'select claimnumber, "LineOfBusiness" from claims '
+        "where state = 'NY -- not a comment'"
+    )
+
+
+def test_query_cache_key_ignores_formatting_only():
+    key = query_cache_key("SELECT * FROM claims WHERE state = 'NY';", "claims_db")
+
+    assert key == query_cache_key(
+        "select *\n  from CLAIMS where state = 'NY'", "claims_db"
+    )
+    assert key != query_cache_key(
+        "select * from claims where state = 'ny'", "claims_db"
+    )
+    assert key != query_cache_key("select * from claims where state = 'NY'", "other_db")
+
+
+def test_referenced_tables():
+    query = (
+        'SELECT * FROM claims c JOIN ref_db."Policies" p ON c.id = p.id '
+        "LEFT JOIN claims x ON x.id = c.id"
+    )
+
+    assert referenced_tables(query, "claims_db") == [
+        ("claims_db", "claims"),
+        ("ref_db", "Policies"),
+    ]
+
+
+@pytest.mark.parametrize(
+    "query, expected",
+    [
+        (
+            "select * from claims c, policies p where c.id = p.id",
+            ["claims", "policies"],
+        ),
+        (
+            'SELECT * FROM claims AS c , ref_db."Policies" AS p, payments',
+            ["claims", ("ref_db", "Policies"), "payments"],
+        ),
+        (
+            "select * from claims c join policies p on f(c.a, p.a) = 1, payments x "
+            "where c.state in ('a', 'b') order by c.id, p.id",
+            ["claims", "policies", "payments"],
+        ),
+        (
+            "with recent as (select a, b from claims), other as (select * from notes) "
+            "select * from recent, other, reserves",
+            ["claims", "notes", "recent", "other", "reserves"],
+        ),
+        (
+            "select * from claims union select * from archive a, policies",
+            ["claims", "archive", "policies"],
+        ),
+        (
+            "select * from claims c cross join unnest(c.parts) as u(part), "
+            "lateral (select * from policies) p",
+            ["claims", "policies"],
+        ),
+    ],
+)
+def test_referenced_tables_in_from_lists(query, expected):
+    assert referenced_tables(query, "claims_db") == [
+        table if isinstance(table, tuple) else ("claims_db", table)
+        for table in expected
+    ]
+
+
+def test_nondeterministic_functions_outside_literals():
+    query = (
+        "SELECT now(), RAND() AS r, 'current_date' AS label, \"uuid\" "
+        "FROM claims WHERE loss_date > current_date - interval '30' day"
+    )
+
+    assert nondeterministic_functions(query) == ["now", "rand", "current_date"]
+    assert nondeterministic_functions("select 'now()' from claims") == []
+
+
+class _StopAthena:
+    def start_query_execution(self, **kwargs):
+        raise RuntimeError("no Athena in tests")
+
+
+class _RecordingRegistry:
+    def __init__(self):
+        self.lookups = []
+
+    def get(self, key, versions):
+        self.lookups.append(versions)
+        return None
+
+
+@pytest.fixture
+def run_query(monkeypatch):
+    import data_query_lambda
+
+    registry = _RecordingRegistry()
+    monkeypatch.setattr(data_query_lambda, "athena", _StopAthena())
+    monkeypatch.setattr(
+        data_query_lambda, "glue", FakeGlue({"claims_db": ["claims", "policies"]})
+    )
+    monkeypatch.setattr(data_query_lambda, "_query_registry", lambda path: registry)
+    monkeypatch.setenv("ATHENA_DATABASE", "claims_db")
+
+    def run(query):
+        result = data_query_lambda.run_query(query)
+        assert "no Athena in tests" in result["error"]
+        return registry.lookups
+
+    return run
+
+
+def test_run_query_versions_every_table_of_a_from_list(run_query):
+    (versions,) = run_query("select * from claims c, policies p where c.id = p.id")
+
+    assert sorted(versions) == ["claims_db.claims", "claims_db.policies"]
+
+
+def test_run_query_never_reuses_nondeterministic_queries(run_query):
+    assert run_query("select * from claims where loss_date > current_date") == []
+    assert run_query("select *, rand() from claims") == []
+
+
+def test_table_versions_skip_unknown_tables():
+    glue = FakeGlue({"claims_db": ["claims"]})
+    versions = table_versions(glue, [("claims_db", "claims"), ("claims_db", "cte")])
+
+    assert list(versions) == ["claims_db.claims"]
+    glue.update("claims_db", "claims")
+    assert table_versions(glue, [("claims_db", "claims")]) != versions
+
+
+def test_registry_reuses_until_a_table_changes():
+    s3 = FakeS3()
+    registry = QueryResultRegistry(s3, "results", ttl_seconds=60)
+    versions = {"claims_db.claims": "v1"}
+    registry.put("k", {"s3_path": "s3://results/unload/k/", "table_versions": versions})
+
+    assert registry.get("k", versions)["s3_path"] == "s3://results/unload/k/"
+    assert registry.get("k", {"claims_db.claims": "v2"}) is None
+    assert s3.objects == {}
+    assert registry.get("k", versions) is None
+
+
+def test_registry_is_shared_through_s3():
+    s3 = FakeS3()
+    versions = {"claims_db.claims": "v1"}
+    QueryResultRegistry(s3, "results").put("k", {"table_versions": versions})
+
+    entry = QueryResultRegistry(s3, "results").get("k", versions)
+    assert entry["table_versions"] == versions
+    stored = json.loads(s3.objects[("results", "query-cache/k.json")])
+    assert stored["created_at"] == entry["created_at"]
+
+
+def test_registry_entries_expire():
+    s3 = FakeS3()
+    registry = QueryResultRegistry(s3, "results", ttl_seconds=-1)
+    registry.put("k", {"table_versions": {}})
+
+    assert registry.get("k", {}) is None
+    assert s3.objects == {}
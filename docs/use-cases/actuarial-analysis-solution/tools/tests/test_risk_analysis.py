@@ -0,0 +1,96 @@
+"""Tests for risk factor significance and ranking."""
+
+import numpy as np
+import pandas as pd
+from risk_analysis import RiskAnalysisService, analyze_risk_factors
+
+
+def _claims(n=120, seed=3):
+    rng = np.random.default_rng(seed)
+    lines = np.array(["Auto", "Home", "Commercial"])[np.arange(n) % 3]
+    # Paid amounts depend strongly on line of business and not on claim status
+    base = {"Auto": 1_000.0, "Home": 8_000.0, "Commercial": 30_000.0}
+    paid = np.array([base[line] for line in lines]) * rng.uniform(0.8, 1.2, n)
+    return pd.DataFrame(
+        {
+            "lineofbusiness": lines,
+            "claimstatus": rng.choice(["Open", "Closed"], n),
+            "paidtotal": paid,
+        }
+    )
+
+
+def _by_factor(result):
+    return {f["factor_name"]: f for f in result["risk_factor_analyses"]}
+
+
+def test_factors_report_p_values_and_a_larger_is_more_significant_score():
+    factors = _by_factor(analyze_risk_factors(_claims()))
+
+    for factor in factors.values():
+        assert factor["significance_score"] == 1.0 - factor["p_value"]
+        assert factor["adjusted_p_value"] >= factor["p_value"]
+        assert (
+            factor["adjusted_p_value"] == factor["statistical_test"]["adjusted_p_value"]
+        )
+        assert factor["is_significant"] == (factor["adjusted_p_value"] < 0.05)
+
+    assert factors["lineofbusiness"]["is_significant"]
+    assert factors["lineofbusiness"]["significance_score"] > 0.99
+    assert (
+        factors["lineofbusiness"]["significance_score"]
+        > factors["claimstatus"]["significance_score"]
+    )
+
+
+def test_ranked_factors_put_the_most_significant_first():
+    ranked = analyze_risk_factors(_claims())["ranked_factors"]
+
+    assert ranked[0]["factor_name"] == "lineofbusiness"
+    p_values = [f["p_value"] for f in ranked]
+    assert p_values == sorted(p_values)
+    scores = [f["significance_score"] for f in ranked]
+    assert scores == sorted(scores, reverse=True)
+
+
+def test_missing_factor_is_not_significant():
+    factor = RiskAnalysisService()._analyze_single_factor(_claims(), "garagestate")
+
+    assert factor.significance_score == 0.0
+    assert factor.p_value == 1.0
+    assert factor.adjusted_p_value == 1.0
+    assert not factor.is_significant
+
+
+def test_significance_override_keeps_default_settings():
+    service = RiskAnalysisService({"significance": {"test": "anova"}})
+
+    assert service.significance == {
+        "alpha": 0.05,
+        "test": "anova",
+        "adjustment": "holm",
+    }
+    factors = _by_factor(
+        analyze_risk_factors(_claims(), {"significance": {"test": "anova"}})
+    )
+    assert factors["lineofbusiness"]["statistical_test"]["method"] == "anova"
+
+
+def test_segment_statistics_match_per_segment_filtering():
+    claims = _claims()
+    claims.loc[::7, "paidtotal"] = np.nan
+    claims.loc[::11, "claimstatus"] = None
+    claims["lineofbusiness"] = claims["lineofbusiness"].astype("category")
+    factors = _by_factor(analyze_risk_factors(claims))
+
+    for name in ("lineofbusiness", "claimstatus"):
+        factor = factors[name]
+        expected = claims[name].dropna().astype(str).unique().tolist()
+        assert sorted(factor["segments"]) == sorted(expected)
+        for segment in expected:
+            rows = claims[claims[name] == segment]
+            assert factor["frequency_rates"][segment] == len(rows)
+            assert np.isclose(
+                factor["loss_ratios"][segment], rows["paidtotal"].mean() / 10000
+            )
+        assert factor["statistical_test"]["segments_tested"] == len(expected)
@@ -0,0 +1,172 @@
+"""Tests for the scipy-free statistical helpers."""
+
+import math
+
+import numpy as np
+import pytest
+from utils.stats_utils import (
+    QuantileSketch,
+    adjust_p_values,
+    average_ranks,
+    chi2_survival,
+    f_survival,
+    kruskal_wallis,
+    one_way_anova,
+)
+
+
+def test_average_ranks_share_ties():
+    ranks, tie_term = average_ranks(np.array([20.0, 10.0, 30.0, 20.0]))
+
+    assert ranks.tolist() == [2.5, 1.0, 4.0, 2.5]
+    assert tie_term == 6.0  # one pair: 2**3 - 2
+
+
+def test_average_ranks_with_precomputed_order():
+    values = np.array([3.0, 3.0, 3.0, 1.0])
+    ranks, tie_term = average_ranks(values, np.argsort(values, kind="stable"))
+
+    assert ranks.tolist() == [3.0, 3.0, 3.0, 1.0]
+    assert tie_term == 24.0
+
+
+@pytest.mark.parametrize("statistic", [0.1, 1.0, 5.991464547107979, 20.0])
+def test_chi2_survival_two_degrees_of_freedom(statistic):
+    assert chi2_survival(statistic, 2) == pytest.approx(
+        math.exp(-statistic / 2), rel=1e-10
+    )
+
+
+@pytest.mark.parametrize("statistic", [0.2, 3.841458820694124, 12.0])
+def test_chi2_survival_one_degree_of_freedom(statistic):
+    assert chi2_survival(statistic, 1) == pytest.approx(
+        math.erfc(math.sqrt(statistic / 2)), rel=1e-10
+    )
+
+
+def test_chi2_survival_edges():
+    assert chi2_survival(0.0, 3) == 1.0
+    assert chi2_survival(math.inf, 3) == 0.0
+    assert math.isnan(chi2_survival(math.nan, 3))
+
+
+@pytest.mark.parametrize("statistic,df_within", [(0.5, 6), (3.0, 10), (27.0, 6)])
+def test_f_survival_two_numerator_degrees_of_freedom(statistic, df_within):
+    # F(2, m) has survival (1 + 2f/m) ** (-m/2)
+    assert f_survival(statistic, 2, df_within) == pytest.approx(
+        (1 + 2 * statistic / df_within) ** (-df_within / 2), rel=1e-10
+    )
+
+
+def test_f_survival_table_value():
+    # 5% critical value of F(3, 20)
+    assert f_survival(3.0983912, 3, 20) == pytest.approx(0.05, abs=1e-6)
+
+
+def test_f_survival_edges():
+    assert f_survival(0.0, 2, 5) == 1.0
+    assert f_survival(math.inf, 2, 5) == 0.0
+    assert math.isnan(f_survival(math.nan, 2, 5))
+
+
+def test_one_way_anova_from_group_moments():
+    groups = [
+        np.array([1.0, 2.0, 3.0]),
+        np.array([4.0, 5.0, 6.0]),
+        np.array([7.0, 8.0, 9.0]),
+    ]
+    result = one_way_anova(
+        np.array([len(g) for g in groups], dtype=float),
+        np.array([g.sum() for g in groups]),
+        np.array([(g**2).sum() for g in groups]),
+    )
+
+    # Between 54 on 2 df, within 6 on 6 df
+    assert result["f_statistic"] == pytest.approx(27.0)
+    assert (result["df_between"], result["df_within"]) == (2, 6)
+    assert result["p_value"] == pytest.approx(0.001, rel=1e-9)
+    assert result["eta_squared"] == pytest.approx(0.9)
+
+
+def test_one_way_anova_without_spread_within_groups():
+    result = one_way_anova(
+        np.array([2.0, 2.0]), np.array([2.0, 6.0]), np.array([2.0, 18.0])
+    )
+
+    assert result["f_statistic"] is None
+    assert result["p_value"] == 0.0
+
+
+def test_kruskal_wallis_matches_the_rank_formula():
+    values = np.array([1.0, 2.0, 3.0, 4.0, 5.0, 6.0])
+    ranks, tie_term = average_ranks(values)
+    result = kruskal_wallis(
+        np.array([3.0, 3.0]), np.array([ranks[:3].sum(), ranks[3:].sum()]), tie_term
+    )
+
+    # 12 / (6 * 7) * (6**2 / 3 + 15**2 / 3) - 3 * 7
+    statistic = 12 / 42 * (36 / 3 + 225 / 3) - 21
+    assert result["h_statistic"] == pytest.approx(statistic)
+    assert result["df"] == 1
+    assert result["p_value"] == pytest.approx(math.erfc(math.sqrt(statistic / 2)))
+
+
+def test_kruskal_wallis_tie_correction():
+    values = np.array([1.0, 1.0, 2.0, 3.0, 3.0, 3.0])
+    ranks, tie_term = average_ranks(values)
+    result = kruskal_wallis(
+        np.array([2.0, 4.0]), np.array([ranks[:2].sum(), ranks[2:].sum()]), tie_term
+    )
+
+    n = 6
+    uncorrected = 12 / (n * (n + 1)) * (
+        ranks[:2].sum() ** 2 / 2 + ranks[2:].sum() ** 2 / 4
+    ) - 3 * (n + 1)
+    assert result["h_statistic"] == pytest.approx(
+        uncorrected / (1 - tie_term / (n**3 - n))
+    )
+
+
+def test_kruskal_wallis_all_values_tied():
+    ranks, tie_term = average_ranks(np.ones(4))
+    result = kruskal_wallis(np.array([2.0, 2.0]), np.array([5.0, 5.0]), tie_term)
+
+    assert (result["h_statistic"], result["p_value"]) == (0.0, 1.0)
+
+
+def test_holm_adjustment():
+    adjusted = adjust_p_values([0.01, 0.04, 0.03], "holm")
+
+    assert adjusted == pytest.approx([0.03, 0.06, 0.06])
+
+
+def test_benjamini_hochberg_adjustment():
+    adjusted = adjust_p_values([0.01, 0.04, 0.03], "bh")
+
+    assert adjusted == pytest.approx([0.03, 0.04, 0.04])
+
+
+def test_adjusted_p_values_are_capped_at_one():
+    assert adjust_p_values([0.5, 0.9], "holm") == [1.0, 1.0]
+
+
+def test_adjust_p_values_passthrough_and_unknown_method():
+    assert adjust_p_values([0.2, 0.01], "none") == [0.2, 0.01]
+    assert adjust_p_values([], "holm") == []
+    with pytest.raises(ValueError):
+        adjust_p_values([0.1], "sidak")
+
+
+def test_quantile_sketch_relative_error_and_merge():
+    rng = np.random.default_rng(0)
+    values = np.concatenate([rng.lognormal(8, 1.5, 20_000), np.zeros(100)])
+    whole = QuantileSketch().add(values)
+    merged = (
+        QuantileSketch().add(values[:7_000]).merge(QuantileSketch().add(values[7_000:]))
+    )
+
+    for q in (0.1, 0.5, 0.9, 0.99):
+        exact = np.quantile(values, q)
+        assert whole.quantile(q) == pytest.approx(exact, rel=0.005)
+        assert merged.quantile(q) == whole.quantile(q)
+    assert math.isnan(QuantileSketch().quantile(0.5))
@@ -23,16 +23,24 @@ DEFAULT_FRAUD_CONFIG = {
     "age_thresholds": {"young_driver": 25, "senior_driver": 70},
     "vehicle_thresholds": {"new_vehicle": 3, "old_vehicle": 15},
     "ratios": {"medical_share_high": 0.7},
+    # Claims ranked and explained, and claims scored at a time
+    "ranking": {"top_k": 50, "chunk_size": 50_000},
 }
 
 DEFAULT_LITIGATION_CONFIG = {
     "confidence_thresholds": {"high": 0.7, "low": 0.15},
     "score_weights": {"strong_signal_weight": 0.7, "weak_signal_weight": 0.15},
     "limits": {"max_results": 100},
+    "processing": {"chunk_size": 50_000, "workers": 1},
+}
+
+DEFAULT_RISK_CONFIG = {
+    "significance": {"alpha": 0.05, "test": "kruskal_wallis", "adjustment": "holm"},
 }
 
 DEFAULT_MONITORING_CONFIG = {
     "alert_thresholds": {
+        "loss_ratio": 0.8,
         "development_factor_change": 0.15,
         "claim_frequency_spike": 2.0,
         "severity_increase": 0.25,
@@ -43,6 +51,7 @@ DEFAULT_MONITORING_CONFIG = {
         "claims_per_month": 100,
         "loss_ratio": 1.15,
         "expense_ratio": 0.20,
+        "avg_severity": 5000,
     },
     "development_factors": {
         "12_to_24": 1.15,
@@ -52,15 +61,173 @@ DEFAULT_MONITORING_CONFIG = {
     },
     "time_periods": {"trend_days": 30, "min_claims": 100},
     "trend_thresholds": {"increase": 1.05, "decrease": 0.95},
+    # KPI series kept across runs (see MonitoringService._update_history)
+    "history": {
+        "baseline_window": 8,
+        "min_periods": 3,
+        "cusum_drift": 0.5,
+        "cusum_threshold": 4.0,
+        "min_relative_spread": 0.01,
+    },
+}
+
+# Scatter/gather over the parquet files of a session (portfolio_analysis)
+DEFAULT_PORTFOLIO_CONFIG = {"rows_per_partition": 250_000, "workers": 4}
+
+DEFAULT_RESERVING_CONFIG = {
+    "bootstrap": {
+        "simulations": 10000,
+        # Fixed so repeated runs on the same triangle report the same ranges
+        "seed": 42,
+        "time_budget_seconds": 10.0,
+        "workers": 1,
+        "batch_cells": 2_000_000,
+    },
+}
+
+# Loss triangle wire format (see loss_reserving.encode_triangles)
+TRIANGLE_FORMAT = {
+    "NAME": "loss_triangles",
+    "VERSION": 2,
+    "SPARSE_MAX_DENSITY": 0.5,
 }
 
 # COMMON FIELD MAPPINGS
 FIELD_MAPPINGS = {
-    "DATE_FIELDS": ["accident_date", "report_date", "loss_date", "date_of_loss"],
-    "AMOUNT_FIELDS": ["paidtotal", "totalincurred", "reservetotal", "claim_amount"],
+    "DATE_FIELDS": [
+        "accident_date",
+        "report_date",
+        "loss_date",
+        "date_of_loss",
+        "policyeffectivedate",
+        "note_date",
+    ],
+    "AMOUNT_FIELDS": [
+        "paidtotal",
+        "totalincurred",
+        "reservetotal",
+        "medpdtotal",
+        "claim_amount",
+    ],
+    # Small whole numbers, held as float32 (exact, and NaN-capable unlike int32)
+    "COMPACT_NUMERIC_FIELDS": ["driverage", "vehicleyear"],
+    # Low-cardinality labels, held as categoricals
+    "CATEGORY_FIELDS": [
+        "lineofbusiness",
+        "claimstatus",
+        "losstype",
+        "causeofloss",
+        "garagestate",
+        "accidentstate",
+    ],
+    # Free text, held as Arrow string arrays and read only by the tools
+    # declaring it (see SESSION_COLUMNS)
+    "TEXT_FIELDS": [
+        "note_text",
+        "lossdescription",
+        "injurydescription",
+        "claim_notes",
+        "description",
+        "claimantname",
+    ],
     "REQUIRED_COLUMNS": ["claim_number", "accident_date", "totalincurred"],
 }
 
+# Alternative names of canonical columns, in order of preference. A session
+# lacking the canonical column gets it from the first alternative present.
+COLUMN_ALIASES = {
+    "note_date": [
+        "lossdate",
+        "loss_date",
+        "date_of_loss",
+        "accident_dt",
+        "accident_date",
+    ],
+    "report_date": [
+        "reportdate",
+        "report_dt",
+        "date_reported",
+        "reported_date",
+    ],
+}
+
+# SESSION COLUMN PROJECTIONS
+# Columns each tool reads from the session parquet (alternative names included).
+# Tools not listed here read every column.
+_TRIANGLE_COLUMNS = [
+    "claimnumber",
+    "policyeffectivedate",
+    "note_date",
+    "lossdate",
+    "loss_date",
+    "date_of_loss",
+    "accident_dt",
+    "accident_date",
+    "totalincurred",
+    "paidtotal",
+    "reservetotal",
+]
+
+SESSION_COLUMNS = {
+    "detect_litigation": [
+        "claimnumber",
+        "claim_id",
+        "claimantname",
+        "note_text",
+        "lossdescription",
+        "injurydescription",
+    ],
+    "score_fraud_risk": [
+        "claimnumber",
+        "claim_number",
+        "paidtotal",
+        "totalincurred",
+        "medpdtotal",
+        "driverage",
+        "vehicleyear",
+        "bodypartproductcode",
+        "losstype",
+        "note_text",
+        "lossdescription",
+        "injurydescription",
+    ],
+    "analyze_risk_factors": [
+        "lineofbusiness",
+        "claimstatus",
+        "losstype",
+        "causeofloss",
+        "garagestate",
+        "accidentstate",
+        "note_date",
+        "accident_date",
+        "paidtotal",
+    ],
+    "build_loss_triangles": _TRIANGLE_COLUMNS,
+    "update_loss_triangles": _TRIANGLE_COLUMNS,
+    "calculate_reserves": _TRIANGLE_COLUMNS,
+    "monitor_development": [
+        "totalincurred",
+        "paidtotal",
+        "reservetotal",
+        "claimstatus",
+        "lineofbusiness",
+        "policyeffectivedate",
+        "note_date",
+    ],
+}
+
+# Optional row filters pushed down to parquet row groups, in pyarrow DNF form.
+# They only skip data early: a tool listed here may still be given the
+# unfiltered frame (the session cache serves a cached unfiltered frame to a
+# filtered request, and run_pipeline shares one unfiltered frame between tools
+# with different filters). Every filter must therefore be one the tool applies
+# again itself, e.g. the triangle tools drop totalincurred <= 0 rows.
+SESSION_ROW_FILTERS = {
+    "build_loss_triangles": [("totalincurred", ">", 0)],
+    "update_loss_triangles": [("totalincurred", ">", 0)],
+    "calculate_reserves": [("totalincurred", ">", 0)],
+}
+
 # KEYWORD SETS
 FRAUD_KEYWORDS = [
     "fraud",
@@ -113,6 +280,81 @@ LITIGATION_STRONG_SIGNALS = [
     "claimant's attorney",
 ]
 
+LITIGATION_GENERIC_TERMS = LITIGATION_KEYWORDS + [
+    "dispute",
+    "denied",
+    "denial",
+    "appeal",
+    "complaint",
+    "coverage issue",
+    "coverage dispute",
+    "bad faith",
+    "investigation",
+]
+
+LITIGATION_SUIT_TERMS = [
+    "lawsuit filed",
+    "has filed a lawsuit",
+    "filed suit",
+    "filed a suit",
+    "filed a law suit",
+    "complaint filed",
+    "filed complaint",
+    "civil complaint",
+    "civil action",
+    "statement of claim",
+    "summons and complaint",
+    "served with summons",
+    "served with complaint",
+    "served with papers",
+    "service of process completed",
+    "service of process",
+    "court case opened",
+    "trial",
+    "trial date",
+    "going to trial",
+    "scheduled for trial",
+]
+
+LITIGATION_FRICTION_TERMS = [
+    "claim denied",
+    "denied claim",
+    "denial of claim",
+    "coverage denied",
+    "coverage issue",
+    "coverage dispute",
+    "dispute claim",
+    "disputed claim",
+    "formal complaint",
+    "filed a complaint",
+    "escalated complaint",
+    "ombudsman",
+    "bad faith",
+    "unfair settlement",
+    "legal review",
+    "legal department reviewing",
+    "under investigation",
+    "fraud investigation",
+]
+
+LITIGATION_DISCOVERY_TERMS = ["deposition", "subpoena", "interrogatories"]
+
+LITIGATION_DEMAND_TERMS = [
+    "demand letter",
+    "settlement demand",
+    "policy limits demand",
+]
+
+# Claim text categories scanned by the fraud scorer
+FRAUD_TEXT_CATEGORIES = {
+    "fraud_keywords": FRAUD_KEYWORDS,
+    "litigation_keywords": LITIGATION_KEYWORDS,
+    "total_loss": ["total loss", "write off", "beyond repair"],
+    "severe_weather": ["fog", "black ice", "heavy rain", "hail", "snowstorm"],
+    "severe_injury": ["head", "spine", "back", "neck"],
+    "soft_tissue": ["whiplash", "soft tissue", "sprain", "strain"],
+}
+
 WEATHER_KEYWORDS = [
     "rain",
     "snow",
@@ -142,3 +384,61 @@ BODY_PART_KEYWORDS = [
 
 # AWS/SYSTEM CONSTANTS
 AWS_CONFIG = {"WAIT_TIME": 30, "MAX_RESULTS": 100}
+
+# Athena status polling: exponential backoff with jitter under an overall deadline
+ATHENA_POLL_CONFIG = {
+    "INITIAL_DELAY": 0.05,
+    "MAX_DELAY": 2.0,
+    "BACKOFF": 1.5,
+    "TIMEOUT_SECONDS": 280,
+}
+
+# run_query result reuse (TTL overridable via QUERY_CACHE_TTL_SECONDS)
+QUERY_CACHE_CONFIG = {"TTL_SECONDS": 3600, "PREFIX": "query-cache"}
+
+# Athena (Trino) functions whose result changes between runs; run_query never
+# reuses the result of a query calling one of them
+NONDETERMINISTIC_SQL_FUNCTIONS = [
+    "current_date",
+    "current_time",
+    "current_timestamp",
+    "current_timezone",
+    "localtime",
+    "localtimestamp",
+    "now",
+    "rand",
+    "random",
+    "shuffle",
+    "uuid",
+]
+
+# Glue catalog cache (TTL overridable via GLUE_CATALOG_TTL_SECONDS)
+GLUE_CATALOG_CONFIG = {"TTL_SECONDS": 300}
+
+# QueryExecution.Statistics fields reported by run_query
+ATHENA_STATISTICS_FIELDS = [
+    "EngineExecutionTimeInMillis",
+    "QueryQueueTimeInMillis",
+    "QueryPlanningTimeInMillis",
+    "ServiceProcessingTimeInMillis",
+    "TotalExecutionTimeInMillis",
+    "DataScannedInBytes",
+]
+
+# Warm-container session data cache (overridable via SESSION_CACHE_* env vars)
+SESSION_CACHE_CONFIG = {
+    "MAX_MB": 256,
+    "SPILL_DIR": "",
+    "SPILL_MAX_MB": 384,
+    # Sessions whose peak frame size is kept for response metadata
+    "TRACKED_SESSIONS": 128,
+}
+
+# Parquet footer reads: speculative tail GET size and parallel fetches
+PARQUET_FOOTER_CONFIG = {"TAIL_BYTES": 64 * 1024, "MAX_WORKERS": 16}
+
+# run_pipeline: concurrent tools per stage (overridable per request via max_workers)
+PIPELINE_CONFIG = {"MAX_WORKERS": 4}
+
+# AgentCore memory event index (overridable via MEMORY_INDEX_MAX_AGE_SECONDS)
+MEMORY_INDEX_CONFIG = {"MAX_AGE_SECONDS": 30, "MAX_SESSIONS": 64}
@@ -1,14 +1,30 @@
-import json
+import hashlib
 import logging
 import os
+import resource
+import threading
+from collections import OrderedDict
+from concurrent.futures import ThreadPoolExecutor
+from dataclasses import dataclass
 from datetime import datetime
 from typing import Any
 
-import awswrangler as wr
 import boto3
+import numpy as np
 import pandas as pd
-
-from .constants import AWS_CONFIG, FIELD_MAPPINGS
+import pyarrow as pa
+import pyarrow.dataset as ds
+import pyarrow.feather as feather
+import pyarrow.parquet as pq
+from pyarrow import fs
+
+from .constants import (
+    COLUMN_ALIASES,
+    FIELD_MAPPINGS,
+    PARQUET_FOOTER_CONFIG,
+    SESSION_CACHE_CONFIG,
+)
+from .memory_utils import session_index
 
 # Set up logging
 # Set root logger level explicitly
@@ -19,10 +35,20 @@ logger = logging.getLogger(__name__)
 logger.setLevel(logging.INFO)
 
 
-def load_session_data(session_id: str) -> pd.DataFrame:
+def load_session_data(
+    session_id: str,
+    columns: list[str] | None = None,
+    filters: list[tuple] | None = None,
+    use_cache: bool = True,
+) -> pd.DataFrame:
     """
     Load parquet data from session S3 location.
-    Returns DataFrame in the format expected by actuarial tools.
+    Returns a typed DataFrame that is passed straight to the actuarial tools.
+
+    columns projects the read onto the columns a tool declares (missing ones are
+    skipped) and filters is a DNF row filter, e.g. [("totalincurred", ">", 0)],
+    pushed down to parquet row groups. Frames are shared through session_cache
+    across warm invocations, so callers must not modify them in place.
     """
     try:
         # Get session metadata from AgentCore memory
@@ -37,103 +63,638 @@ def load_session_data(session_id: str) -> pd.DataFrame:
             # Fallback to dataframe if no S3 path (for backward compatibility)
             dataframe_records = session_info.get("dataframe", [])
             if dataframe_records:
-                return pd.DataFrame(dataframe_records)
+                return normalize_session_frame(pd.DataFrame(dataframe_records))
             else:
                 raise ValueError(
                     f"No s3_parquet_path or dataframe found for session_id: {session_id}"
                 )
 
-        # Read parquet directly from S3
-        df = wr.s3.read_parquet(s3_path)
-        return df
+        # Serve from the warm-container cache, reading only what is missing
+        if use_cache and session_cache.enabled:
+            return session_cache.get_or_load(session_id, s3_path, columns, filters)
+
+        # Read only the requested columns and row groups from S3
+        df = read_session_parquet(s3_path, columns=columns, filters=filters)
+        return normalize_session_frame(df)
 
     except Exception as e:
         raise ValueError(f"Error loading session data: {e}") from e
 
 
-def get_session_from_memory(session_id: str) -> dict[str, Any] | None:
+def _filesystem_for(path: str) -> tuple[fs.FileSystem | None, str]:
+    """Return the pyarrow filesystem and bare path for a local or s3:// path."""
+    if path.startswith("s3://"):
+        region = os.environ.get("AWS_REGION", "us-east-1")
+        return fs.S3FileSystem(region=region), path[len("s3://") :].rstrip("/")
+    return None, path.rstrip("/")
+
+
+def open_parquet_writer(path: str, schema: pa.Schema) -> pq.ParquetWriter:
+    """Open a parquet file writer at a local or s3:// path."""
+    filesystem, file_path = _filesystem_for(path)
+    return pq.ParquetWriter(file_path, schema, filesystem=filesystem)
+
+
+def read_session_parquet(
+    path: str,
+    columns: list[str] | None = None,
+    filters: list[tuple] | None = None,
+    files: list[str] | None = None,
+) -> pd.DataFrame:
     """
-    Get session metadata from AgentCore memory.
-    Returns the session info dict or None if not found.
+    Read an UNLOAD parquet prefix with column projection and row-group pushdown.
+
+    Declared columns that are not in the files are skipped; if none of them exist
+    every column is read so the tool can report what is available. Filters on
+    missing columns are dropped, and a filter the file types cannot evaluate
+    falls back to an unfiltered read (tools re-apply their own row conditions).
+    files, if given, restricts the read to those files of the prefix (see
+    plan_session_partitions). The alternative names of declared columns (see
+    COLUMN_ALIASES) are read as well, for normalize_session_frame to map.
+    Text columns (FIELD_MAPPINGS["TEXT_FIELDS"]) stay Arrow string arrays
+    rather than becoming Python string objects.
     """
+    filesystem, dataset_path = _filesystem_for(path)
+    if files is not None:
+        dataset_path = [_filesystem_for(file)[1] for file in files]
+    dataset = ds.dataset(dataset_path, format="parquet", filesystem=filesystem)
+    available = set(dataset.schema.names)
+
+    selected = None
+    if columns:
+        declared = [
+            name for col in columns for name in (col, *COLUMN_ALIASES.get(col, []))
+        ]
+        selected = [col for col in dict.fromkeys(declared) if col in available]
+        if not selected:
+            logger.warning(
+                f"None of the declared columns {columns} found, reading all columns"
+            )
+            selected = None
+
+    expression = None
+    if filters:
+        usable = [f for f in filters if f[0] in available]
+        if len(usable) < len(filters):
+            logger.info(f"Skipping row filters on missing columns: {filters}")
+        if usable:
+            expression = pq.filters_to_expression(usable)
+
     try:
-        # Get environment variables
-        AGENTCORE_MEMORY_ID = os.environ.get("AGENTCORE_MEMORY_ID")
-        ACTOR_ID = os.environ.get("ACTOR_ID", "ActuarialAgent")
+        table = dataset.to_table(columns=selected, filter=expression)
+    except pa.ArrowException as filter_error:
+        if expression is None:
+            raise
+        logger.warning(f"Row filter not applicable, reading unfiltered: {filter_error}")
+        table = dataset.to_table(columns=selected)
 
-        if not AGENTCORE_MEMORY_ID:
+    logger.info(
+        f"Read {table.num_rows} rows x {table.num_columns} of {len(available)} columns from {path}"
+    )
+    return _table_to_frame(table)
+
+
+def _table_to_frame(table: pa.Table) -> pd.DataFrame:
+    """
+    Convert an Arrow table to pandas, keeping the text columns as Arrow
+    string arrays instead of Python string objects.
+    """
+    text = {
+        name: table.column(name)
+        for name in FIELD_MAPPINGS["TEXT_FIELDS"]
+        if name in table.column_names
+        and (
+            pa.types.is_string(table.schema.field(name).type)
+            or pa.types.is_large_string(table.schema.field(name).type)
+        )
+    }
+    names = table.column_names
+    df = table.drop_columns(list(text)).to_pandas(split_blocks=True, self_destruct=True)
+    for name, values in text.items():
+        df.insert(names.index(name), name, pd.arrays.ArrowExtensionArray(values))
+    return df
+
+
+def plan_session_partitions(path: str, rows_per_partition: int) -> list[dict[str, Any]]:
+    """
+    Group the parquet files of an UNLOAD prefix into partitions of about
+    rows_per_partition rows, in the order a full read returns them. Row counts
+    come from the file footers. Each partition lists its files, its row count
+    and offset, the position of its first row in the full read; empty files
+    are left out.
+    """
+    filesystem, dataset_path = _filesystem_for(path)
+    dataset = ds.dataset(dataset_path, format="parquet", filesystem=filesystem)
+    fragments = list(dataset.get_fragments())
+    with ThreadPoolExecutor(max_workers=PARQUET_FOOTER_CONFIG["MAX_WORKERS"]) as pool:
+        row_counts = list(pool.map(lambda fragment: fragment.count_rows(), fragments))
+
+    scheme = "s3://" if path.startswith("s3://") else ""
+    partitions, offset = [], 0
+    for fragment, rows in zip(fragments, row_counts, strict=True):
+        if rows == 0:
+            continue
+        if not partitions or partitions[-1]["rows"] >= rows_per_partition:
+            partitions.append({"files": [], "rows": 0, "offset": offset})
+        partitions[-1]["files"].append(scheme + fragment.path)
+        partitions[-1]["rows"] += rows
+        offset += rows
+    return partitions
+
+
+def parquet_version(path: str) -> str:
+    """
+    Return a version tag for a parquet prefix from its object ETags.
+    A single LIST call, so a changed UNLOAD output never serves stale data.
+    """
+    if path.startswith("s3://"):
+        bucket, _, prefix = path[len("s3://") :].partition("/")
+        paginator = boto3.client("s3").get_paginator("list_objects_v2")
+        parts = [
+            f"{obj['Key']}:{obj['ETag']}"
+            for page in paginator.paginate(Bucket=bucket, Prefix=prefix)
+            for obj in page.get("Contents", [])
+            if obj["Size"] > 0
+        ]
+    else:
+        base = path.rstrip("/")
+        names = sorted(os.listdir(base)) if os.path.isdir(base) else [""]
+        parts = []
+        for name in names:
+            stat = os.stat(os.path.join(base, name) if name else base)
+            parts.append(f"{name}:{stat.st_size}:{stat.st_mtime_ns}")
+    return hashlib.sha256("|".join(sorted(parts)).encode()).hexdigest()[:32]
+
+
+def read_parquet_footer(s3_client, bucket: str, key: str, size: int) -> pq.FileMetaData:
+    """
+    Read the metadata of an S3 parquet object without touching its data pages.
+    One ranged GET of the file tail normally covers the footer; a second exact
+    GET is only issued when the footer is larger than the speculative read.
+    """
+    tail_bytes = min(size, PARQUET_FOOTER_CONFIG["TAIL_BYTES"])
+    tail = s3_client.get_object(
+        Bucket=bucket, Key=key, Range=f"bytes={size - tail_bytes}-{size - 1}"
+    )["Body"].read()
+    if len(tail) < 8 or tail[-4:] != b"PAR1":
+        raise ValueError(f"s3://{bucket}/{key} is not a parquet file")
+
+    footer_length = int.from_bytes(tail[-8:-4], "little")
+    if footer_length + 8 > len(tail):
+        tail = s3_client.get_object(
+            Bucket=bucket,
+            Key=key,
+            Range=f"bytes={size - footer_length - 8}-{size - 1}",
+        )["Body"].read()
+
+    # Leading magic bytes make the footer a self-contained parquet "file"
+    footer = b"PAR1" + tail[-(footer_length + 8) :]
+    return pq.read_metadata(pa.BufferReader(footer))
+
+
+def summarize_parquet_output(s3_path: str, s3_client=None) -> dict[str, Any]:
+    """
+    Summarize a parquet prefix (e.g. Athena UNLOAD output) from file footers.
+    Returns the exact row_count, total_bytes, file_count and the Arrow schema.
+    """
+    s3_client = s3_client or boto3.client("s3")
+    bucket, _, prefix = s3_path[len("s3://") :].partition("/")
+    paginator = s3_client.get_paginator("list_objects_v2")
+    objects = [
+        (obj["Key"], obj["Size"])
+        for page in paginator.paginate(Bucket=bucket, Prefix=prefix)
+        for obj in page.get("Contents", [])
+        if obj["Size"] > 0
+    ]
+    if not objects:
+        return {"row_count": 0, "total_bytes": 0, "file_count": 0, "schema": None}
+
+    max_workers = min(PARQUET_FOOTER_CONFIG["MAX_WORKERS"], len(objects))
+    with ThreadPoolExecutor(max_workers=max_workers) as executor:
+        footers = list(
+            executor.map(
+                lambda obj: read_parquet_footer(s3_client, bucket, obj[0], obj[1]),
+                objects,
+            )
+        )
+
+    return {
+        "row_count": sum(footer.num_rows for footer in footers),
+        "total_bytes": sum(size for _, size in objects),
+        "file_count": len(objects),
+        "schema": footers[0].schema.to_arrow_schema(),
+    }
+
+
+def peak_rss_bytes() -> int:
+    """Peak resident memory of this process (the warm container) so far."""
+    # ru_maxrss is in kilobytes on Linux
+    return resource.getrusage(resource.RUSAGE_SELF).ru_maxrss * 1024
+
+
+def _frame_nbytes(df: pd.DataFrame) -> int:
+    """Return the in-memory size of a DataFrame including string payloads."""
+    return int(df.memory_usage(index=True, deep=True).sum())
+
+
+@dataclass
+class _CacheEntry:
+    frame: pd.DataFrame | None
+    filters: list[tuple] | None
+    columns: set[str]
+    missing: set[str]
+    complete: bool
+    nbytes: int = 0
+    spill_path: str | None = None
+
+    def covers(self, columns: list[str] | None) -> bool:
+        if self.complete:
+            return True
+        return columns is not None and set(columns) <= self.columns | self.missing
+
+
+class SessionDataCache:
+    """
+    Process-level LRU cache of session DataFrames for warm Lambda containers.
+
+    Entries are keyed by session_id, the parquet version (combined S3 ETags) and
+    the row filter, and grow column-wise as tools request more columns. When the
+    byte budget is exceeded the least recently used frames are evicted, and
+    optionally spilled to local disk as Arrow IPC (feather) files from which
+    they are reloaded on the next request.
+    """
+
+    def __init__(
+        self,
+        max_bytes: int,
+        spill_dir: str | None = None,
+        spill_max_bytes: int = 0,
+        tracked_sessions: int = 128,
+    ):
+        self.max_bytes = max_bytes
+        self.spill_dir = spill_dir or None
+        self.spill_max_bytes = spill_max_bytes
+        self.tracked_sessions = tracked_sessions
+        self._entries: OrderedDict[tuple, _CacheEntry] = OrderedDict()
+        self._spilled: OrderedDict[tuple, _CacheEntry] = OrderedDict()
+        # Largest resident frame bytes seen per session, most recent last
+        self._peaks: OrderedDict[str, int] = OrderedDict()
+        self._lock = threading.RLock()
+        self._counters = {
+            "hits": 0,
+            "misses": 0,
+            "partial_hits": 0,
+            "evictions": 0,
+            "spills": 0,
+            "spill_hits": 0,
+        }
+
+    @property
+    def enabled(self) -> bool:
+        return self.max_bytes > 0
+
+    def get_or_load(
+        self,
+        session_id: str,
+        path: str,
+        columns: list[str] | None = None,
+        filters: list[tuple] | None = None,
+    ) -> pd.DataFrame:
+        """Return the session frame, reading from parquet only what is not cached."""
+        try:
+            version = parquet_version(path)
+        except Exception as version_error:
+            logger.warning(
+                f"Session cache bypassed, no parquet version: {version_error}"
+            )
+            return normalize_session_frame(read_session_parquet(path, columns, filters))
+
+        filter_key = repr(filters) if filters else None
+        key = (session_id, version, filter_key)
+        candidates = [key] if filter_key is None else [key, (session_id, version, None)]
+
+        with self._lock:
+            for candidate in candidates:
+                found = self._lookup(candidate)
+                if found is not None and found[0].covers(columns):
+                    self._counters["hits"] += 1
+                    return found[1]
+
+            found = self._lookup(key)
+            if found is not None and columns is not None:
+                self._counters["partial_hits"] += 1
+                return self._extend(key, *found, path, columns)
+
+            self._counters["misses"] += 1
+            frame = normalize_session_frame(
+                read_session_parquet(path, columns, filters)
+            )
+            self._store(
+                key,
+                _CacheEntry(
+                    frame=frame,
+                    filters=filters,
+                    columns=set(frame.columns),
+                    missing=set(columns or []) - set(frame.columns),
+                    # A projection matching no column falls back to a full read
+                    complete=columns is None or not set(columns) & set(frame.columns),
+                ),
+            )
+            return frame
+
+    def stats(self) -> dict[str, Any]:
+        """Return hit/miss counters and current occupancy for response metadata."""
+        with self._lock:
+            return {
+                **self._counters,
+                "entries": len(self._entries),
+                "bytes": sum(e.nbytes for e in self._entries.values()),
+                "max_bytes": self.max_bytes,
+                "spilled_entries": len(self._spilled),
+                "spilled_bytes": sum(e.nbytes for e in self._spilled.values()),
+            }
+
+    def session_memory(self, session_id: str) -> dict[str, Any]:
+        """
+        Memory of one session for response metadata: the bytes of its cached
+        frames now and at most so far, and the process peak RSS, for sizing
+        the Lambda memory setting.
+        """
+        with self._lock:
+            return {
+                "frame_bytes": self._session_bytes(session_id),
+                "peak_frame_bytes": self._peaks.get(session_id, 0),
+                "process_peak_rss_bytes": peak_rss_bytes(),
+            }
+
+    def clear(self) -> None:
+        with self._lock:
+            for entry in self._spilled.values():
+                self._remove_spill_file(entry)
+            self._entries.clear()
+            self._spilled.clear()
+            self._peaks.clear()
+            for name in self._counters:
+                self._counters[name] = 0
+
+    def _lookup(self, key: tuple) -> tuple[_CacheEntry, pd.DataFrame] | None:
+        """Return an entry and its frame as most recently used, reloading spills."""
+        if key in self._entries:
+            self._entries.move_to_end(key)
+            return self._entries[key], self._entries[key].frame
+        if key not in self._spilled:
             return None
 
-        # Query AgentCore memory for session events
-        region = os.environ.get("AWS_REGION", "us-east-1")
-        agentcore = boto3.client("bedrock-agentcore", region_name=region)
+        entry = self._spilled.pop(key)
+        try:
+            frame = _table_to_frame(feather.read_table(entry.spill_path))
+        except Exception as spill_error:
+            logger.warning(f"Could not reload spilled session frame: {spill_error}")
+            return None
+        finally:
+            self._remove_spill_file(entry)
+        self._counters["spill_hits"] += 1
+        entry.frame = frame
+        self._store(key, entry)
+        return entry, frame
+
+    def _extend(
+        self,
+        key: tuple,
+        entry: _CacheEntry,
+        cached: pd.DataFrame,
+        path: str,
+        columns: list[str],
+    ) -> pd.DataFrame:
+        """Read the columns an entry lacks and append them to the cached frame."""
+        needed = [c for c in columns if c not in entry.columns | entry.missing]
+        extra = normalize_session_frame(
+            read_session_parquet(path, needed, entry.filters)
+        )
+        new_columns = [c for c in extra.columns if c not in entry.columns]
+        if len(extra) == len(cached):
+            frame = pd.concat(
+                [cached, extra[new_columns].set_axis(cached.index)],
+                axis=1,
+                copy=False,
+            )
+        else:
+            # Row sets differ (data changed between reads); reread the union
+            union = sorted(entry.columns | set(needed))
+            frame = normalize_session_frame(
+                read_session_parquet(path, union, entry.filters)
+            )
+        entry.frame = frame
+        entry.columns = set(frame.columns)
+        entry.missing |= set(needed) - set(extra.columns)
+        entry.complete = entry.complete or not set(needed) & set(extra.columns)
+        self._store(key, entry)
+        return frame
+
+    def _store(self, key: tuple, entry: _CacheEntry) -> None:
+        """Insert an entry as most recently used and evict down to the budget."""
+        entry.nbytes = _frame_nbytes(entry.frame)
+        self._entries[key] = entry
+        self._entries.move_to_end(key)
+        session_id = key[0]
+        self._peaks[session_id] = max(
+            self._peaks.pop(session_id, 0), self._session_bytes(session_id)
+        )
+        while len(self._peaks) > self.tracked_sessions:
+            self._peaks.popitem(last=False)
+        resident = sum(e.nbytes for e in self._entries.values())
+        while self._entries and resident > self.max_bytes:
+            evicted_key, evicted = self._entries.popitem(last=False)
+            resident -= evicted.nbytes
+            self._counters["evictions"] += 1
+            self._spill(evicted_key, evicted)
+
+    def _spill(self, key: tuple, entry: _CacheEntry) -> None:
+        """Write an evicted frame to the spill directory if spilling is enabled."""
+        frame, entry.frame = entry.frame, None
+        if not self.spill_dir or entry.nbytes > self.spill_max_bytes:
+            return
+        try:
+            os.makedirs(self.spill_dir, exist_ok=True)
+            name = hashlib.sha256(repr(key).encode()).hexdigest()[:32]
+            entry.spill_path = os.path.join(self.spill_dir, f"{name}.arrow")
+            frame.reset_index(drop=True).to_feather(entry.spill_path)
+        except Exception as spill_error:
+            logger.warning(f"Could not spill session frame: {spill_error}")
+            self._remove_spill_file(entry)
+            return
+        self._spilled[key] = entry
+        self._counters["spills"] += 1
+        spilled = sum(e.nbytes for e in self._spilled.values())
+        while spilled > self.spill_max_bytes:
+            _, oldest = self._spilled.popitem(last=False)
+            spilled -= oldest.nbytes
+            self._remove_spill_file(oldest)
+
+    def _session_bytes(self, session_id: str) -> int:
+        return sum(
+            entry.nbytes for key, entry in self._entries.items() if key[0] == session_id
+        )
 
-        response = agentcore.list_events(
-            memoryId=AGENTCORE_MEMORY_ID,
-            actorId=ACTOR_ID,
-            sessionId=session_id,
-            maxResults=AWS_CONFIG["MAX_RESULTS"],
+    @staticmethod
+    def _remove_spill_file(entry: _CacheEntry) -> None:
+        if entry.spill_path and os.path.exists(entry.spill_path):
+            os.remove(entry.spill_path)
+        entry.spill_path = None
+
+
+session_cache = SessionDataCache(
+    max_bytes=int(
+        float(os.environ.get("SESSION_CACHE_MAX_MB", SESSION_CACHE_CONFIG["MAX_MB"]))
+        * 1024
+        * 1024
+    ),
+    spill_dir=os.environ.get(
+        "SESSION_CACHE_SPILL_DIR", SESSION_CACHE_CONFIG["SPILL_DIR"]
+    ),
+    spill_max_bytes=int(
+        float(
+            os.environ.get(
+                "SESSION_CACHE_SPILL_MAX_MB", SESSION_CACHE_CONFIG["SPILL_MAX_MB"]
+            )
         )
+        * 1024
+        * 1024
+    ),
+    tracked_sessions=SESSION_CACHE_CONFIG["TRACKED_SESSIONS"],
+)
+
+
+def as_datetime(column: pd.Series) -> pd.Series:
+    """A date column as datetime64 (unparseable values become NaT), uncopied if typed."""
+    if pd.api.types.is_datetime64_any_dtype(column):
+        return column
+    return pd.to_datetime(column, errors="coerce")
 
-        events = response.get("events", [])
-        print(f"Found {len(events)} events for session {session_id}")
 
-        # Look for query result events
-        for i, event_item in enumerate(events):
+def as_numeric(column: pd.Series) -> pd.Series:
+    """An amount column as numbers (non-numeric values become NaN), uncopied if typed."""
+    if pd.api.types.is_numeric_dtype(column):
+        return column
+    return pd.to_numeric(column, errors="coerce")
+
+
+def apply_column_aliases(df: pd.DataFrame) -> list[str]:
+    """
+    Add each missing canonical column of COLUMN_ALIASES from its first
+    alternative present, in place. Returns the canonical columns still missing.
+    """
+    unresolved = []
+    for canonical, alternatives in COLUMN_ALIASES.items():
+        if canonical in df.columns:
+            continue
+        source = next((alt for alt in alternatives if alt in df.columns), None)
+        if source is None:
+            unresolved.append(canonical)
+        else:
+            df[canonical] = df[source]
+    return unresolved
+
+
+def normalize_session_frame(df: pd.DataFrame) -> pd.DataFrame:
+    """
+    Normalize a session frame once per load, in place: alias columns are
+    mapped to their canonical names, dates become datetime64, amounts numeric
+    (float64, so sums match the source data), small whole numbers float32,
+    low-cardinality labels categoricals and free text Arrow strings. Columns already typed are left
+    as they are, so tools and repeated calls never coerce or copy them again.
+    """
+    apply_column_aliases(df)
+    for date_field in FIELD_MAPPINGS["DATE_FIELDS"]:
+        if date_field in df.columns:
+            df[date_field] = as_datetime(df[date_field])
+    for amount_field in FIELD_MAPPINGS["AMOUNT_FIELDS"]:
+        if amount_field in df.columns:
+            df[amount_field] = as_numeric(df[amount_field])
+    for numeric_field in FIELD_MAPPINGS["COMPACT_NUMERIC_FIELDS"]:
+        if numeric_field in df.columns and df[numeric_field].dtype != np.float32:
+            values = as_numeric(df[numeric_field]).to_numpy(
+                dtype=float, na_value=np.nan
+            )
+            compact = values.astype(np.float32)
+            # Only where every value survives the narrowing exactly
+            if np.array_equal(compact, values, equal_nan=True):
+                df[numeric_field] = compact
+    for category_field in FIELD_MAPPINGS["CATEGORY_FIELDS"]:
+        if category_field in df.columns and not isinstance(
+            df[category_field].dtype, pd.CategoricalDtype
+        ):
+            df[category_field] = df[category_field].astype("category")
+    for text_field in FIELD_MAPPINGS["TEXT_FIELDS"]:
+        if text_field in df.columns and df[text_field].dtype == object:
             try:
-                if hasattr(event_item, "messages") and event_item.messages:
-                    message_content = (
-                        event_item.messages[0][0]
-                        if isinstance(event_item.messages[0], tuple)
-                        else event_item.messages[0]
-                    )
-                    event_content = (
-                        json.loads(message_content)
-                        if isinstance(message_content, str)
-                        else message_content
+                df[text_field] = pd.arrays.ArrowExtensionArray(
+                    pa.array(
+                        df[text_field].to_numpy(), type=pa.string(), from_pandas=True
                     )
-                elif isinstance(event_item, dict) and "payload" in event_item:
-                    # Try payload structure
-                    payload = event_item["payload"]
-                    if isinstance(payload, list) and len(payload) > 0:
-                        blob_data = (
-                            payload[0].get("blob")
-                            if isinstance(payload[0], dict)
-                            else payload[0]
-                        )
-                        event_content = (
-                            json.loads(blob_data)
-                            if isinstance(blob_data, str)
-                            else blob_data
-                        )
-                    else:
-                        event_content = payload
-                else:
-                    print(f"Event {i} structure not recognized")
-                    continue
-
-                print(
-                    f"Event {i} content keys: {list(event_content.keys()) if isinstance(event_content, dict) else 'Not a dict'}"
                 )
+            except (pa.ArrowInvalid, pa.ArrowTypeError):
+                pass  # Mixed values (e.g. numbers) stay as objects
+    return df
 
-                # Check for query result events
-                if event_content and isinstance(event_content, dict):
-                    event_type = event_content.get("event_type")
-                    print(f"Event {i} type: {event_type}")
-                    if event_type == "query_result":
-                        print(
-                            f"Found query result event with keys: {list(event_content.keys())}"
-                        )
-                        return event_content
-            except Exception as parse_error:
-                print(f"Error parsing event {i}: {parse_error}")
-                continue
-
-        print(f"No query result found for session_id: {session_id}")
-        return None
+
+def merge_config(
+    defaults: dict[str, Any], overrides: dict[str, Any] | None
+) -> dict[str, Any]:
+    """
+    Overlay tool config overrides on the defaults one section at a time, so a
+    partial override such as {"ranking": {"top_k": 1}} keeps every other
+    default section and key.
+    """
+    merged = dict(defaults)
+    for key, value in (overrides or {}).items():
+        if isinstance(value, dict) and isinstance(defaults.get(key), dict):
+            merged[key] = {**defaults[key], **value}
+        else:
+            merged[key] = value
+    return merged
+
+
+def as_claims_frame(data: Any) -> pd.DataFrame:
+    """
+    Return claims data as a DataFrame without copying it.
+    Session DataFrames pass straight through; list-of-dicts payloads (optionally
+    wrapped as {"data": [...]}) are converted for backward compatibility.
+    """
+    if isinstance(data, pd.DataFrame):
+        return data
+    if isinstance(data, dict) and "data" in data:
+        data = data["data"]
+    if not data:
+        return pd.DataFrame()
+    if not isinstance(data, list):
+        data = [data]
+    return normalize_session_frame(
+        pd.DataFrame([claim for claim in data if isinstance(claim, dict)])
+    )
+
+
+def get_session_from_memory(session_id: str) -> dict[str, Any] | None:
+    """
+    Get session metadata from AgentCore memory.
+    Returns the newest query_result event for the session or None if not found.
+    """
+    try:
+        AGENTCORE_MEMORY_ID = os.environ.get("AGENTCORE_MEMORY_ID")
+        ACTOR_ID = os.environ.get("ACTOR_ID", "ActuarialAgent")
+
+        if not AGENTCORE_MEMORY_ID:
+            return None
+
+        event_content = session_index.latest(
+            AGENTCORE_MEMORY_ID, ACTOR_ID, session_id, "query_result"
+        )
+        if event_content is None:
+            logger.info(f"No query result found for session_id: {session_id}")
+        return event_content
 
     except Exception as e:
-        print(f"Error querying AgentCore memory: {e}")
+        logger.error(f"Error querying AgentCore memory: {e}")
         return None
 
 
@@ -153,7 +714,7 @@ def store_session_metadata(
         ACTOR_ID = os.environ.get("ACTOR_ID", "ActuarialAgent")
 
         if not AGENTCORE_MEMORY_ID:
-            print("Warning: AGENTCORE_MEMORY_ID not set")
+            logger.warning("AGENTCORE_MEMORY_ID not set")
             return False
 
         # Store lightweight metadata
@@ -167,24 +728,17 @@ def store_session_metadata(
             "timestamp": datetime.now().isoformat(),
         }
 
-        region = os.environ.get("AWS_REGION", "us-east-1")
-        agentcore = boto3.client("bedrock-agentcore", region_name=region)
-
-        agentcore.create_event(
-            memoryId=AGENTCORE_MEMORY_ID,
-            actorId=ACTOR_ID,
-            sessionId=session_id,
-            eventTimestamp=datetime.now(),
-            payload=[{"blob": json.dumps(session_metadata)}],
+        session_index.put_event(
+            AGENTCORE_MEMORY_ID, ACTOR_ID, session_id, session_metadata
         )
 
-        print(
+        logger.info(
             f"Stored session metadata for {session_id}: {row_count} rows at {s3_parquet_path}"
         )
         return True
 
     except Exception as e:
-        print(f"Error storing session metadata: {e}")
+        logger.error(f"Error storing session metadata: {e}")
         return False
 
 
@@ -203,22 +757,21 @@ def validate_required_columns(
 
 
 def standardize_date_fields(df: pd.DataFrame) -> pd.DataFrame:
-    """Standardize date fields to datetime format."""
-    df_copy = df.copy()
+    """Standardize date fields to datetime format (columns are not copied)."""
+    df_copy = df.copy(deep=False)
     for date_field in FIELD_MAPPINGS["DATE_FIELDS"]:
         if date_field in df_copy.columns:
-            df_copy[date_field] = pd.to_datetime(df_copy[date_field], errors="coerce")
+            df_copy[date_field] = as_datetime(df_copy[date_field])
     return df_copy
 
 
 def standardize_amount_fields(df: pd.DataFrame) -> pd.DataFrame:
-    """Standardize amount fields to numeric format."""
-    df_copy = df.copy()
+    """Standardize amount fields to numeric format (typed columns are not copied)."""
+    df_copy = df.copy(deep=False)
     for amount_field in FIELD_MAPPINGS["AMOUNT_FIELDS"]:
         if amount_field in df_copy.columns:
-            df_copy[amount_field] = pd.to_numeric(
-                df_copy[amount_field], errors="coerce"
-            ).fillna(0)
+            amounts = as_numeric(df_copy[amount_field])
+            df_copy[amount_field] = amounts.fillna(0) if amounts.hasnans else amounts
     return df_copy
 
 
@@ -0,0 +1,116 @@
+# Cached access to the Glue Data Catalog
+import logging
+import time
+from typing import Any
+
+from .constants import GLUE_CATALOG_CONFIG
+
+# Set up logging
+# Set root logger level explicitly
+logging.getLogger().setLevel(logging.INFO)
+
+# Get logger for this module
+logger = logging.getLogger(__name__)
+logger.setLevel(logging.INFO)
+
+
+def _table_version(table: dict[str, Any]) -> tuple:
+    return (table.get("VersionId"), str(table.get("UpdateTime")))
+
+
+class GlueCatalog:
+    """
+    Paginated, TTL-cached view of Glue databases and table definitions.
+
+    Glue has no call that reports table versions more cheaply than fetching
+    the definitions themselves, so cached listings and definitions are served
+    without a check for up to ttl_seconds and may be that stale. Whenever a
+    definition is fetched again, its VersionId and UpdateTime are compared
+    with the cached copy: a changed table also expires the cached listing of
+    its database, and a listing forgets the tables that were dropped.
+    """
+
+    def __init__(
+        self, glue_client, ttl_seconds: float = GLUE_CATALOG_CONFIG["TTL_SECONDS"]
+    ):
+        self.glue = glue_client
+        self.ttl_seconds = ttl_seconds
+        self._listings: dict[str, tuple[float, list[dict[str, Any]]]] = {}
+        self._tables: dict[tuple[str, str], tuple[float, dict[str, Any]]] = {}
+
+    def list_tables(self, database: str, refresh: bool = False) -> list[dict[str, Any]]:
+        """Return every table definition in database (raises if it does not exist)."""
+        cached = self._listings.get(database)
+        if cached and not refresh and self._fresh(cached[0]):
+            return cached[1]
+
+        paginator = self.glue.get_paginator("get_tables")
+        tables = [
+            table
+            for page in paginator.paginate(DatabaseName=database)
+            for table in page.get("TableList", [])
+        ]
+        now = time.monotonic()
+
+        names = {table["Name"] for table in tables}
+        for key in [key for key in self._tables if key[0] == database]:
+            if key[1] not in names:
+                del self._tables[key]
+        for table in tables:
+            self._store(database, table, now)
+        self._listings[database] = (now, tables)
+
+        logger.info(f"Listed {len(tables)} tables in Glue database {database}")
+        return tables
+
+    def get_table(self, database: str, name: str) -> dict[str, Any]:
+        """Return one table definition (raises EntityNotFoundException if absent)."""
+        cached = self._tables.get((database, name))
+        if cached and self._fresh(cached[0]):
+            return cached[1]
+
+        try:
+            table = self.glue.get_table(DatabaseName=database, Name=name)["Table"]
+        except self.glue.exceptions.EntityNotFoundException:
+            if self._tables.pop((database, name), None) is not None:
+                self._listings.pop(database, None)
+            raise
+        self._store(database, table, time.monotonic())
+        return table
+
+    def get_tables(
+        self, database: str, names: list[str]
+    ) -> tuple[list[dict[str, Any]], list[str]]:
+        """
+        Return the definitions of several tables and the names that do not exist.
+        Glue has no batch get for tables, so each name not cached is fetched
+        with its own get_table call.
+        """
+        found, missing = [], []
+        for name in names:
+            try:
+                found.append(self.get_table(database, name))
+            except self.glue.exceptions.EntityNotFoundException:
+                missing.append(name)
+        return found, missing
+
+    def invalidate(self, database: str | None = None) -> None:
+        for key in [key for key in self._listings if database in (None, key)]:
+            del self._listings[key]
+        for key in [key for key in self._tables if database in (None, key[0])]:
+            del self._tables[key]
+
+    def _store(self, database: str, table: dict[str, Any], fetched_at: float) -> None:
+        """Cache a fetched definition; a new version expires the database listing."""
+        key = (database, table["Name"])
+        previous = self._tables.get(key)
+        if previous is None and database in self._listings:
+            # A table the cached listing does not have
+            self._listings.pop(database)
+        elif previous and _table_version(previous[1]) != _table_version(table):
+            logger.info(f"Glue table {database}.{table['Name']} changed")
+            self._listings.pop(database, None)
+        self._tables[key] = (fetched_at, table)
+
+    def _fresh(self, fetched_at: float) -> bool:
+        return time.monotonic() - fetched_at < self.ttl_seconds
@@ -0,0 +1,196 @@
+# Multi-pattern keyword matching for claim text
+import re
+from functools import lru_cache
+
+import numpy as np
+import pyarrow as pa
+import pyarrow.compute as pc
+
+
+class KeywordMatcher:
+    """
+    Substring matcher for several named keyword categories at once.
+
+    Semantics are exactly `term in text` for every term. Matching is planned
+    once per set of categories using term containment: a term can only occur
+    in a text if every shorter term inside it does, so the root terms (those
+    containing no other term) are searched first and the terms built on them
+    only where a root was found.
+
+    Columns of texts go through Arrow: a single RE2 pass (one automaton over
+    all terms) picks out the texts containing any term, and only those are
+    searched per category or per root term. Single texts use C-level
+    substring searches, which beat a combined regex under CPython's engine.
+    """
+
+    def __init__(self, categories: dict[str, list[str]]):
+        self.categories = {name: list(terms) for name, terms in categories.items()}
+        terms = sorted({term for terms in self.categories.values() for term in terms})
+        self.terms = tuple(terms)
+        self._roots = _minimal_terms(terms)
+        self._extensions = {
+            root: tuple(term for term in terms if term != root and root in term)
+            for root in self._roots
+        }
+        self._category_roots = {
+            name: _minimal_terms(dict.fromkeys(category_terms))
+            for name, category_terms in self.categories.items()
+        }
+        self._any_pattern = _alternation(self._roots)
+        self._category_patterns = {
+            name: _alternation(roots) for name, roots in self._category_roots.items()
+        }
+
+    def terms_in(self, text: str) -> set[str]:
+        """Every term that occurs in text."""
+        contains = text.__contains__
+        found = set(filter(contains, self._roots))
+        if found:
+            candidates = set()
+            for root in found:
+                candidates.update(self._extensions[root])
+            found.update(filter(contains, candidates))
+        return found
+
+    def categories_in(
+        self, text: str, names: tuple[str, ...] | None = None
+    ) -> set[str]:
+        """Names of the categories (of names, if given) with a term in text."""
+        contains = text.__contains__
+        roots = self._category_roots
+        return {name for name in names or roots if any(map(contains, roots[name]))}
+
+    def match(self, text: str) -> dict[str, list[str]]:
+        """
+        Hit terms per category, in each category's own term order (duplicates
+        kept); categories without hits are omitted.
+        """
+        return self._hits(self.terms_in(text))
+
+    def matches(self, texts: list[str]) -> list[dict[str, list[str]]]:
+        """match() of every text, from one scan of the column."""
+        found = [set() for _ in texts]
+        for term, mask in self.term_masks(texts).items():
+            for i in np.flatnonzero(mask):
+                found[i].add(term)
+        return [self._hits(terms) for terms in found]
+
+    def _hits(self, found: set[str]) -> dict[str, list[str]]:
+        if not found:
+            return {}
+        return {
+            name: hits
+            for name, terms in self.categories.items()
+            if (hits := [term for term in terms if term in found])
+        }
+
+    def category_masks(
+        self, texts: list[str], names: tuple[str, ...] | None = None
+    ) -> dict[str, np.ndarray]:
+        """Per category (of names, if given), a mask of texts with any of its terms."""
+        names = tuple(names or self.categories)
+        masks = {name: np.zeros(len(texts), dtype=bool) for name in names}
+        candidates = self._candidates(texts)
+        if candidates is None:
+            for i, text in enumerate(texts):
+                for name in self.categories_in(text, names):
+                    masks[name][i] = True
+            return masks
+
+        array, rows = candidates
+        if len(rows):
+            for name in names:
+                pattern = self._category_patterns[name]
+                if pattern is not None:
+                    masks[name][rows] = _search(array, pattern)
+        return masks
+
+    def term_masks(self, texts: list[str]) -> dict[str, np.ndarray]:
+        """Per term, a boolean mask of texts containing it."""
+        masks = {term: np.zeros(len(texts), dtype=bool) for term in self.terms}
+        candidates = self._candidates(texts)
+        if candidates is None:
+            for i, text in enumerate(texts):
+                for term in self.terms_in(text):
+                    masks[term][i] = True
+            return masks
+
+        array, rows = candidates
+        if len(rows):
+            self._split_roots(array, rows, self._roots, masks)
+        return masks
+
+    def _split_roots(
+        self,
+        array: pa.Array,
+        rows: np.ndarray,
+        roots: tuple[str, ...],
+        masks: dict[str, np.ndarray],
+    ):
+        """
+        Attribute texts already known to contain one of roots to the terms
+        they contain: halve the roots and test each half only on those texts,
+        so the work follows the hits instead of the number of terms.
+        """
+        if len(roots) == 1:
+            root = roots[0]
+            masks[root][rows] = True
+            for term in self._extensions[root]:
+                masks[term][rows] |= _contains(array, term)
+            return
+        middle = len(roots) // 2
+        for half in (roots[:middle], roots[middle:]):
+            hit = _search(array, _alternation(half))
+            if hit.any():
+                self._split_roots(array.filter(pa.array(hit)), rows[hit], half, masks)
+
+    def _candidates(self, texts: list[str]) -> tuple[pa.Array, np.ndarray] | None:
+        """
+        The texts containing any term as an Arrow array, with their row
+        numbers; None if the texts can't be encoded as UTF-8.
+        """
+        try:
+            array = pa.array(texts, type=pa.string())
+        except (pa.ArrowException, UnicodeEncodeError):
+            return None
+        if self._any_pattern is None:
+            return array.slice(0, 0), np.zeros(0, dtype=np.int64)
+        hit = _search(array, self._any_pattern)
+        return array.filter(pa.array(hit)), np.flatnonzero(hit)
+
+
+def _minimal_terms(terms) -> tuple[str, ...]:
+    """The terms that contain no other term."""
+    terms = list(terms)
+    return tuple(
+        term
+        for term in terms
+        if not any(other != term and other in term for other in terms)
+    )
+
+
+def _alternation(terms: tuple[str, ...]) -> str | None:
+    """RE2 pattern matching any of terms literally, or None if there are none."""
+    if not terms:
+        return None
+    return "|".join(re.escape(term) for term in terms)
+
+
+def _search(array: pa.Array, pattern: str) -> np.ndarray:
+    return pc.match_substring_regex(array, pattern).to_numpy(zero_copy_only=False)
+
+
+def _contains(array: pa.Array, term: str) -> np.ndarray:
+    return pc.match_substring(array, term).to_numpy(zero_copy_only=False)
+
+
+@lru_cache(maxsize=16)
+def _cached_matcher(categories: tuple[tuple[str, tuple[str, ...]], ...]):
+    return KeywordMatcher({name: list(terms) for name, terms in categories})
+
+
+def get_keyword_matcher(categories: dict[str, list[str]]) -> KeywordMatcher:
+    """Compiled matcher for categories, built once per distinct set of terms."""
+    return _cached_matcher(
+        tuple((name, tuple(terms)) for name, terms in categories.items())
+    )
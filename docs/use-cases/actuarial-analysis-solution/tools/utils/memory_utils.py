@@ -0,0 +1,264 @@
+# AgentCore memory access for actuarial sessions
+import json
+import logging
+import os
+import threading
+import time
+import uuid
+from collections import OrderedDict
+from datetime import datetime
+from typing import Any
+
+import boto3
+
+from .constants import AWS_CONFIG, MEMORY_INDEX_CONFIG
+
+# Set up logging
+# Set root logger level explicitly
+logging.getLogger().setLevel(logging.INFO)
+
+# Get logger for this module
+logger = logging.getLogger(__name__)
+logger.setLevel(logging.INFO)
+
+
+class LocalMemoryClient:
+    """
+    In-process stand-in for the bedrock-agentcore memory API.
+
+    Implements the create_event / list_events calls used by the tools, including
+    nextToken pagination, so session handling can be exercised offline. Enabled
+    with AGENTCORE_MEMORY_BACKEND=local; all instances share one event store.
+    """
+
+    _events: dict[tuple[str, str, str], list[dict[str, Any]]] = {}
+    _lock = threading.Lock()
+
+    def create_event(
+        self,
+        memoryId: str,
+        actorId: str,
+        sessionId: str,
+        eventTimestamp: datetime,
+        payload: list[dict[str, Any]],
+        **kwargs,
+    ) -> dict[str, Any]:
+        event = {
+            "memoryId": memoryId,
+            "actorId": actorId,
+            "sessionId": sessionId,
+            "eventId": str(uuid.uuid4()),
+            "eventTimestamp": eventTimestamp,
+            "payload": payload,
+        }
+        with self._lock:
+            self._events.setdefault((memoryId, actorId, sessionId), []).append(event)
+        return {"event": event}
+
+    def list_events(
+        self,
+        memoryId: str,
+        actorId: str,
+        sessionId: str,
+        maxResults: int = AWS_CONFIG["MAX_RESULTS"],
+        nextToken: str | None = None,
+        **kwargs,
+    ) -> dict[str, Any]:
+        with self._lock:
+            events = list(self._events.get((memoryId, actorId, sessionId), []))
+        start = int(nextToken or 0)
+        response = {"events": events[start : start + maxResults]}
+        if start + maxResults < len(events):
+            response["nextToken"] = str(start + maxResults)
+        return response
+
+    @classmethod
+    def reset(cls) -> None:
+        with cls._lock:
+            cls._events.clear()
+
+
+_clients: dict[str, Any] = {}
+
+
+def get_memory_client():
+    """Return the AgentCore memory client, or the local stand-in when configured."""
+    if os.environ.get("AGENTCORE_MEMORY_BACKEND", "").lower() == "local":
+        return _clients.setdefault("local", LocalMemoryClient())
+    region = os.environ.get("AWS_REGION", "us-east-1")
+    if region not in _clients:
+        _clients[region] = boto3.client("bedrock-agentcore", region_name=region)
+    return _clients[region]
+
+
+def parse_event_content(event_item: Any) -> dict[str, Any] | None:
+    """Decode the JSON payload of a memory event, or None if it is not a dict."""
+    try:
+        if hasattr(event_item, "messages") and event_item.messages:
+            content = (
+                event_item.messages[0][0]
+                if isinstance(event_item.messages[0], tuple)
+                else event_item.messages[0]
+            )
+        elif isinstance(event_item, dict) and "payload" in event_item:
+            payload = event_item["payload"]
+            if isinstance(payload, list) and len(payload) > 0:
+                content = (
+                    payload[0].get("blob")
+                    if isinstance(payload[0], dict)
+                    else payload[0]
+                )
+            else:
+                content = payload
+        else:
+            return None
+        content = json.loads(content) if isinstance(content, str) else content
+    except (TypeError, ValueError) as parse_error:
+        logger.debug(f"Skipping unparseable memory event: {parse_error}")
+        return None
+    return content if isinstance(content, dict) else None
+
+
+def _event_time(event_item: Any) -> float:
+    timestamp = (
+        event_item.get("eventTimestamp") if isinstance(event_item, dict) else None
+    )
+    if isinstance(timestamp, datetime):
+        return timestamp.timestamp()
+    if isinstance(timestamp, int | float):
+        return float(timestamp)
+    if isinstance(timestamp, str):
+        try:
+            return datetime.fromisoformat(timestamp).timestamp()
+        except ValueError:
+            return 0.0
+    return 0.0
+
+
+class SessionEventIndex:
+    """
+    Memoized, type-indexed view of the events stored for each session.
+
+    The first lookup for a session pages through list_events completely, parses
+    every payload once and groups the events by event_type, newest first. Later
+    lookups are dictionary reads until the entry is older than max_age_seconds
+    (events written by other functions, such as a new query_result, become
+    visible after that). That includes lookups for a type the listing did not
+    contain, which are answered as empty instead of re-listing the session.
+    Events written through put_event are added to the index directly.
+    """
+
+    def __init__(
+        self,
+        max_age_seconds: float = MEMORY_INDEX_CONFIG["MAX_AGE_SECONDS"],
+        max_sessions: int = MEMORY_INDEX_CONFIG["MAX_SESSIONS"],
+    ):
+        self.max_age_seconds = max_age_seconds
+        self.max_sessions = max_sessions
+        self._sessions: OrderedDict[tuple, tuple[float, dict[str, list]]] = (
+            OrderedDict()
+        )
+        self._lock = threading.RLock()
+
+    def latest(
+        self,
+        memory_id: str,
+        actor_id: str,
+        session_id: str,
+        event_type: str,
+    ) -> dict[str, Any] | None:
+        """Return the newest event of event_type for the session, if any."""
+        events = self.events(memory_id, actor_id, session_id, event_type)
+        return events[0] if events else None
+
+    def events(
+        self,
+        memory_id: str,
+        actor_id: str,
+        session_id: str,
+        event_type: str,
+    ) -> list[dict[str, Any]]:
+        """Return all events of event_type for the session, newest first."""
+        key = (memory_id, actor_id, session_id)
+        with self._lock:
+            cached = self._sessions.get(key)
+            # A fresh entry also records which event types the session lacks
+            if not cached or time.monotonic() - cached[0] >= self.max_age_seconds:
+                cached = self._build(key)
+            self._sessions.move_to_end(key)
+            return list(cached[1].get(event_type, []))
+
+    def put_event(
+        self,
+        memory_id: str,
+        actor_id: str,
+        session_id: str,
+        event_content: dict[str, Any],
+    ) -> None:
+        """Create a memory event and add it to the index without re-listing."""
+        get_memory_client().create_event(
+            memoryId=memory_id,
+            actorId=actor_id,
+            sessionId=session_id,
+            eventTimestamp=datetime.now(),
+            payload=[{"blob": json.dumps(event_content)}],
+        )
+        key = (memory_id, actor_id, session_id)
+        with self._lock:
+            if key in self._sessions:
+                event_type = event_content.get("event_type")
+                self._sessions[key][1].setdefault(event_type, []).insert(
+                    0, event_content
+                )
+
+    def invalidate(self, session_id: str | None = None) -> None:
+        with self._lock:
+            for key in list(self._sessions):
+                if session_id is None or key[2] == session_id:
+                    del self._sessions[key]
+
+    def _build(self, key: tuple) -> tuple[float, dict[str, list]]:
+        memory_id, actor_id, session_id = key
+        client = get_memory_client()
+        raw_events, next_token = [], None
+        while True:
+            request = {
+                "memoryId": memory_id,
+                "actorId": actor_id,
+                "sessionId": session_id,
+                "maxResults": AWS_CONFIG["MAX_RESULTS"],
+            }
+            if next_token:
+                request["nextToken"] = next_token
+            response = client.list_events(**request)
+            raw_events.extend(response.get("events", []))
+            next_token = response.get("nextToken")
+            if not next_token:
+                break
+
+        by_type: dict[str, list] = {}
+        # Stable sort keeps list_events order among equal (or missing) timestamps
+        ordered = sorted(raw_events, key=_event_time, reverse=True)
+        for event_item in ordered:
+            content = parse_event_content(event_item)
+            if content is not None:
+                by_type.setdefault(content.get("event_type"), []).append(content)
+
+        logger.info(
+            f"Indexed {len(raw_events)} events for session {session_id}: "
+            f"{ {event_type: len(items) for event_type, items in by_type.items()} }"
+        )
+        entry = (time.monotonic(), by_type)
+        self._sessions[key] = entry
+        while len(self._sessions) > self.max_sessions:
+            self._sessions.popitem(last=False)
+        return entry
+
+
+session_index = SessionEventIndex(
+    max_age_seconds=float(
+        os.environ.get(
+            "MEMORY_INDEX_MAX_AGE_SECONDS", MEMORY_INDEX_CONFIG["MAX_AGE_SECONDS"]
+        )
+    ),
+)
@@ -0,0 +1,247 @@
+# Reuse of Athena UNLOAD results for repeated SQL
+import hashlib
+import json
+import logging
+import re
+import threading
+import time
+from typing import Any
+
+from .constants import NONDETERMINISTIC_SQL_FUNCTIONS, QUERY_CACHE_CONFIG
+
+# Set up logging
+# Set root logger level explicitly
+logging.getLogger().setLevel(logging.INFO)
+
+# Get logger for this module
+logger = logging.getLogger(__name__)
+logger.setLevel(logging.INFO)
+
+_SQL_TOKENS = re.compile(
+    r"(?P<literal>'(?:[^']|'')*')"
+    r"|(?P<quoted>\"(?:[^\"]|\"\")*\")"
+    r"|(?P<comment>--[^\n]*|/\*.*?\*/)"
+    r"|(?P<space>\s+)"
+    r"|(?P<other>[^'\"\s\-/]+|[\-/])",
+    re.DOTALL,
+)
+
+# Words, quoted identifiers and single punctuation marks of SQL code
+_CODE_TOKEN = re.compile(r"\"(?:[^\"]|\"\")*\"|[a-z_][\w$]*|\S")
+_IDENTIFIER = re.compile(r"\"(?:[^\"]|\"\")*\"|[a-z_][\w$]*")
+# Keywords that end a FROM list at its own nesting depth
+_FROM_LIST_END = {
+    "where",
+    "group",
+    "order",
+    "having",
+    "limit",
+    "offset",
+    "fetch",
+    "union",
+    "intersect",
+    "except",
+    "window",
+}
+# Keywords that may directly follow FROM / JOIN without naming a table
+_NOT_TABLES = {"lateral", "unnest", "select", "values", "table"}
+_NONDETERMINISTIC = re.compile(
+    r"\b(" + "|".join(map(re.escape, NONDETERMINISTIC_SQL_FUNCTIONS)) + r")\b"
+)
+
+
+def normalize_sql(query: str) -> str:
+    """
+    Canonical form of a query for result reuse.
+    Drops comments, collapses whitespace, lowercases everything outside string
+    literals and quoted identifiers, and strips a trailing semicolon.
+    """
+    parts = []
+    for match in _SQL_TOKENS.finditer(query):
+        kind = match.lastgroup
+        if kind == "comment" or kind == "space":
+            parts.append(" ")
+        elif kind == "other":
+            parts.append(match.group().lower())
+        else:
+            parts.append(match.group())
+    normalized = re.sub(r" +", " ", "".join(parts)).strip()
+    return normalized.rstrip(";").strip()
+
+
+def query_cache_key(query: str, database: str) -> str:
+    """Hash of the normalized SQL and the database it runs against."""
+    return hashlib.sha256(f"{database}\n{normalize_sql(query)}".encode()).hexdigest()
+
+
+def _code_tokens(query: str) -> list[str]:
+    """Tokens of the normalized query outside string literals and comments."""
+    tokens = []
+    for match in _SQL_TOKENS.finditer(normalize_sql(query)):
+        if match.lastgroup == "quoted":
+            tokens.append(match.group())
+        elif match.lastgroup == "literal":
+            tokens.append("?")
+        elif match.lastgroup == "other":
+            tokens.extend(_CODE_TOKEN.findall(match.group()))
+    return tokens
+
+
+def referenced_tables(query: str, database: str) -> list[tuple[str, str]]:
+    """
+    (database, table) pairs named after JOIN or in a FROM list, including the
+    comma-separated form (FROM claims c, policies p ON ..., payments). CTE
+    names are included as well; callers skip names the catalog does not know.
+    """
+    tokens = _code_tokens(query)
+    tables = []
+    # Nesting depth of each open FROM list, innermost last
+    from_depths: list[int] = []
+    depth, expect_table = 0, False
+    for i, token in enumerate(tokens):
+        if expect_table:
+            expect_table = False
+            if _IDENTIFIER.fullmatch(token) and token not in _NOT_TABLES:
+                names, j = [token], i + 1
+                if tokens[j : j + 1] == ["."] and j + 1 < len(tokens):
+                    names.append(tokens[j + 1])
+                    j += 2
+                # A name followed by "(" is a table function, not a table
+                if tokens[j : j + 1] != ["("]:
+                    names = [name.strip('"') for name in names]
+                    table = (
+                        (database, names[0])
+                        if len(names) == 1
+                        else (names[0], names[1])
+                    )
+                    if table not in tables:
+                        tables.append(table)
+
+        if token == "(":
+            depth += 1
+        elif token == ")":
+            depth -= 1
+            while from_depths and from_depths[-1] > depth:
+                from_depths.pop()
+        elif token == "from":
+            from_depths.append(depth)
+            expect_table = True
+        elif token == "join":
+            expect_table = True
+        elif from_depths and from_depths[-1] == depth:
+            if token == ",":
+                expect_table = True
+            elif token in _FROM_LIST_END:
+                from_depths.pop()
+    return tables
+
+
+def nondeterministic_functions(query: str) -> list[str]:
+    """
+    The functions of NONDETERMINISTIC_SQL_FUNCTIONS (now(), current_date,
+    rand(), ...) the query calls outside string literals and quoted
+    identifiers. A query calling any of them gives a new result on every run,
+    so its result is never reused.
+    """
+    code = " ".join(
+        match.group().lower()
+        for match in _SQL_TOKENS.finditer(query)
+        if match.lastgroup == "other"
+    )
+    return list(dict.fromkeys(_NONDETERMINISTIC.findall(code)))
+
+
+def table_versions(glue, tables: list[tuple[str, str]]) -> dict[str, str]:
+    """Map "database.table" to the Glue UpdateTime of each table that exists."""
+    versions = {}
+    for database, table in tables:
+        try:
+            response = glue.get_table(DatabaseName=database, Name=table)
+        except glue.exceptions.EntityNotFoundException:
+            continue
+        table_info = response["Table"]
+        updated = table_info.get("UpdateTime") or table_info.get("CreateTime")
+        versions[f"{database}.{table}"] = str(updated)
+    return versions
+
+
+class QueryResultRegistry:
+    """
+    Registry of UNLOAD results keyed by query_cache_key.
+
+    Entries live in process memory and as small JSON documents under
+    s3://<bucket>/<prefix>/ so that every Lambda container shares them. An
+    entry is reused while it is younger than ttl_seconds and the Glue
+    UpdateTime of every table it read is unchanged.
+    """
+
+    def __init__(
+        self,
+        s3_client,
+        bucket: str,
+        prefix: str = QUERY_CACHE_CONFIG["PREFIX"],
+        ttl_seconds: float = QUERY_CACHE_CONFIG["TTL_SECONDS"],
+    ):
+        self.s3 = s3_client
+        self.bucket = bucket
+        self.prefix = prefix.strip("/")
+        self.ttl_seconds = ttl_seconds
+        self._entries: dict[str, dict[str, Any]] = {}
+        self._lock = threading.Lock()
+
+    def get(self, key: str, versions: dict[str, str]) -> dict[str, Any] | None:
+        """Return the registered result for key if it is still valid."""
+        with self._lock:
+            entry = self._entries.get(key)
+        if entry is None:
+            entry = self._read(key)
+        if entry is None:
+            return None
+
+        if time.time() - entry.get("created_at", 0) > self.ttl_seconds:
+            logger.info(f"Query result {key[:12]} expired")
+            self.invalidate(key)
+            return None
+        if entry.get("table_versions") != versions:
+            logger.info(f"Query result {key[:12]} invalidated by a table update")
+            self.invalidate(key)
+            return None
+
+        with self._lock:
+            self._entries[key] = entry
+        return entry
+
+    def put(self, key: str, entry: dict[str, Any]) -> None:
+        entry = {**entry, "created_at": time.time()}
+        with self._lock:
+            self._entries[key] = entry
+        try:
+            self.s3.put_object(
+                Bucket=self.bucket,
+                Key=self._object_key(key),
+                Body=json.dumps(entry).encode(),
+                ContentType="application/json",
+            )
+        except Exception as e:
+            logger.warning(f"Could not persist query result {key[:12]}: {e}")
+
+    def invalidate(self, key: str) -> None:
+        with self._lock:
+            self._entries.pop(key, None)
+        try:
+            self.s3.delete_object(Bucket=self.bucket, Key=self._object_key(key))
+        except Exception as e:
+            logger.warning(f"Could not remove query result {key[:12]}: {e}")
+
+    def _read(self, key: str) -> dict[str, Any] | None:
+        try:
+            body = self.s3.get_object(Bucket=self.bucket, Key=self._object_key(key))
+            return json.loads(body["Body"].read())
+        except self.s3.exceptions.NoSuchKey:
+            return None
+        except Exception as e:
+            logger.warning(f"Could not read query result {key[:12]}: {e}")
+            return None
+
+    def _object_key(self, key: str) -> str:
+        return f"{self.prefix}/{key}.json"
@@ -0,0 +1,274 @@
+# Statistical test helpers (the Lambda layer has numpy but not scipy)
+import math
+
+import numpy as np
+
+_MAX_ITERATIONS = 500
+_EPSILON = 1e-15
+_TINY = 1e-300
+
+
+def _beta_continued_fraction(a: float, b: float, x: float) -> float:
+    """Continued fraction of the incomplete beta function (modified Lentz)."""
+    qab, qap, qam = a + b, a + 1.0, a - 1.0
+    c, d = 1.0, 1.0 - qab * x / qap
+    d = 1.0 / (d if abs(d) > _TINY else _TINY)
+    h = d
+    for m in range(1, _MAX_ITERATIONS + 1):
+        m2 = 2 * m
+        for numerator in (
+            m * (b - m) * x / ((qam + m2) * (a + m2)),
+            -(a + m) * (qab + m) * x / ((a + m2) * (qap + m2)),
+        ):
+            d = 1.0 + numerator * d
+            d = 1.0 / (d if abs(d) > _TINY else _TINY)
+            c = 1.0 + numerator / c
+            c = c if abs(c) > _TINY else _TINY
+            h *= d * c
+        if abs(d * c - 1.0) < _EPSILON:
+            break
+    return h
+
+
+def regularized_beta(a: float, b: float, x: float) -> float:
+    """Regularized incomplete beta function I_x(a, b)."""
+    if x <= 0.0:
+        return 0.0
+    if x >= 1.0:
+        return 1.0
+    log_front = (
+        math.lgamma(a + b)
+        - math.lgamma(a)
+        - math.lgamma(b)
+        + a * math.log(x)
+        + b * math.log1p(-x)
+    )
+    if x < (a + 1.0) / (a + b + 2.0):
+        return math.exp(log_front) * _beta_continued_fraction(a, b, x) / a
+    return 1.0 - math.exp(log_front) * _beta_continued_fraction(b, a, 1.0 - x) / b
+
+
+def regularized_gamma_upper(a: float, x: float) -> float:
+    """Regularized upper incomplete gamma function Q(a, x)."""
+    if x <= 0.0:
+        return 1.0
+    log_front = -x + a * math.log(x) - math.lgamma(a)
+    if x < a + 1.0:
+        # Series for P(a, x)
+        term = total = 1.0 / a
+        denominator = a
+        for _ in range(_MAX_ITERATIONS):
+            denominator += 1.0
+            term *= x / denominator
+            total += term
+            if abs(term) < abs(total) * _EPSILON:
+                break
+        return max(0.0, 1.0 - total * math.exp(log_front))
+
+    # Continued fraction for Q(a, x) (modified Lentz)
+    b = x + 1.0 - a
+    c, d = 1.0 / _TINY, 1.0 / b
+    h = d
+    for i in range(1, _MAX_ITERATIONS + 1):
+        numerator = -i * (i - a)
+        b += 2.0
+        d = numerator * d + b
+        d = 1.0 / (d if abs(d) > _TINY else _TINY)
+        c = b + numerator / c
+        c = c if abs(c) > _TINY else _TINY
+        h *= d * c
+        if abs(d * c - 1.0) < _EPSILON:
+            break
+    return math.exp(log_front) * h
+
+
+def f_survival(statistic: float, df_between: float, df_within: float) -> float:
+    """P(F > statistic) for an F(df_between, df_within) distribution."""
+    if math.isnan(statistic):
+        return float("nan")
+    if statistic <= 0.0:
+        return 1.0
+    if math.isinf(statistic):
+        return 0.0
+    x = df_within / (df_within + df_between * statistic)
+    return regularized_beta(df_within / 2.0, df_between / 2.0, x)
+
+
+def chi2_survival(statistic: float, df: float) -> float:
+    """P(X > statistic) for a chi-squared distribution with df degrees of freedom."""
+    if math.isnan(statistic):
+        return float("nan")
+    if math.isinf(statistic):
+        return 0.0
+    return regularized_gamma_upper(df / 2.0, statistic / 2.0)
+
+
+def average_ranks(
+    values: np.ndarray, order: np.ndarray | None = None
+) -> tuple[np.ndarray, float]:
+    """
+    1-based ranks of values with ties given their average rank, and the tie
+    term sum(t**3 - t) over groups of t equal values. order, if given, is a
+    precomputed argsort of values.
+    """
+    n = len(values)
+    if order is None:
+        order = np.argsort(values, kind="stable")
+    ordered = values[order]
+    starts = np.concatenate(([0], np.flatnonzero(ordered[1:] != ordered[:-1]) + 1))
+    ends = np.append(starts[1:], n)
+    sizes = (ends - starts).astype(float)
+    ranks = np.empty(n)
+    ranks[order] = np.repeat((starts + ends + 1) / 2.0, ends - starts)
+    return ranks, float((sizes**3 - sizes).sum())
+
+
+def one_way_anova(
+    counts: np.ndarray, sums: np.ndarray, sums_of_squares: np.ndarray
+) -> dict[str, float]:
+    """
+    One-way ANOVA from per-group count, sum and sum of squares (of values
+    centred near the overall mean, to keep the sums of squares accurate).
+    """
+    n, k = float(counts.sum()), len(counts)
+    grand_sum = float(sums.sum())
+    between = float((sums**2 / counts).sum()) - grand_sum**2 / n
+    total = float(sums_of_squares.sum()) - grand_sum**2 / n
+    within = max(total - between, 0.0)
+    between = max(between, 0.0)
+    df_between, df_within = k - 1, int(n) - k
+
+    if within > 0.0:
+        statistic = (between / df_between) / (within / df_within)
+    else:
+        # No spread within segments: any difference between them is decisive
+        statistic = float("inf") if between > 0.0 else 0.0
+    return {
+        # None for an unbounded statistic, which JSON cannot represent
+        "f_statistic": statistic if math.isfinite(statistic) else None,
+        "df_between": df_between,
+        "df_within": df_within,
+        "p_value": f_survival(statistic, df_between, df_within),
+        "eta_squared": between / total if total > 0.0 else 0.0,
+    }
+
+
+def kruskal_wallis(
+    counts: np.ndarray, rank_sums: np.ndarray, tie_term: float
+) -> dict[str, float]:
+    """Kruskal-Wallis H test from per-group counts and rank sums."""
+    n, k = float(counts.sum()), len(counts)
+    statistic = 12.0 / (n * (n + 1.0)) * float((rank_sums**2 / counts).sum()) - 3.0 * (
+        n + 1.0
+    )
+    correction = 1.0 - tie_term / (n**3 - n)
+    if correction > 0.0:
+        statistic = max(statistic / correction, 0.0)
+        p_value = chi2_survival(statistic, k - 1)
+    else:
+        # Every value is tied, so the groups cannot differ
+        statistic, p_value = 0.0, 1.0
+    return {
+        "h_statistic": statistic,
+        "df": k - 1,
+        "p_value": p_value,
+        "epsilon_squared": statistic / (n - 1.0) if n > 1 else 0.0,
+    }
+
+
+def adjust_p_values(p_values: list[float], method: str = "holm") -> list[float]:
+    """
+    Multiple-comparison adjusted p-values: "holm" (Holm-Bonferroni, family-wise
+    error), "bh" (Benjamini-Hochberg, false discovery rate) or "none".
+    """
+    m = len(p_values)
+    if m == 0 or method == "none":
+        return list(p_values)
+    p = np.asarray(p_values, dtype=float)
+    if method == "holm":
+        order = np.argsort(p, kind="stable")
+        adjusted = np.maximum.accumulate(p[order] * (m - np.arange(m)))
+    elif method == "bh":
+        order = np.argsort(p, kind="stable")[::-1]
+        adjusted = np.minimum.accumulate(p[order] * m / (m - np.arange(m)))
+    else:
+        raise ValueError(f"Unknown p-value adjustment: {method}")
+    result = np.empty(m)
+    result[order] = np.minimum(adjusted, 1.0)
+    return result.tolist()
+
+
+class QuantileSketch:
+    """
+    Mergeable quantile estimates with bounded relative error. Values are
+    counted in logarithmic buckets whose bounds differ by a factor of
+    (1 + relative_error) / (1 - relative_error), so any quantile read back from
+    a sketch, or from the merge of sketches of disjoint parts, is within
+    relative_error of the exact (linearly interpolated) quantile.
+    """
+
+    def __init__(self, relative_error: float = 0.005):
+        self.relative_error = relative_error
+        self.gamma = (1.0 + relative_error) / (1.0 - relative_error)
+        self._log_gamma = math.log(self.gamma)
+        self.positive: dict[int, int] = {}
+        self.negative: dict[int, int] = {}
+        self.zeros = 0
+        self.count = 0
+
+    def add(self, values: np.ndarray) -> "QuantileSketch":
+        """Count the non-missing values."""
+        values = np.asarray(values, dtype=float)
+        values = values[~np.isnan(values)]
+        self.count += len(values)
+        self.zeros += int(np.count_nonzero(values == 0))
+        for buckets, magnitudes in (
+            (self.positive, values[values > 0]),
+            (self.negative, -values[values < 0]),
+        ):
+            if len(magnitudes):
+                keys, counts = np.unique(
+                    np.ceil(np.log(magnitudes) / self._log_gamma).astype(np.int64),
+                    return_counts=True,
+                )
+                for key, count in zip(keys.tolist(), counts.tolist(), strict=True):
+                    buckets[key] = buckets.get(key, 0) + count
+        return self
+
+    def merge(self, other: "QuantileSketch") -> "QuantileSketch":
+        """Add the counts of a sketch with the same relative_error."""
+        if other.gamma != self.gamma:
+            raise ValueError("Cannot merge sketches with different relative errors")
+        for buckets, other_buckets in (
+            (self.positive, other.positive),
+            (self.negative, other.negative),
+        ):
+            for key, count in other_buckets.items():
+                buckets[key] = buckets.get(key, 0) + count
+        self.zeros += other.zeros
+        self.count += other.count
+        return self
+
+    def quantile(self, q: float) -> float:
+        """Estimate of the q-quantile, interpolated like numpy's default."""
+        if self.count == 0:
+            return float("nan")
+        centre = 2.0 / (self.gamma + 1.0)
+        negative = sorted(self.negative, reverse=True)
+        positive = sorted(self.positive)
+        estimates = np.array(
+            [-centre * self.gamma**key for key in negative]
+            + [0.0]
+            + [centre * self.gamma**key for key in positive]
+        )
+        cumulative = np.cumsum(
+            [self.negative[key] for key in negative]
+            + [self.zeros]
+            + [self.positive[key] for key in positive]
+        )
+        rank = q * (self.count - 1)
+        low, high = (
+            estimates[np.searchsorted(cumulative, k, side="right")]
+            for k in (math.floor(rank), math.ceil(rank))
+        )
+        return float(low + (high - low) * (rank - math.floor(rank)))